@@ -0,0 +1,705 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# The MIT License
+#
+# Copyright 2026 David Pursehouse. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""Benchmarks of the Gerrit client REST API.
+
+Compare transports by sending the same GET request many times
+concurrently to a Gerrit server, for example:
+
+    python benchmarks.py -g https://review.example.net -c 50 -n 1000
+
+or measure the time spent in the client itself, without a server:
+
+    python benchmarks.py --overhead -n 20000
+
+or run the suite of small, large and paginated requests against a local
+fake Gerrit server, appending the results to a file and comparing them
+with the previous run with the same settings:
+
+    python benchmarks.py --local --latency 5 --results benchmark-results.jsonl
+"""
+
+import argparse
+import gzip
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests as requests_lib
+from requests.adapters import BaseAdapter
+
+from pygerrit2 import GerritRestAPI, HTTP2Adapter, HTTPBasicAuth, get_json_backend
+from pygerrit2.rest import DEFAULT_HEADERS, GERRIT_MAGIC_JSON_PREFIX, _decode_response
+
+# Endpoints requested by each scenario of the local suite, and the page size
+# of the paginated scenario.
+SCENARIOS = {
+    "small": "/config/server/version",
+    "large": "/changes/?q=status:open",
+    "paginated": "/changes/?q=status:open",
+}
+PAGE_SIZE = 50
+
+# Approximate sizes, in MiB, of the responses decoded by the decode scenarios.
+DECODE_SIZES = (4, 16)
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    index = min(int(round(percent / 100.0 * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def _make_adapter(transport, concurrency):
+    if transport == "http1":
+        return None
+    return HTTP2Adapter(
+        max_connections=concurrency,
+        max_keepalive_connections=concurrency,
+        http2=transport == "http2",
+    )
+
+
+def benchmark_transport(url, auth, transport, endpoint, requests, concurrency):
+    """Send `requests` GET requests with `concurrency` threads.
+
+    :returns:
+        A dict of results.
+
+    """
+    metrics = []
+    rest = GerritRestAPI(
+        url=url,
+        auth=auth,
+        adapter=_make_adapter(transport, concurrency),
+        pool_maxsize=concurrency,
+        request_hooks=[metrics.append],
+    )
+    rest.get(endpoint)
+    del metrics[:]
+
+    start = time.perf_counter()
+    errors = 0
+    for result in rest.get_many([endpoint] * requests, max_workers=concurrency):
+        if result.error is not None:
+            errors += 1
+    elapsed = time.perf_counter() - start
+
+    latencies = [m.total for m in metrics if m.total is not None]
+    stats = rest.pool_stats()
+    rest.session.close()
+    return {
+        "transport": transport,
+        "requests": requests,
+        "errors": errors,
+        "seconds": elapsed,
+        "requests_per_second": requests / elapsed,
+        "p50": _percentile(latencies, 50),
+        "p90": _percentile(latencies, 90),
+        "p99": _percentile(latencies, 99),
+        "connections": stats["connections_created"] if stats else None,
+    }
+
+
+class _CannedAdapter(BaseAdapter):
+    """Connection adapter answering every request with the same response."""
+
+    def __init__(self, body):
+        super(_CannedAdapter, self).__init__()
+        self.body = body
+
+    def send(self, request, **kwargs):
+        response = requests_lib.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "application/json"
+        response.encoding = "utf-8"
+        response.raw = io.BytesIO(self.body)
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def benchmark_overhead(url, auth, endpoint, requests):
+    """Measure the time spent in the client for each request.
+
+    Requests are answered in-process, so the result is the cost of
+    preparing, sending and decoding a request, compared to calling
+    `requests.Session.get` with the settings of every request.
+
+    :returns:
+        A list of (name, microseconds per request) tuples.
+
+    """
+    body = b')]}\'\n{"version": "3.10.0"}'
+    rest = GerritRestAPI(url=url, auth=auth, adapter=_CannedAdapter(body))
+    session = requests_lib.Session()
+    session.mount("http://", _CannedAdapter(body))
+    session.mount("https://", _CannedAdapter(body))
+    full_url = rest.make_url(endpoint)
+
+    def plain():
+        session.get(
+            full_url, auth=rest.auth, verify=True, timeout=10, headers=DEFAULT_HEADERS
+        )
+
+    results = []
+    for name, call in (
+        ("requests", plain),
+        ("pygerrit2", lambda: rest.get(endpoint)),
+    ):
+        call()
+        start = time.perf_counter()
+        for _ in range(requests):
+            call()
+        results.append((name, (time.perf_counter() - start) / requests * 1e6))
+    return results
+
+
+def _account(number):
+    return {
+        "_account_id": 1000000 + number,
+        "name": "User %d" % number,
+        "email": "user%d@example.com" % number,
+        "username": "user%d" % number,
+    }
+
+
+def _change(number):
+    """Make a change as returned with detailed labels and the current revision."""
+    revision = "%040x" % (number * 7919)
+    owner = _account(number % 50)
+    return {
+        "id": "project~master~I%040x" % number,
+        "project": "project",
+        "branch": "master",
+        "change_id": "I%040x" % number,
+        "subject": "Change number %d with a typical subject line" % number,
+        "status": "NEW",
+        "created": "2026-01-01 10:00:00.000000000",
+        "updated": "2026-01-02 10:00:00.000000000",
+        "insertions": number % 300,
+        "deletions": number % 70,
+        "_number": number,
+        "owner": owner,
+        "labels": {
+            "Code-Review": {
+                "all": [
+                    dict(_account(reviewer), value=reviewer % 3 - 1)
+                    for reviewer in range(number % 4 + 1)
+                ],
+                "values": {"-1": "Needs work", " 0": "No score", "+1": "Looks good"},
+                "default_value": 0,
+            },
+            "Verified": {
+                "all": [dict(_account(99), value=1)],
+                "values": {"-1": "Fails", " 0": "No score", "+1": "Verified"},
+                "default_value": 0,
+            },
+        },
+        "current_revision": revision,
+        "revisions": {
+            revision: {
+                "kind": "REWORK",
+                "_number": 1,
+                "created": "2026-01-01 10:00:00.000000000",
+                "uploader": owner,
+                "ref": "refs/changes/%02d/%d/1" % (number % 100, number),
+            }
+        },
+    }
+
+
+class FakeGerritServer(object):
+    """Local HTTP server answering like Gerrit with canned payloads.
+
+    Serves the server version and a change query, paginated with the `n`
+    and `S` parameters.  Responses have Gerrit's magic JSON prefix and are
+    compressed when the client accepts gzip.
+
+    :arg float latency: (optional) Seconds to wait before each response.
+    :arg bool compress: (optional) Set to False to never compress responses.
+    :arg int changes: (optional) Number of changes matching the query.
+
+    """
+
+    def __init__(self, latency=0.0, compress=True, changes=500):
+        """See class docstring."""
+        self.latency = latency
+        self.compress = compress
+        self.changes = [_change(number) for number in range(1, changes + 1)]
+        self.requests = 0
+        self._bodies = {}
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """Get the URL of the server."""
+        return "http://127.0.0.1:%d" % self._server.server_address[1]
+
+    def __enter__(self):
+        """Start the server."""
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def _payload(self, path, query):
+        if path.rstrip("/").endswith("/config/server/version"):
+            return "3.10.0"
+        if path.rstrip("/").endswith("/changes"):
+            start = int(query.get("S", ["0"])[0])
+            limit = int(query.get("n", [str(len(self.changes))])[0])
+            end = start + limit
+            page = [dict(change) for change in self.changes[start:end]]
+            if page and end < len(self.changes):
+                page[-1]["_more_changes"] = True
+            return page
+        return None
+
+    def _body(self, target, compress):
+        key = (target, compress)
+        body = self._bodies.get(key)
+        if body is None:
+            url = urlsplit(target)
+            payload = self._payload(url.path, parse_qs(url.query))
+            if payload is None:
+                return None
+            body = (GERRIT_MAGIC_JSON_PREFIX + json.dumps(payload)).encode("utf-8")
+            if compress:
+                body = gzip.compress(body, 6)
+            with self._lock:
+                self._bodies[key] = body
+        return body
+
+    def _handle(self, handler):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        compress = self.compress and "gzip" in handler.headers.get(
+            "Accept-Encoding", ""
+        )
+        body = self._body(handler.path, compress)
+        if body is None:
+            handler.send_response(404)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json; charset=UTF-8")
+        if compress:
+            handler.send_header("Content-Encoding", "gzip")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+def _scenario_call(rest, scenario, prefetch=True):
+    endpoint = SCENARIOS[scenario]
+    if scenario == "paginated":
+        return lambda: sum(
+            1 for _ in rest.iter_query(endpoint, page_size=PAGE_SIZE, prefetch=prefetch)
+        )
+    return lambda: rest.get(endpoint)
+
+
+def benchmark_scenario(url, scenario, requests, concurrency):
+    """Benchmark one scenario of the local suite.
+
+    Latency and throughput are measured with `concurrency` threads.  The
+    CPU time and memory of a call are then measured in sequential calls,
+    without prefetching pages, the CPU time with the thread's clock so that
+    it excludes the server.
+
+    :returns:
+        A dict of results.  Times are in milliseconds and memory in bytes.
+
+    """
+    metrics = []
+    rest = GerritRestAPI(
+        url=url,
+        pool_maxsize=concurrency,
+        request_hooks=[metrics.append],
+    )
+    call = _scenario_call(rest, scenario)
+    call()
+
+    def timed(_):
+        start = time.perf_counter()
+        call()
+        return time.perf_counter() - start
+
+    del metrics[:]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, range(requests)))
+    elapsed = time.perf_counter() - start
+    decode = sum(m.decode for m in metrics if m.decode is not None)
+    response_bytes = sum(m.bytes for m in metrics if m.bytes is not None)
+
+    call = _scenario_call(rest, scenario, prefetch=False)
+    samples = max(min(requests // 10, 50), 1)
+    cpu_start = time.thread_time()
+    for _ in range(samples):
+        call()
+    cpu = (time.thread_time() - cpu_start) / samples
+
+    tracemalloc.start()
+    try:
+        peaks = []
+        for _ in range(samples):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            call()
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    rest.session.close()
+
+    return {
+        "requests": requests,
+        "requests_per_second": requests / elapsed,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "cpu_ms": cpu * 1000,
+        "decode_ms": decode / requests * 1000,
+        "peak_memory": sum(peaks) // len(peaks),
+        "response_bytes": response_bytes // requests,
+    }
+
+
+def benchmark_decode(size, json_backend=None, samples=5):
+    """Benchmark decoding a change query response of about `size` MiB.
+
+    :returns:
+        A dict of results, with the best decode time of `samples` runs in
+        milliseconds and the peak memory allocated while decoding in bytes.
+
+    """
+    changes = [_change(number) for number in range(1, size * 1024 * 1024 // 1400)]
+    response = requests_lib.Response()
+    response.status_code = 200
+    response.headers["Content-Type"] = "application/json; charset=UTF-8"
+    response.encoding = "utf-8"
+    response._content = (GERRIT_MAGIC_JSON_PREFIX + json.dumps(changes)).encode()
+    del changes
+    backend = get_json_backend(json_backend)
+
+    times = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        _decode_response(response, backend)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        _decode_response(response, backend)
+        peak = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "decode_ms": min(times) * 1000,
+        "peak_memory": peak,
+        "response_bytes": len(response.content),
+    }
+
+
+def run_local_suite(requests, concurrency, latency=0.0, compress=True):
+    """Run all scenarios against a local :class:`FakeGerritServer`.
+
+    The decode scenarios measure the decoding of multi-megabyte responses
+    on their own, without a server.
+
+    :returns:
+        A dict of the results of each scenario.
+
+    """
+    with FakeGerritServer(latency=latency, compress=compress) as server:
+        results = {
+            scenario: benchmark_scenario(server.url, scenario, requests, concurrency)
+            for scenario in SCENARIOS
+        }
+    for size in DECODE_SIZES:
+        results["decode-%dm" % size] = benchmark_decode(size)
+    return results
+
+
+def _git_commit():
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _previous_run(path, settings):
+    """Get the last run in the results file with the same settings."""
+    previous = None
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    run = json.loads(line)
+                except ValueError:
+                    continue
+                if run.get("settings") == settings:
+                    previous = run
+    return previous
+
+
+def _print_local_results(results, previous):
+    columns = (
+        ("requests_per_second", "req/s", True),
+        ("p50_ms", "p50 ms", False),
+        ("p99_ms", "p99 ms", False),
+        ("cpu_ms", "cpu ms", False),
+        ("decode_ms", "decode ms", False),
+        ("peak_memory", "peak KiB", False),
+    )
+    print("%-10s" % "scenario" + "".join(" %17s" % title for _, title, _ in columns))
+    for scenario, result in results.items():
+        before = (previous or {}).get("results", {}).get(scenario, {})
+        cells = []
+        for name, _, higher_is_better in columns:
+            value = result.get(name)
+            if value is None:
+                cells.append(" %17s" % "-")
+                continue
+            scale = 1024.0 if name == "peak_memory" else 1.0
+            cell = "%.2f" % (value / scale)
+            if before.get(name):
+                change = (value - before[name]) / before[name] * 100
+                worse = change < 0 if higher_is_better else change > 0
+                cell += " %s%+.0f%%" % (
+                    "!" if worse and abs(change) > 10 else " ",
+                    change,
+                )
+            cells.append(" %17s" % cell)
+        print("%-10s" % scenario + "".join(cells))
+    if previous:
+        print(
+            "Compared with the run of %s at commit %s; "
+            "'!' marks changes over 10%% for the worse."
+            % (previous["time"], previous["commit"])
+        )
+
+
+def _local_main(options):
+    settings = {
+        "requests": options.requests,
+        "concurrency": options.concurrency,
+        "latency_ms": options.latency,
+        "gzip": not options.no_gzip,
+        "json_backend": get_json_backend().name,
+    }
+    results = run_local_suite(
+        options.requests,
+        options.concurrency,
+        latency=options.latency / 1000.0,
+        compress=not options.no_gzip,
+    )
+    previous = _previous_run(options.results, settings) if options.results else None
+    _print_local_results(results, previous)
+    if options.results:
+        run = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "settings": settings,
+            "results": results,
+        }
+        with open(options.results, "a") as f:
+            f.write(json.dumps(run, sort_keys=True) + "\n")
+
+
+def _main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Gerrit REST API client",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "-g", "--gerrit-url", dest="gerrit_url", help="gerrit server url"
+    )
+    parser.add_argument("-u", "--username", dest="username", help="username")
+    parser.add_argument("-p", "--password", dest="password", help="password")
+    parser.add_argument(
+        "-e",
+        "--endpoint",
+        dest="endpoint",
+        default="/config/server/version",
+        help="endpoint to get",
+    )
+    parser.add_argument(
+        "-n", "--requests", dest="requests", type=int, default=500, help="requests"
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        dest="concurrency",
+        type=int,
+        default=20,
+        help="number of concurrent requests",
+    )
+    parser.add_argument(
+        "-t",
+        "--transport",
+        dest="transports",
+        action="append",
+        choices=["http1", "httpx-http1", "http2"],
+        help="transport to benchmark; may be repeated (default: http1 and http2)",
+    )
+    parser.add_argument(
+        "--overhead",
+        dest="overhead",
+        action="store_true",
+        help="measure the time spent in the client, without a server",
+    )
+    parser.add_argument(
+        "--local",
+        dest="local",
+        action="store_true",
+        help="run the suite of scenarios against a local fake server",
+    )
+    parser.add_argument(
+        "--latency",
+        dest="latency",
+        type=float,
+        default=0.0,
+        help="milliseconds the local server waits before each response",
+    )
+    parser.add_argument(
+        "--no-gzip",
+        dest="no_gzip",
+        action="store_true",
+        help="do not compress the responses of the local server",
+    )
+    parser.add_argument(
+        "--results",
+        dest="results",
+        help="file to append the results of the local suite to, and compare "
+        "them with the previous results with the same settings",
+    )
+    options = parser.parse_args()
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s")
+    if options.local:
+        return _local_main(options)
+    if not options.gerrit_url and not options.overhead:
+        parser.error("the gerrit server url is required")
+
+    auth = None
+    if options.username and options.password:
+        auth = HTTPBasicAuth(options.username, options.password)
+
+    if options.overhead:
+        url = options.gerrit_url or "http://review.example.com"
+        for name, micros in benchmark_overhead(
+            url, auth, options.endpoint, options.requests
+        ):
+            print("%-12s %9.1f us/request" % (name, micros))
+        return
+
+    print(
+        "%-12s %8s %7s %9s %9s %9s %9s %6s"
+        % (
+            "transport",
+            "requests",
+            "errors",
+            "req/s",
+            "p50 ms",
+            "p90 ms",
+            "p99 ms",
+            "conns",
+        )
+    )
+    for transport in options.transports or ["http1", "http2"]:
+        result = benchmark_transport(
+            options.gerrit_url,
+            auth,
+            transport,
+            options.endpoint,
+            options.requests,
+            options.concurrency,
+        )
+        print(
+            "%-12s %8d %7d %9.1f %9.1f %9.1f %9.1f %6s"
+            % (
+                result["transport"],
+                result["requests"],
+                result["errors"],
+                result["requests_per_second"],
+                result["p50"] * 1000,
+                result["p90"] * 1000,
+                result["p99"] * 1000,
+                "-" if result["connections"] is None else result["connections"],
+            )
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(_main())
@@ -22,18 +22,75 @@
 
 """Module to interface with Gerrit."""
 
-from .rest import GerritRestAPI, GerritReview
+from .events import GerritEvent, decode_event
+from .rest import BatchResult, GerritRestAPI, GerritReview, ReviewResult
+from .rest.adapters import GerritHTTPAdapter
+from .rest.aio import AsyncGerritRestAPI
+from .rest.batcher import ChangeBatcher
+from .rest.cache import CacheEntry, DecodedContentCache, ResponseCache
+from .rest.cache import FrozenDict, FrozenList
+from .rest.http2 import HTTP2Adapter
+from .rest.jsonlib import JSONBackend, JSONStream, get_json_backend
+from .rest.lazy import lazy_loads
+from .rest.metrics import OpenTelemetryHook, PrometheusHook, RequestMetrics
+from .rest.models import AccountInfo, ApprovalInfo, ChangeInfo, CommentInfo
+from .rest.models import LabelInfo, RevisionInfo
+from .rest.query import AccountQuery, ChangeQuery, ProjectQuery
+from .rest.retry import CircuitBreaker, CircuitOpenError, RetryPolicy, RetryRule
+from .rest.singleflight import AsyncSingleFlight, SingleFlight
+from .rest.throttle import AdaptiveConcurrencyLimiter, Throttle, TokenBucket
+from .stream import GerritEventStream, iter_events
 from requests.auth import HTTPBasicAuth, HTTPDigestAuth
 from .rest.auth import HTTPBasicAuthFromNetrc, HTTPDigestAuthFromNetrc, Anonymous
 
 __all__ = [
+    "AccountInfo",
+    "AccountQuery",
+    "AdaptiveConcurrencyLimiter",
     "Anonymous",
+    "ApprovalInfo",
+    "AsyncGerritRestAPI",
+    "AsyncSingleFlight",
+    "BatchResult",
+    "CacheEntry",
+    "ChangeBatcher",
+    "ChangeInfo",
+    "ChangeQuery",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "CommentInfo",
+    "DecodedContentCache",
+    "FrozenDict",
+    "FrozenList",
+    "GerritEvent",
+    "GerritEventStream",
+    "GerritHTTPAdapter",
     "GerritRestAPI",
     "GerritReview",
+    "HTTP2Adapter",
     "HTTPBasicAuth",
     "HTTPDigestAuth",
     "HTTPBasicAuthFromNetrc",
     "HTTPDigestAuthFromNetrc",
+    "JSONBackend",
+    "JSONStream",
+    "LabelInfo",
+    "OpenTelemetryHook",
+    "PrometheusHook",
+    "ProjectQuery",
+    "RequestMetrics",
+    "ResponseCache",
+    "RetryPolicy",
+    "RetryRule",
+    "ReviewResult",
+    "RevisionInfo",
+    "SingleFlight",
+    "Throttle",
+    "TokenBucket",
+    "decode_event",
+    "get_json_backend",
+    "iter_events",
+    "lazy_loads",
 ]
 
 
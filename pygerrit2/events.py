@@ -0,0 +1,363 @@
+# The MIT License
+#
+# Copyright 2026 David Pursehouse. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Typed Gerrit stream events.
+
+Events are decoded from the JSON objects emitted by Gerrit's
+`stream-events` command into slotted objects, like the REST API results
+in :mod:`pygerrit2.rest.models`.  Accounts are decoded to shared
+:class:`AccountInfo` objects, and project, branch and other repeated
+strings are interned, so that queued events take little memory.
+
+"""
+
+import sys
+
+from .rest.models import AccountInfo, _Model
+
+# Event classes by the value of their `type` field.
+EVENT_TYPES = {}
+
+
+class ChangeAttribute(_Model):
+    """The `change` attribute of an event."""
+
+    FIELDS = (
+        "project",
+        "branch",
+        "topic",
+        "id",
+        "number",
+        "subject",
+        "owner",
+        "url",
+        "status",
+        "createdOn",
+        "wip",
+        "private",
+    )
+    OTHER_FIELDS = (
+        "commitMessage",
+        "hashtags",
+        "lastUpdated",
+        "open",
+        "assignee",
+        "submitRecords",
+    )
+    INTERNED = frozenset(["project", "branch", "topic", "status"])
+    SHARED = frozenset(["hashtags"])
+    __slots__ = FIELDS
+
+    def __init__(self, data):
+        """See class docstring."""
+        super(ChangeAttribute, self).__init__(data)
+        if data.get("owner") is not None:
+            self.owner = AccountInfo.decode(data["owner"])
+
+    def _identity(self):
+        return self.number
+
+
+class PatchSetAttribute(_Model):
+    """The `patchSet` attribute of an event."""
+
+    FIELDS = (
+        "number",
+        "revision",
+        "parents",
+        "ref",
+        "uploader",
+        "author",
+        "createdOn",
+        "kind",
+        "sizeInsertions",
+        "sizeDeletions",
+    )
+    OTHER_FIELDS = ("approvals", "comments", "files")
+    INTERNED = frozenset(["kind"])
+    __slots__ = FIELDS
+
+    def __init__(self, data):
+        """See class docstring."""
+        super(PatchSetAttribute, self).__init__(data)
+        for name in ("uploader", "author"):
+            if data.get(name) is not None:
+                setattr(self, name, AccountInfo.decode(data[name]))
+
+    def _identity(self):
+        return self.number
+
+
+class ApprovalAttribute(_Model):
+    """An approval in the `approvals` attribute of an event."""
+
+    FIELDS = ("type", "description", "value", "oldValue", "grantedOn", "by")
+    INTERNED = frozenset(["type", "description", "value", "oldValue"])
+    __slots__ = FIELDS
+
+    def __init__(self, data):
+        """See class docstring."""
+        super(ApprovalAttribute, self).__init__(data)
+        if data.get("by") is not None:
+            self.by = AccountInfo.decode(data["by"])
+
+    def _identity(self):
+        return "%s=%s" % (self.type, self.value)
+
+
+class RefUpdateAttribute(_Model):
+    """The `refUpdate` attribute of an event."""
+
+    FIELDS = ("oldRev", "newRev", "refName", "project")
+    INTERNED = frozenset(["refName", "project"])
+    __slots__ = FIELDS
+
+    def _identity(self):
+        return self.refName
+
+
+class GerritEvent(_Model):
+    """An event from Gerrit's event stream.
+
+    Subclasses set the `TYPE` of the events they represent, and map the
+    names of the attributes decoded into objects to their classes in
+    `ATTRIBUTES`.  Events of types without a subclass are decoded to this
+    class, with their fields accessible as attributes too.
+
+    """
+
+    TYPE = None
+    ATTRIBUTES = {}
+    FIELDS = ("type", "eventCreatedOn")
+    INTERNED = frozenset(["type"])
+    __slots__ = FIELDS
+
+    def __init__(self, data):
+        """See class docstring."""
+        super(GerritEvent, self).__init__(data)
+        for name, attribute in self.ATTRIBUTES.items():
+            value = data.get(name)
+            if value is not None:
+                setattr(self, name, attribute.decode(value))
+
+    def __init_subclass__(cls, **kwargs):
+        """Register the subclass as the class of its event type."""
+        super(GerritEvent, cls).__init_subclass__(**kwargs)
+        if cls.TYPE is not None:
+            EVENT_TYPES[sys.intern(cls.TYPE)] = cls
+
+    @property
+    def change_key(self):
+        """Get the key of the change, or ref, that the event is about.
+
+        Events with the same key are about the same change, or the same
+        ref of a project.  The key is None for other events.
+
+        """
+        change = self.get("change")
+        if change is not None:
+            return (change.get("project"), change.get("number"))
+        ref_update = self.get("refUpdate")
+        if ref_update is not None:
+            return (ref_update.get("project"), ref_update.get("refName"))
+        return None
+
+    def _identity(self):
+        change = self.get("change")
+        if change is not None:
+            return "%s %s" % (self.type, change.get("number"))
+        return self.type
+
+
+def decode_event(data):
+    """Decode an event.
+
+    :arg dict data: The decoded JSON of the event.
+
+    :returns:
+        A :class:`GerritEvent`, of the subclass registered for its type if
+        there is one.
+
+    """
+    return EVENT_TYPES.get(data.get("type"), GerritEvent)(data)
+
+
+class _ChangeEvent(GerritEvent):
+    """Base class of the events about a change."""
+
+    ATTRIBUTES = {"change": ChangeAttribute, "patchSet": PatchSetAttribute}
+    __slots__ = ("change", "patchSet")
+    FIELDS = GerritEvent.FIELDS + __slots__
+
+
+class ChangeAbandonedEvent(_ChangeEvent):
+    """A change was abandoned."""
+
+    TYPE = "change-abandoned"
+    ATTRIBUTES = dict(_ChangeEvent.ATTRIBUTES, abandoner=AccountInfo)
+    __slots__ = ("abandoner", "reason")
+    FIELDS = _ChangeEvent.FIELDS + __slots__
+
+
+class ChangeDeletedEvent(_ChangeEvent):
+    """A change was deleted."""
+
+    TYPE = "change-deleted"
+    ATTRIBUTES = dict(_ChangeEvent.ATTRIBUTES, deleter=AccountInfo)
+    __slots__ = ("deleter",)
+    FIELDS = _ChangeEvent.FIELDS + __slots__
+
+
+class ChangeMergedEvent(_ChangeEvent):
+    """A change was merged."""
+
+    TYPE = "change-merged"
+    ATTRIBUTES = dict(_ChangeEvent.ATTRIBUTES, submitter=AccountInfo)
+    __slots__ = ("submitter", "newRev")
+    FIELDS = _ChangeEvent.FIELDS + __slots__
+
+
+class ChangeRestoredEvent(_ChangeEvent):
+    """An abandoned change was restored."""
+
+    TYPE = "change-restored"
+    ATTRIBUTES = dict(_ChangeEvent.ATTRIBUTES, restorer=AccountInfo)
+    __slots__ = ("restorer", "reason")
+    FIELDS = _ChangeEvent.FIELDS + __slots__
+
+
+class CommentAddedEvent(_ChangeEvent):
+    """A review comment, possibly with votes, was added to a change."""
+
+    TYPE = "comment-added"
+    ATTRIBUTES = dict(
+        _ChangeEvent.ATTRIBUTES, author=AccountInfo, approvals=ApprovalAttribute
+    )
+    __slots__ = ("author", "approvals", "comment")
+    FIELDS = _ChangeEvent.FIELDS + __slots__
+
+
+class HashtagsChangedEvent(_ChangeEvent):
+    """The hashtags of a change were changed."""
+
+    TYPE = "hashtags-changed"
+    ATTRIBUTES = dict(_ChangeEvent.ATTRIBUTES, editor=AccountInfo)
+    __slots__ = ("editor", "added", "removed", "hashtags")
+    FIELDS = _ChangeEvent.FIELDS + __slots__
+
+
+class PatchsetCreatedEvent(_ChangeEvent):
+    """A change, or a new patch set of a change, was uploaded."""
+
+    TYPE = "patchset-created"
+    ATTRIBUTES = dict(_ChangeEvent.ATTRIBUTES, uploader=AccountInfo)
+    __slots__ = ("uploader",)
+    FIELDS = _ChangeEvent.FIELDS + __slots__
+
+
+class PrivateStateChangedEvent(_ChangeEvent):
+    """A change was made private or public."""
+
+    TYPE = "private-state-changed"
+    ATTRIBUTES = dict(_ChangeEvent.ATTRIBUTES, changer=AccountInfo)
+    __slots__ = ("changer",)
+    FIELDS = _ChangeEvent.FIELDS + __slots__
+
+
+class ReviewerAddedEvent(_ChangeEvent):
+    """A reviewer was added to a change."""
+
+    TYPE = "reviewer-added"
+    ATTRIBUTES = dict(_ChangeEvent.ATTRIBUTES, reviewer=AccountInfo, adder=AccountInfo)
+    __slots__ = ("reviewer", "adder")
+    FIELDS = _ChangeEvent.FIELDS + __slots__
+
+
+class ReviewerDeletedEvent(_ChangeEvent):
+    """A reviewer was removed from a change."""
+
+    TYPE = "reviewer-deleted"
+    ATTRIBUTES = dict(
+        _ChangeEvent.ATTRIBUTES,
+        reviewer=AccountInfo,
+        remover=AccountInfo,
+        approvals=ApprovalAttribute,
+    )
+    __slots__ = ("reviewer", "remover", "approvals", "comment")
+    FIELDS = _ChangeEvent.FIELDS + __slots__
+
+
+class TopicChangedEvent(_ChangeEvent):
+    """The topic of a change was changed."""
+
+    TYPE = "topic-changed"
+    ATTRIBUTES = dict(_ChangeEvent.ATTRIBUTES, changer=AccountInfo)
+    __slots__ = ("changer", "oldTopic")
+    FIELDS = _ChangeEvent.FIELDS + __slots__
+
+
+class VoteDeletedEvent(_ChangeEvent):
+    """A vote was removed from a change."""
+
+    TYPE = "vote-deleted"
+    ATTRIBUTES = dict(
+        _ChangeEvent.ATTRIBUTES,
+        reviewer=AccountInfo,
+        remover=AccountInfo,
+        approvals=ApprovalAttribute,
+    )
+    __slots__ = ("reviewer", "remover", "approvals", "comment")
+    FIELDS = _ChangeEvent.FIELDS + __slots__
+
+
+class WorkInProgressStateChangedEvent(_ChangeEvent):
+    """A change was set to, or out of, work in progress."""
+
+    TYPE = "wip-state-changed"
+    ATTRIBUTES = dict(_ChangeEvent.ATTRIBUTES, changer=AccountInfo)
+    __slots__ = ("changer",)
+    FIELDS = _ChangeEvent.FIELDS + __slots__
+
+
+class ProjectCreatedEvent(GerritEvent):
+    """A project was created."""
+
+    TYPE = "project-created"
+    INTERNED = frozenset(["type", "projectName", "projectHead"])
+    __slots__ = ("projectName", "projectHead")
+    FIELDS = GerritEvent.FIELDS + __slots__
+
+
+class RefUpdatedEvent(GerritEvent):
+    """A ref was updated by a push or a submit."""
+
+    TYPE = "ref-updated"
+    ATTRIBUTES = {"submitter": AccountInfo, "refUpdate": RefUpdateAttribute}
+    __slots__ = ("submitter", "refUpdate")
+    FIELDS = GerritEvent.FIELDS + __slots__
+
+
+class DroppedOutputEvent(GerritEvent):
+    """Gerrit dropped events because the stream was not read fast enough."""
+
+    TYPE = "dropped-output"
+    __slots__ = ()
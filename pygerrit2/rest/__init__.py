@@ -22,13 +22,27 @@
 
 """Interface to the Gerrit REST API."""
 
+import binascii
+import codecs
+import collections
 import json
 import logging
+import os
+import re
 import requests
-from requests.adapters import HTTPAdapter
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import DEFAULT_POOLBLOCK, DEFAULT_POOLSIZE
 from requests.packages.urllib3.util.retry import Retry
 
+from .adapters import GerritHTTPAdapter
 from .auth import HTTPBasicAuthFromNetrc, Anonymous
+from .jsonlib import JSONBackend, JSONStream, get_json_backend
+from .lazy import lazy_loads
+from .metrics import RequestMetrics
+from .retry import RetryPolicy, _body_rewinder, _limit_timeout
+from .session import GerritSession
+from .singleflight import SingleFlight, request_key
 
 logger = logging.getLogger("pygerrit2")
 fmt = "%(asctime)s-[%(name)s-%(levelname)s] %(message)s"
@@ -40,13 +54,164 @@ if not logger.handlers:
     logger.addHandler(sh)
 
 GERRIT_MAGIC_JSON_PREFIX = ")]}'\n"
+GERRIT_MAGIC_JSON_PREFIX_BYTES = GERRIT_MAGIC_JSON_PREFIX.encode("ascii")
+_WHITESPACE_BYTES = re.compile(rb"\s*")
 GERRIT_AUTH_SUFFIX = "/a"
 DEFAULT_HEADERS = {"Accept": "application/json", "Accept-Encoding": "gzip"}
 
+# Number of bytes read at a time when decoding a streamed response.
+STREAM_CHUNK_SIZE = 64 * 1024
 
-def _decode_response(response):
+# Default number of requests sent concurrently by the batch methods.
+DEFAULT_MAX_WORKERS = 10
+
+# Query parameters controlling pagination, which are set by `iter_query`.
+PAGINATION_PARAMETERS = ("n", "S", "limit", "start")
+
+# Keys set on the last element of a query result when more results are available.
+MORE_RESULTS_KEYS = (
+    "_more_changes",
+    "_more_accounts",
+    "_more_groups",
+    "_more_projects",
+)
+
+
+BatchResult = collections.namedtuple("BatchResult", ["endpoint", "result", "error"])
+BatchResult.__doc__ = """Outcome of one request sent by :meth:`GerritRestAPI.get_many`.
+
+The `result` is the JSON decoded result, or None if the request failed with
+the exception in `error`.
+
+"""
+
+
+ReviewResult = collections.namedtuple(
+    "ReviewResult", ["change_id", "revision", "review", "result", "error"]
+)
+ReviewResult.__doc__ = """Outcome of a review from :meth:`GerritRestAPI.review_many`.
+
+The `result` is the JSON decoded result, or None if posting the review
+failed with the exception in `error`.
+
+"""
+
+
+def _run_concurrently(function, items, max_workers, ordered=True):
+    """Call a function for each item on a pool of threads.
+
+    :returns:
+        Generator of `(item, result, error)` tuples, in the order of `items`
+        or, if `ordered` is false, in the order of completion.  Exceptions
+        raised by the function are returned as `error` instead of being
+        raised.
+
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = collections.OrderedDict()
+    try:
+        for item in items:
+            futures[executor.submit(function, item)] = item
+        for future in futures if ordered else as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+    finally:
+        # Stop work that has not started if the caller stops iterating early.
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+_STDLIB_JSON_BACKEND = JSONBackend("json")
+
+
+def _json_start(content):
+    """Get the offset of the JSON document in UTF-8 encoded content.
+
+    Whitespace and Gerrit's magic prefix are skipped without copying the
+    content.  The offset is the length of the content if there is nothing
+    else.
+
+    """
+    start = _WHITESPACE_BYTES.match(content).end()
+    if content.startswith(GERRIT_MAGIC_JSON_PREFIX_BYTES, start):
+        start = _WHITESPACE_BYTES.match(
+            content, start + len(GERRIT_MAGIC_JSON_PREFIX_BYTES)
+        ).end()
+    return start
+
+
+def _is_utf8(encoding):
+    return encoding is None or codecs.lookup(encoding).name == "utf-8"
+
+
+def _decode_json_bytes(content, json_backend=None):
+    """Decode UTF-8 encoded JSON content from a view after the prefix."""
+    start = _json_start(content)
+    if start == len(content):
+        logger.debug("no content in response")
+        return ""
+    view = memoryview(content)[start:]
+    try:
+        return (json_backend or _STDLIB_JSON_BACKEND).loads_utf8(view)
+    except ValueError:
+        logger.error("Invalid json content: %s", str(view, "utf-8", "replace"))
+        raise
+
+
+def _decode_content(content, content_type, encoding, json_backend=None):
+    """Strip off Gerrit's magic prefix and decode response content.
+
+    UTF-8 encoded JSON content is not copied before it is parsed.
+
+    """
+    if content_type.split(";")[0] == "application/json" and _is_utf8(encoding):
+        return _decode_json_bytes(content, json_backend)
+    content = content.strip()
+    if encoding:
+        content = content.decode(encoding)
+    if not content:
+        logger.debug("no content in response")
+        return content
+    if content_type.split(";")[0] != "application/json":
+        return content
+    if content.startswith(GERRIT_MAGIC_JSON_PREFIX):
+        index = len(GERRIT_MAGIC_JSON_PREFIX)
+        content = content[index:]
+    loads = json_backend.loads if json_backend else json.loads
+    try:
+        return loads(content)
+    except ValueError:
+        logger.error("Invalid json content: %s", content)
+        raise
+
+
+def _lazy_decode_content(content, encoding):
+    """Strip off Gerrit's magic prefix and decode JSON content lazily."""
+    if not _is_utf8(encoding):
+        content = content.decode(encoding).encode("utf-8")
+    start = _json_start(content)
+    content = memoryview(content)[start:]
+    try:
+        return lazy_loads(content)
+    except ValueError:
+        logger.error("Invalid json content: %s", content)
+        raise
+
+
+def _decode_response(response, json_backend=None, decode_cache=None, lazy=False):
     """Strip off Gerrit's magic prefix and decode a response.
 
+    :arg JSONBackend json_backend: (optional) JSON implementation used to
+        decode the content.  Defaults to the standard library.
+    :arg DecodedContentCache decode_cache: (optional) Cache of decoded JSON
+        content, used to skip decoding content that was decoded before.
+    :arg bool lazy: (optional) If true, JSON content is decoded with
+        :func:`lazy_loads`, and `json_backend` and `decode_cache` are not
+        used.
+
     :returns:
         Decoded JSON content as a dict, or raw text if content could not be
         decoded as JSON.
@@ -61,55 +226,279 @@ def _decode_response(response):
         % (response.status_code, content_type, response.encoding)
     )
     response.raise_for_status()
-    content = response.content.strip()
-    if response.encoding:
-        content = content.decode(response.encoding)
-    if not content:
-        logger.debug("no content in response")
-        return content
+    content = response.content
+    is_json = content_type.split(";")[0] == "application/json"
+    if lazy and is_json and content and not content.isspace():
+        return _lazy_decode_content(content, response.encoding)
+    if decode_cache is not None and is_json:
+        return decode_cache.get_or_decode(
+            content,
+            lambda: _decode_content(
+                content, content_type, response.encoding, json_backend
+            ),
+        )
+    return _decode_content(content, content_type, response.encoding, json_backend)
+
+
+_JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_JSON_DELIMITERS = " \t\n\r,]}"
+
+
+class _JSONArrayStream(object):
+    """Incremental decoder for a JSON document read in chunks of text.
+
+    Only the elements of the top-level array, plus a small amount of
+    look-ahead, are held in memory at any time.
+
+    """
+
+    def __init__(self, chunks):
+        """See class docstring."""
+        self.chunks = iter(chunks)
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        """Read more text, at least doubling the unconsumed buffer.
+
+        Doubling keeps the cost of re-parsing an incomplete element linear in
+        the size of the element.
+
+        :returns: False if there is nothing more to read.
+
+        """
+        if self.eof:
+            return False
+        pos = self.pos
+        parts = [self.buffer[pos:]]
+        wanted = max(len(parts[0]), 1)
+        size = 0
+        while size < wanted:
+            try:
+                chunk = next(self.chunks)
+            except StopIteration:
+                self.eof = True
+                break
+            parts.append(chunk)
+            size += len(chunk)
+        if not size:
+            return False
+        self.buffer = "".join(parts)
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        """Skip whitespace and return the next character, or "" at the end."""
+        while True:
+            self.pos = _JSON_WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def _decode_value(self):
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk.
+            if (
+                end < len(self.buffer) and self.buffer[end] in _JSON_DELIMITERS
+            ) or not self._fill():
+                self.pos = end
+                return value
+
+    def __iter__(self):
+        """Generate the elements of the top-level array.
+
+        Gerrit's magic prefix is skipped.  If the document is not an array,
+        the decoded document is generated as the only element.
+
+        """
+        self._peek()
+        while len(self.buffer) - self.pos < len(GERRIT_MAGIC_JSON_PREFIX):
+            if not self._fill():
+                break
+        if self.buffer.startswith(GERRIT_MAGIC_JSON_PREFIX, self.pos):
+            self.pos += len(GERRIT_MAGIC_JSON_PREFIX)
+
+        first = self._peek()
+        if not first:
+            return
+        if first != "[":
+            yield self._decode_value()
+            return
+        self.pos += 1
+        if self._peek() == "]":
+            return
+        while True:
+            yield self._decode_value()
+            separator = self._peek()
+            if separator == "]":
+                return
+            if not separator:
+                raise ValueError("Unexpected end of streamed JSON")
+            if separator != ",":
+                raise ValueError(
+                    "Expecting ',' delimiter in streamed JSON: %r" % separator
+                )
+            self.pos += 1
+            self._peek()
+
+
+def _iter_decode_response(response, chunk_size=STREAM_CHUNK_SIZE):
+    """Strip off Gerrit's magic prefix and decode a streamed response.
+
+    The body is read `chunk_size` bytes at a time so that the memory needed
+    is bounded by the size of the largest element rather than the size of
+    the whole response.
+
+    :returns:
+        Generator over the elements of the top-level JSON array.  Responses
+        that are not a JSON array generate a single element; responses that
+        are not JSON are returned in full like :func:`_decode_response`.
+
+    :raises:
+        requests.HTTPError if the response contains an HTTP error status code.
+
+    """
+    content_type = response.headers.get("content-type", "")
+    logger.debug(
+        "status[%s] content_type[%s] encoding[%s]"
+        % (response.status_code, content_type, response.encoding)
+    )
     if content_type.split(";")[0] != "application/json":
-        return content
-    if content.startswith(GERRIT_MAGIC_JSON_PREFIX):
-        index = len(GERRIT_MAGIC_JSON_PREFIX)
-        content = content[index:]
+        yield _decode_response(response)
+        return
+    response.raise_for_status()
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")()
+    chunks = (
+        decoder.decode(chunk) for chunk in response.iter_content(chunk_size) if chunk
+    )
     try:
-        return json.loads(content)
+        for element in _JSONArrayStream(chunks):
+            yield element
     except ValueError:
-        logger.error("Invalid json content: %s", content)
+        logger.error("Invalid json content in streamed response")
         raise
 
 
-class GerritRestAPI(object):
-    """Interface to the Gerrit REST API.
+def _iter_content(response, chunk_size, progress=None):
+    """Read the body of a streamed response, reporting the progress.
+
+    The total passed to `progress` is the `Content-Length` of the response,
+    or None if it is not known or the body is compressed.
+
+    """
+    total = response.headers.get("Content-Length")
+    if not total or response.headers.get("Content-Encoding"):
+        total = None
+    else:
+        total = int(total)
+    received = 0
+    for chunk in response.iter_content(chunk_size):
+        if not chunk:
+            continue
+        received += len(chunk)
+        if progress is not None:
+            progress(received, total)
+        yield chunk
+
+
+def _iter_base64_decode(chunks):
+    """Decode base64 content read in chunks of any size.
+
+    :raises:
+        ValueError if the content is not valid base64.
+
+    """
+    pending = b""
+    for chunk in chunks:
+        chunk = pending + chunk.translate(None, b" \t\r\n")
+        end = len(chunk) - len(chunk) % 4
+        pending = chunk[end:]
+        if end:
+            yield binascii.a2b_base64(memoryview(chunk)[:end])
+    if pending:
+        yield binascii.a2b_base64(pending)
+
+
+def _write_chunks(f, chunks):
+    written = 0
+    for chunk in chunks:
+        f.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def _write_file(path, chunks):
+    """Write chunks to a file that is only replaced once all are written."""
+    partial = "%s.part" % path
+    try:
+        with open(partial, "wb") as f:
+            written = _write_chunks(f, chunks)
+        os.replace(partial, path)
+    except BaseException:
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+        raise
+    return written
+
+
+def _paginate_endpoint(endpoint, limit, start):
+    """Set the pagination parameters on a query endpoint.
+
+    Any pagination parameters already in the endpoint's query string are
+    replaced.  The remaining parameters are kept as given, without being
+    re-encoded.
+
+    """
+    path, _, query = endpoint.partition("?")
+    params = [
+        param
+        for param in query.split("&")
+        if param and param.split("=", 1)[0] not in PAGINATION_PARAMETERS
+    ]
+    params.extend(["n=%d" % limit, "S=%d" % start])
+    return path + "?" + "&".join(params)
+
+
+def _has_more_results(page, page_size):
+    """Check whether a page of query results is followed by another page."""
+    if isinstance(page, dict):
+        # Listings of projects and groups are maps without a "more" marker.
+        return len(page) >= page_size
+    if not page:
+        return False
+    last = page[-1]
+    if isinstance(last, dict):
+        for key in MORE_RESULTS_KEYS:
+            if key in last:
+                return bool(last[key])
+    return len(page) >= page_size
+
+
+class _GerritRestAPIBase(object):
+    """Common URL and authentication handling for the REST API clients.
 
     :arg str url: The full URL to the server, including the `http(s)://`
         prefix. If `auth` is given, `url` will be automatically adjusted to
         include Gerrit's authentication suffix.
     :arg auth: (optional) Authentication handler.  Must be derived from
         `requests.auth.AuthBase`.
-    :arg boolean verify: (optional) Set to False to disable verification of
-        SSL certificates.
-    :arg requests.adapters.BaseAdapter adapter: (optional) Custom connection
-        adapter. See
-        https://requests.readthedocs.io/en/master/api/#requests.adapters.BaseAdapter
 
     """
 
-    def __init__(self, url, auth=None, verify=True, adapter=None):
+    def __init__(self, url, auth=None):
         """See class docstring."""
         self.url = url.rstrip("/")
-        self.session = requests.session()
-        if not adapter:
-            retry = Retry(
-                total=5,
-                read=5,
-                connect=5,
-                backoff_factor=0.3,
-                status_forcelist=(500, 502, 504),
-            )
-            adapter = HTTPAdapter(max_retries=retry)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
 
         if not auth:
             try:
@@ -133,8 +522,6 @@ class GerritRestAPI(object):
             if self.url.endswith(GERRIT_AUTH_SUFFIX):
                 self.url = self.url[: -len(GERRIT_AUTH_SUFFIX)]
 
-        self.kwargs = {"auth": auth, "verify": verify}
-
         # Keep a copy of the auth, only needed for tests
         self.auth = auth
 
@@ -153,52 +540,327 @@ class GerritRestAPI(object):
         endpoint = endpoint.lstrip("/")
         return self.url + endpoint
 
+
+class GerritRestAPI(_GerritRestAPIBase):
+    """Interface to the Gerrit REST API.
+
+    :arg str url: The full URL to the server, including the `http(s)://`
+        prefix. If `auth` is given, `url` will be automatically adjusted to
+        include Gerrit's authentication suffix.
+    :arg auth: (optional) Authentication handler.  Must be derived from
+        `requests.auth.AuthBase`.
+    :arg boolean verify: (optional) Set to False to disable verification of
+        SSL certificates.
+    :arg requests.adapters.BaseAdapter adapter: (optional) Custom connection
+        adapter. See
+        https://requests.readthedocs.io/en/master/api/#requests.adapters.BaseAdapter
+    :arg json_backend: (optional) Name of the JSON implementation used to
+        decode responses and encode `json` request bodies, or a
+        :class:`JSONBackend`.  By default the fastest installed one of
+        orjson, ujson, simdjson or the standard library is used.
+    :arg int pool_connections: (optional) Number of connection pools (i.e.
+        hosts) to cache.
+    :arg int pool_maxsize: (optional) Maximum number of connections kept open
+        per host.  When more threads than this send requests concurrently,
+        the extra connections are closed after use and must be established
+        again on the next request.
+    :arg bool pool_block: (optional) If true, wait for a connection to be
+        returned to the pool instead of opening more than `pool_maxsize`
+        connections.
+    :arg int tcp_keepalive: (optional) Number of seconds a pooled connection
+        may be idle before TCP keep-alive probes are sent.
+    :arg ResponseCache cache: (optional) Cache for the results of GET
+        requests.
+    :arg DecodedContentCache decode_cache: (optional) Cache used to skip
+        decoding response content identical to content decoded before.
+    :arg bool coalesce: (optional) If true, concurrent GET requests for the
+        same endpoint and arguments from different threads share one request
+        to the server and one decoded result.  Callers must then not modify
+        the results they get.
+    :arg list request_hooks: (optional) Functions called with the
+        :class:`RequestMetrics` of each request, after the response has been
+        decoded.  Exceptions raised by the hooks are logged and ignored.
+    :arg Throttle throttle: (optional) Rate and concurrency limits applied to
+        all requests sent by the client.
+    :arg RetryPolicy retry_policy: (optional) Policy deciding which failed
+        requests are sent again.  If not given, requests that fail with a
+        connection error or status 500, 502 or 504 are retried up to 5
+        times by the connection adapter, whatever their method.
+
+    The `pool_*` and `tcp_keepalive` arguments are ignored when a custom
+    `adapter` is given.  A custom adapter should not retry requests itself
+    when a `retry_policy` is given.
+
+    """
+
+    def __init__(
+        self,
+        url,
+        auth=None,
+        verify=True,
+        adapter=None,
+        json_backend=None,
+        pool_connections=DEFAULT_POOLSIZE,
+        pool_maxsize=DEFAULT_POOLSIZE,
+        pool_block=DEFAULT_POOLBLOCK,
+        tcp_keepalive=None,
+        cache=None,
+        decode_cache=None,
+        coalesce=False,
+        request_hooks=None,
+        throttle=None,
+        retry_policy=None,
+    ):
+        """See class docstring."""
+        super(GerritRestAPI, self).__init__(url, auth)
+        self.session = GerritSession()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.auth = self.auth
+        self.session.verify = verify
+        if not adapter:
+            if retry_policy is None:
+                retry = Retry(
+                    total=5,
+                    read=5,
+                    connect=5,
+                    backoff_factor=0.3,
+                    status_forcelist=(500, 502, 504),
+                )
+            else:
+                retry = Retry(0, read=False)
+            adapter = GerritHTTPAdapter(
+                max_retries=retry,
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+                tcp_keepalive=tcp_keepalive,
+            )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.kwargs = {}
+        self.json_backend = get_json_backend(json_backend)
+        self.cache = cache
+        self.decode_cache = decode_cache
+        self._single_flight = SingleFlight() if coalesce else None
+        self.request_hooks = list(request_hooks or [])
+        self.throttle = throttle
+        self.retry_policy = retry_policy
+
+    def pool_stats(self):
+        """Get statistics about the use of the connection pool.
+
+        :returns:
+            A dict with the number of `connections_created`, `requests` and
+            `connections_reused`, as described in
+            :meth:`GerritHTTPAdapter.pool_stats`, or None if the connection
+            adapter does not provide statistics.
+
+        """
+        adapter = self.session.get_adapter(self.url)
+        if not hasattr(adapter, "pool_stats"):
+            return None
+        return adapter.pool_stats()
+
     def translate_kwargs(self, **kwargs):
-        """Translate kwargs replacing `data` with `json` if necessary."""
-        local_kwargs = self.kwargs.copy()
-        local_kwargs.update(kwargs)
+        """Translate kwargs replacing `data` with `json` if necessary.
 
-        if "data" in local_kwargs and "json" in local_kwargs:
-            raise ValueError("Cannot use data and json together")
+        The authentication, certificate verification and default headers are
+        set on the session, so the translated kwargs only hold the settings
+        specific to the request.
 
-        if "data" in local_kwargs and isinstance(local_kwargs["data"], dict):
-            local_kwargs.update({"json": local_kwargs["data"]})
-            del local_kwargs["data"]
+        To stream a large body, `data` may be a file object or an iterable of
+        `bytes`, such as a generator or a :class:`JSONStream`.  Bodies whose
+        length is not known are sent with chunked transfer encoding.  Bodies
+        that cannot be sent again, such as generators, are not retried.
+
+        """
+        local_kwargs = dict(self.kwargs, **kwargs) if self.kwargs else kwargs
+
+        if "data" in local_kwargs:
+            if "json" in local_kwargs:
+                raise ValueError("Cannot use data and json together")
+            if isinstance(local_kwargs["data"], dict):
+                local_kwargs["json"] = local_kwargs.pop("data")
 
         if "timeout" not in local_kwargs:
-            local_kwargs.update({"timeout": 10})
+            local_kwargs["timeout"] = 10
 
-        headers = DEFAULT_HEADERS.copy()
-        if "headers" in kwargs:
-            headers.update(kwargs["headers"])
-        if "json" in local_kwargs:
-            headers.update({"Content-Type": "application/json;charset=UTF-8"})
-        local_kwargs.update({"headers": headers})
+        headers = kwargs.get("headers")
+        headers = dict(headers) if headers else {}
+        if "json" in local_kwargs or isinstance(local_kwargs.get("data"), JSONStream):
+            headers["Content-Type"] = "application/json;charset=UTF-8"
+        local_kwargs["headers"] = headers
 
         return local_kwargs
 
-    def get(self, endpoint, return_response=False, **kwargs):
+    def _send(self, method, endpoint, **kwargs):
+        args = self.translate_kwargs(**kwargs)
+        if "json" in args:
+            args["data"] = self.json_backend.dumps(args.pop("json"))
+        url = self.make_url(endpoint)
+        if not self.request_hooks:
+            return self._session_request(method, url, **args), None
+
+        metrics = RequestMetrics(method, endpoint)
+        start = time.perf_counter()
+        try:
+            response = self._session_request(method, url, **args)
+        except Exception as e:
+            metrics.total = time.perf_counter() - start
+            metrics.error = e
+            self._emit(metrics)
+            raise
+        metrics.record_response(response, time.perf_counter() - start)
+        return response, metrics
+
+    def _session_request(self, method, url, **kwargs):
+        if self.retry_policy is None:
+            return self._send_once(method, url, None, **kwargs)
+        rewind = _body_rewinder(kwargs.get("data"))
+
+        def send(remaining):
+            if rewind is not None:
+                rewind()
+            return self._send_once(method, url, remaining, **kwargs)
+
+        return self.retry_policy.call(method, send, rewindable=rewind is not None)
+
+    def _send_once(self, method, url, remaining, **kwargs):
+        if remaining is not None:
+            kwargs["timeout"] = _limit_timeout(kwargs.get("timeout"), remaining)
+        if self.throttle is None:
+            return self.session.request(method, url, **kwargs)
+
+        ticket = self.throttle.acquire()
+        response = None
+        try:
+            response = self.session.request(method, url, **kwargs)
+        finally:
+            self.throttle.release(ticket, response)
+        return response
+
+    def _decode(self, response, metrics=None, lazy=False):
+        if metrics is None:
+            return _decode_response(
+                response, self.json_backend, self.decode_cache, lazy
+            )
+
+        start = time.perf_counter()
+        try:
+            return _decode_response(
+                response, self.json_backend, self.decode_cache, lazy
+            )
+        except Exception as e:
+            metrics.error = e
+            raise
+        finally:
+            metrics.decode = time.perf_counter() - start
+            self._emit(metrics)
+
+    def _emit(self, metrics):
+        for hook in self.request_hooks:
+            try:
+                hook(metrics)
+            except Exception:
+                logger.exception("Error in request hook %r", hook)
+
+    def _request(self, method, endpoint, return_response=False, lazy=False, **kwargs):
+        response, metrics = self._send(method, endpoint, **kwargs)
+
+        decoded_response = self._decode(response, metrics, lazy)
+
+        if return_response:
+            return decoded_response, response
+        return decoded_response
+
+    def _cached_get(self, endpoint, return_response=False, **kwargs):
+        headers = dict(kwargs.pop("headers", None) or {})
+        key = self.cache.make_key(
+            self.make_url(endpoint), kwargs.get("params"), headers
+        )
+        entry = self.cache.lookup(key)
+        if entry is not None and entry.is_fresh():
+            logger.debug("cache hit for %s", endpoint)
+            response = None
+            decoded_response = self.cache.get_value(entry)
+        else:
+            if entry is not None:
+                headers.update(entry.validators())
+            response, metrics = self._send("GET", endpoint, headers=headers, **kwargs)
+            if entry is not None and response.status_code == 304:
+                logger.debug("cached response for %s not modified", endpoint)
+                if metrics is not None:
+                    self._emit(metrics)
+                decoded_response = self.cache.get_value(entry)
+            else:
+                decoded_response = self._decode(response, metrics)
+                if response.status_code == 200:
+                    entry = self.cache.store(key, decoded_response, response)
+                    if entry is not None:
+                        decoded_response = self.cache.get_value(entry)
+
+        if return_response:
+            return decoded_response, response
+        return decoded_response
+
+    def get(
+        self,
+        endpoint,
+        return_response=False,
+        use_cache=True,
+        model=None,
+        lazy=False,
+        **kwargs
+    ):
         """Send HTTP GET to the endpoint.
 
         :arg str endpoint: The endpoint to send to.
         :arg bool return_response: If true will also return the response
+        :arg bool use_cache: (optional) If false, the client's response
+            cache is bypassed for this request.
+        :arg model: (optional) Result class, such as :class:`ChangeInfo`,
+            to decode the JSON result into.
+        :arg bool lazy: (optional) If true, the JSON result is decoded
+            lazily with :func:`lazy_loads`: objects and arrays are returned
+            as read-only proxies, and nested fields are only decoded when
+            they are accessed.  Lazy results bypass the response cache, the
+            decoded content cache and request coalescing.
 
         :returns:
-            JSON decoded result.
+            JSON decoded result.  If `return_response` is true and the result
+            was served from the cache without contacting the server, the
+            returned response is None.  If the client coalesces requests,
+            the result and response may be shared with other callers.
 
         :raises:
             requests.RequestException on timeout or connection error.
+            ValueError if both `model` and `lazy` are given.
 
         """
-        args = self.translate_kwargs(**kwargs)
-        response = self.session.get(self.make_url(endpoint), **args)
-
-        decoded_response = _decode_response(response)
+        if lazy:
+            if model is not None:
+                raise ValueError("Cannot use model and lazy together")
+            return self._request("GET", endpoint, return_response, True, **kwargs)
 
+        if self._single_flight is None:
+            decoded_response, response = self._get(endpoint, True, use_cache, **kwargs)
+        else:
+            key = request_key(self.make_url(endpoint), use_cache=use_cache, **kwargs)
+            decoded_response, response = self._single_flight.do(
+                key, lambda: self._get(endpoint, True, use_cache, **kwargs)
+            )
+        if model is not None:
+            decoded_response = model.decode(decoded_response)
         if return_response:
             return decoded_response, response
         return decoded_response
 
+    def _get(self, endpoint, return_response, use_cache, **kwargs):
+        if self.cache is not None and use_cache and self.cache.is_cacheable(endpoint):
+            return self._cached_get(endpoint, return_response, **kwargs)
+        return self._request("GET", endpoint, return_response, **kwargs)
+
     def put(self, endpoint, return_response=False, **kwargs):
         """Send HTTP PUT to the endpoint.
 
@@ -211,14 +873,7 @@ class GerritRestAPI(object):
             requests.RequestException on timeout or connection error.
 
         """
-        args = self.translate_kwargs(**kwargs)
-        response = self.session.put(self.make_url(endpoint), **args)
-
-        decoded_response = _decode_response(response)
-
-        if return_response:
-            return decoded_response, response
-        return decoded_response
+        return self._request("PUT", endpoint, return_response, **kwargs)
 
     def post(self, endpoint, return_response=False, **kwargs):
         """Send HTTP POST to the endpoint.
@@ -232,14 +887,7 @@ class GerritRestAPI(object):
             requests.RequestException on timeout or connection error.
 
         """
-        args = self.translate_kwargs(**kwargs)
-        response = self.session.post(self.make_url(endpoint), **args)
-
-        decoded_response = _decode_response(response)
-
-        if return_response:
-            return decoded_response, response
-        return decoded_response
+        return self._request("POST", endpoint, return_response, **kwargs)
 
     def delete(self, endpoint, return_response=False, **kwargs):
         """Send HTTP DELETE to the endpoint.
@@ -252,15 +900,182 @@ class GerritRestAPI(object):
         :raises:
             requests.RequestException on timeout or connection error.
 
+        """
+        return self._request("DELETE", endpoint, return_response, **kwargs)
+
+    def get_many(
+        self, endpoints, max_workers=DEFAULT_MAX_WORKERS, ordered=True, **kwargs
+    ):
+        """Send HTTP GET to several endpoints concurrently.
+
+        The requests are sent from a pool of threads sharing this client's
+        session, and so its connection pool.  A failed request does not stop
+        the others; its exception is returned in the result instead.
+
+        :arg list endpoints: The endpoints to send to.
+        :arg int max_workers: (optional) Maximum number of requests in flight
+            at the same time.  This should not exceed the `pool_maxsize` of
+            the client, or connections will be discarded after each request.
+        :arg bool ordered: (optional) If true, results are generated in the
+            order of `endpoints`.  Otherwise they are generated as soon as
+            they complete.
+
+        :returns:
+            Generator of :class:`BatchResult`.
+
+        """
+        results = _run_concurrently(
+            lambda endpoint: self.get(endpoint, **kwargs),
+            endpoints,
+            max_workers,
+            ordered,
+        )
+        for endpoint, result, error in results:
+            yield BatchResult(endpoint, result, error)
+
+    def iter_get(self, endpoint, chunk_size=STREAM_CHUNK_SIZE, model=None, **kwargs):
+        """Send HTTP GET to the endpoint and decode the response as a stream.
+
+        Unlike :meth:`get`, the response body is never held in memory in
+        full; the elements of the top-level JSON array are decoded and
+        generated one at a time as the body is read.
+
+        :arg str endpoint: The endpoint to send to.
+        :arg int chunk_size: (optional) Number of bytes to read at a time.
+        :arg model: (optional) Result class, such as :class:`ChangeInfo`,
+            to decode the elements into.
+
+        :returns:
+            Generator over the JSON decoded elements.
+
+        :raises:
+            requests.RequestException on timeout or connection error.
+
         """
         args = self.translate_kwargs(**kwargs)
-        response = self.session.delete(self.make_url(endpoint), **args)
+        args["stream"] = True
+        response = self._session_request("GET", self.make_url(endpoint), **args)
+        try:
+            for element in _iter_decode_response(response, chunk_size):
+                yield element if model is None else model.decode(element)
+        finally:
+            response.close()
+
+    def download(
+        self,
+        endpoint,
+        destination,
+        decode_base64=None,
+        chunk_size=STREAM_CHUNK_SIZE,
+        progress=None,
+        **kwargs
+    ):
+        """Send HTTP GET to the endpoint and write the response body to a file.
+
+        The body is read and written `chunk_size` bytes at a time, so that
+        file contents, patches and archives of any size are downloaded with
+        a bounded amount of memory.  For example, to download the sources of
+        a revision as a gzipped tarball:
+
+            rest.download("/changes/1/revisions/current/archive?format=tgz",
+                          "change.tgz")
+
+        :arg str endpoint: The endpoint to send to.
+        :arg destination: The path of the file to write, or a binary file
+            object to write to.  An existing file at the path is only
+            replaced once the download is complete.
+        :arg bool decode_base64: (optional) Whether the body must be decoded
+            from base64.  By default it is decoded if the response has the
+            `X-FYI-Content-Encoding: base64` header, as Gerrit sends file
+            contents and patches.
+        :arg int chunk_size: (optional) Number of bytes to read at a time.
+        :arg progress: (optional) Function called after each chunk with the
+            number of bytes of the body received so far and the total number
+            of bytes, which is None if not known.
 
-        decoded_response = _decode_response(response)
+        :returns:
+            The number of bytes written.
 
-        if return_response:
-            return decoded_response, response
-        return decoded_response
+        :raises:
+            requests.RequestException on timeout, connection error or HTTP
+            error status.
+            ValueError if the body must be decoded but is not valid base64.
+
+        """
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers.setdefault("Accept", "*/*")
+        args = self.translate_kwargs(headers=headers, **kwargs)
+        args["stream"] = True
+        response = self._session_request("GET", self.make_url(endpoint), **args)
+        try:
+            response.raise_for_status()
+            if decode_base64 is None:
+                encoding = response.headers.get("X-FYI-Content-Encoding", "")
+                decode_base64 = encoding.lower() == "base64"
+            chunks = _iter_content(response, chunk_size, progress)
+            if decode_base64:
+                chunks = _iter_base64_decode(chunks)
+            if isinstance(destination, (str, os.PathLike)):
+                return _write_file(destination, chunks)
+            return _write_chunks(destination, chunks)
+        finally:
+            response.close()
+
+    def iter_query(self, endpoint, page_size=100, prefetch=True, model=None, **kwargs):
+        """Iterate over the results of a query, fetching one page at a time.
+
+        Works with the query endpoints for changes, accounts, groups and
+        projects.  Pages are requested with the `n` and `S` parameters, which
+        replace any pagination parameters already given in `endpoint`.  Only
+        endpoints with a single query (i.e. one `q` parameter) are supported.
+
+        :arg str endpoint: The query endpoint, for example
+            `/changes/?q=status:open`.
+        :arg int page_size: (optional) Number of results to request per page.
+        :arg bool prefetch: (optional) If true, the next page is requested in
+            the background while the current page is being consumed.
+        :arg model: (optional) Result class, such as :class:`ChangeInfo`,
+            to decode the results into.
+
+        :returns:
+            Generator over the query results.  For endpoints that return a
+            map, such as the project and group listings, `(name, info)` tuples
+            are generated.
+
+        :raises:
+            requests.RequestException on timeout or connection error.
+
+        """
+        if page_size < 1:
+            raise ValueError("page_size must be a positive integer")
+
+        def fetch(start):
+            return self.get(_paginate_endpoint(endpoint, page_size, start), **kwargs)
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            start = 0
+            page = fetch(start)
+            while True:
+                more = _has_more_results(page, page_size)
+                items = list(page.items()) if isinstance(page, dict) else page
+                start += len(items)
+                pending = None
+                if more and executor:
+                    pending = executor.submit(fetch, start)
+                for item in items:
+                    if model is not None:
+                        if isinstance(item, tuple):
+                            item = (item[0], model.decode(item[1]))
+                        else:
+                            item = model.decode(item)
+                    yield item
+                if not more:
+                    return
+                page = pending.result() if pending else fetch(start)
+        finally:
+            if executor:
+                executor.shutdown(wait=False)
 
     def review(self, change_id, revision, review):
         """Submit a review.
@@ -277,14 +1092,149 @@ class GerritRestAPI(object):
 
         """
         endpoint = "changes/%s/revisions/%s/review" % (change_id, revision)
-        return self.post(
-            endpoint, data=str(review), headers={"Content-Type": "application/json"}
-        )
+        return self.post(endpoint, **_review_kwargs(review))
+
+    def review_many(
+        self,
+        reviews,
+        max_workers=DEFAULT_MAX_WORKERS,
+        ordered=True,
+        coalesce=False,
+        retry_policy=None,
+    ):
+        """Submit several reviews concurrently.
+
+        The reviews are posted from a pool of threads sharing this client's
+        session.  A failed review does not stop the others; its exception is
+        returned in the result instead.
+
+        Reviews are only sent again when the server surely did not process
+        them: when the connection could not be established, or the server
+        answered 429 or 503.  Sending a review twice would post its message
+        and comments twice.
+
+        :arg list reviews: `(change_id, revision, review)` tuples, where
+            `review` is a :class:`GerritReview` or its JSON string.
+        :arg int max_workers: (optional) Maximum number of reviews posted at
+            the same time.
+        :arg bool ordered: (optional) If true, results are generated in the
+            order of `reviews`.  Otherwise they are generated as soon as they
+            complete.
+        :arg bool coalesce: (optional) If true, the :class:`GerritReview`
+            instances for the same change and revision are merged and posted
+            as one review: their messages are joined, their comments
+            combined, and the labels and tag of later reviews take
+            precedence.
+        :arg RetryPolicy retry_policy: (optional) Policy for sending failed
+            reviews again, used when the client has no retry policy of its
+            own.  Defaults to a :class:`RetryPolicy` with default settings.
+
+        :returns:
+            Generator of :class:`ReviewResult`, one for each item of
+            `reviews`.  Coalesced reviews share their result.
+
+        """
+        if self.retry_policy is not None:
+            policy = None
+        else:
+            policy = retry_policy if retry_policy is not None else RetryPolicy()
+
+        items = list(reviews)
+        groups = collections.OrderedDict()
+        for index, (change_id, revision, review) in enumerate(items):
+            if coalesce and isinstance(review, GerritReview):
+                key = (change_id, revision)
+            else:
+                key = index
+            groups.setdefault(key, []).append(index)
+
+        def post(indexes):
+            change_id, revision, _ = items[indexes[0]]
+            review = _merge_reviews([items[index][2] for index in indexes])
+            return self._review_once(change_id, revision, review, policy)
+
+        outcomes = {}
+        next_index = 0
+        results = _run_concurrently(post, groups.values(), max_workers, ordered)
+        for indexes, result, error in results:
+            if not ordered:
+                for index in indexes:
+                    yield ReviewResult(*items[index], result=result, error=error)
+                continue
+            # Coalesced reviews complete together with the first of them, so
+            # later ones are held back until the reviews before are done.
+            for index in indexes:
+                outcomes[index] = (result, error)
+            while next_index in outcomes:
+                result, error = outcomes.pop(next_index)
+                yield ReviewResult(*items[next_index], result=result, error=error)
+                next_index += 1
+
+    def _review_once(self, change_id, revision, review, policy):
+        endpoint = "changes/%s/revisions/%s/review" % (change_id, revision)
+        kwargs = _review_kwargs(review)
+        if policy is None:
+            return self._request("POST", endpoint, **kwargs)
+
+        attempts = []
+
+        def send(remaining):
+            if attempts:
+                # The response of the previous attempt is not decoded, so its
+                # metrics are emitted here.
+                metrics = attempts.pop()
+                if metrics is not None:
+                    self._emit(metrics)
+            if remaining is not None:
+                kwargs["timeout"] = _limit_timeout(kwargs.get("timeout"), remaining)
+            response, metrics = self._send("POST", endpoint, **kwargs)
+            attempts.append(metrics)
+            return response
+
+        response = policy.call("POST", send)
+        return self._decode(response, attempts[-1])
+
+
+def _review_kwargs(review):
+    """Get the arguments of the request posting a review."""
+    if isinstance(review, GerritReview):
+        data = review.to_json()
+        content_type = "application/json;charset=UTF-8"
+    else:
+        data = str(review)
+        content_type = "application/json"
+    return {"data": data, "headers": {"Content-Type": content_type}}
+
+
+def _merge_reviews(reviews):
+    """Merge reviews of the same revision into one.
+
+    Messages are joined into paragraphs, comments are combined, and the
+    labels and tag of later reviews take precedence.
+
+    """
+    if len(reviews) == 1:
+        return reviews[0]
+    merged = GerritReview()
+    for review in reviews:
+        if review.message:
+            if merged.message:
+                merged.message += "\n\n"
+            merged.message += review.message
+        if review.tag:
+            merged.tag = review.tag
+        merged.labels.update(review.labels)
+        for filename, comments in review.comments.items():
+            merged.comments.setdefault(filename, []).extend(comments)
+    return merged
 
 
 class GerritReview(object):
     """Encapsulation of a Gerrit review.
 
+    Comments are grouped by file as they are added, in constant time per
+    comment, so that large reviews can be built efficiently.
+
     :arg str message: (optional) Cover message.
     :arg dict labels: (optional) Review labels.
     :arg dict comments: (optional) Inline comments.
@@ -302,13 +1252,11 @@ class GerritReview(object):
             self.labels = labels
         else:
             self.labels = {}
+        self.comments = {}
         if comments:
             if not isinstance(comments, list):
                 raise ValueError("comments must be a list.")
-            self.comments = {}
             self.add_comments(comments)
-        else:
-            self.comments = {}
 
     def set_message(self, message):
         """Set review cover message.
@@ -342,6 +1290,9 @@ class GerritReview(object):
     def add_comments(self, comments):
         """Add inline comments.
 
+        Comments without a `filename` and a `message`, or without a `line`
+        or a `range`, are ignored.
+
         :arg dict comments: Comments to add.
 
         Usage::
@@ -358,26 +1309,29 @@ class GerritReview(object):
                            'message': 'inline message'}])
 
         """
+        files = self.comments
         for comment in comments:
-            if "filename" and "message" in list(comment.keys()):
-                msg = {}
-                if "range" in list(comment.keys()):
-                    msg = {"range": comment["range"], "message": comment["message"]}
-                elif "line" in list(comment.keys()):
-                    msg = {"line": comment["line"], "message": comment["message"]}
-                else:
-                    continue
-                file_comment = {comment["filename"]: [msg]}
-                if self.comments:
-                    if comment["filename"] in list(self.comments.keys()):
-                        self.comments[comment["filename"]].append(msg)
-                    else:
-                        self.comments.update(file_comment)
-                else:
-                    self.comments.update(file_comment)
+            if "filename" not in comment or "message" not in comment:
+                continue
+            if "range" in comment:
+                msg = {"range": comment["range"], "message": comment["message"]}
+            elif "line" in comment:
+                msg = {"line": comment["line"], "message": comment["message"]}
+            else:
+                continue
+            file_comments = files.get(comment["filename"])
+            if file_comments is None:
+                files[comment["filename"]] = [msg]
+            else:
+                file_comments.append(msg)
+
+    def review_input(self):
+        """Get the review as a `ReviewInput` entity.
 
-    def __str__(self):
-        """Return a string representation."""
+        :returns:
+            A dict with the message, tag, labels and comments that are set.
+
+        """
         review_input = {}
         if self.message:
             review_input.update({"message": self.message})
@@ -387,4 +1341,17 @@ class GerritReview(object):
             review_input.update({"labels": self.labels})
         if self.comments:
             review_input.update({"comments": self.comments})
-        return json.dumps(review_input, sort_keys=True)
+        return review_input
+
+    def to_json(self):
+        """Get the review as a JSON encoded `ReviewInput` entity.
+
+        :returns:
+            The UTF-8 encoded JSON, as `bytes`.
+
+        """
+        return json.dumps(self.review_input(), sort_keys=True).encode("utf-8")
+
+    def __str__(self):
+        """Return a string representation."""
+        return self.to_json().decode("utf-8")
@@ -0,0 +1,194 @@
+# The MIT License
+#
+# Copyright 2026 David Pursehouse. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Connection adapters."""
+
+import socket
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.connection import HTTPConnection, HTTPSConnection
+from requests.packages.urllib3.connectionpool import (
+    HTTPConnectionPool,
+    HTTPSConnectionPool,
+)
+from requests.packages.urllib3.util.retry import Retry
+
+from .retry import _body_rewinder
+
+# Timings of the connection established by the last request in each thread.
+_connection_timings = threading.local()
+
+# Whether the request being sent in each thread has a body that cannot be
+# sent again, and the retry configuration used for it.
+_unrewindable_body = threading.local()
+_NO_RETRIES = Retry(0, read=False)
+
+
+class _TimedConnectionMixin(object):
+    """Record the time taken to connect and to complete the TLS handshake."""
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super(_TimedConnectionMixin, self)._new_conn()
+        finally:
+            _connection_timings.connect = time.perf_counter() - start
+
+    def connect(self):
+        start = time.perf_counter()
+        super(_TimedConnectionMixin, self).connect()
+        connect = getattr(_connection_timings, "connect", None)
+        if connect is not None and isinstance(self, HTTPSConnection):
+            _connection_timings.tls = max(time.perf_counter() - start - connect, 0.0)
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+def _keepalive_socket_options(idle):
+    """Get the socket options enabling TCP keep-alive after `idle` seconds."""
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle))
+    elif hasattr(socket, "TCP_KEEPALIVE"):
+        # macOS
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPALIVE, idle))
+    if hasattr(socket, "TCP_KEEPINTVL"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(idle // 3, 1)))
+    if hasattr(socket, "TCP_KEEPCNT"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3))
+    return options
+
+
+class GerritHTTPAdapter(HTTPAdapter):
+    """HTTP adapter with keep-alive settings and connection pool statistics.
+
+    The time taken to establish a new connection is recorded on each
+    response as `connection_timings`, a `(connect, tls)` tuple in seconds.
+    It is None when an existing connection was reused.
+
+    Requests with a body that cannot be sent again, such as a generator,
+    are not retried.
+
+    :arg int tcp_keepalive: (optional) Number of seconds a connection may be
+        idle before TCP keep-alive probes are sent.  This keeps pooled
+        connections from being silently dropped by firewalls and load
+        balancers between requests.
+
+    All other arguments are passed to `requests.adapters.HTTPAdapter`.
+
+    """
+
+    __attrs__ = HTTPAdapter.__attrs__ + ["tcp_keepalive"]
+
+    def __init__(self, tcp_keepalive=None, **kwargs):
+        """See class docstring."""
+        self.tcp_keepalive = tcp_keepalive
+        super(GerritHTTPAdapter, self).__init__(**kwargs)
+
+    @property
+    def max_retries(self):
+        """Get the retry configuration of the request being sent."""
+        if getattr(_unrewindable_body, "value", False):
+            return _NO_RETRIES
+        return self._max_retries
+
+    @max_retries.setter
+    def max_retries(self, retries):
+        self._max_retries = retries
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        """Initialize the pool manager with the keep-alive socket options."""
+        if self.tcp_keepalive:
+            pool_kwargs["socket_options"] = _keepalive_socket_options(
+                self.tcp_keepalive
+            )
+        super(GerritHTTPAdapter, self).init_poolmanager(
+            connections, maxsize, block, **pool_kwargs
+        )
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        """Send the request, recording the connection timings."""
+        _connection_timings.connect = None
+        _connection_timings.tls = None
+        _unrewindable_body.value = _body_rewinder(request.body) is None
+        try:
+            response = super(GerritHTTPAdapter, self).send(request, **kwargs)
+        finally:
+            _unrewindable_body.value = False
+        if _connection_timings.connect is not None:
+            response.connection_timings = (
+                _connection_timings.connect,
+                _connection_timings.tls,
+            )
+        else:
+            response.connection_timings = None
+        return response
+
+    def pool_stats(self):
+        """Get statistics about the use of the connection pools.
+
+        Only pools that are currently open are counted; statistics of pools
+        discarded because more than `pool_connections` hosts were used are
+        lost.
+
+        :returns:
+            A dict with the number of `pools`, the number of
+            `connections_created`, the number of `requests` sent and the
+            number of requests that were sent on a `connections_reused` from
+            the pool.
+
+        """
+        stats = {"pools": 0, "connections_created": 0, "requests": 0}
+        pools = self.poolmanager.pools
+        for key in list(pools.keys()):
+            try:
+                pool = pools[key]
+            except KeyError:
+                continue
+            stats["pools"] += 1
+            stats["connections_created"] += pool.num_connections
+            stats["requests"] += pool.num_requests
+        stats["connections_reused"] = max(
+            stats["requests"] - stats["connections_created"], 0
+        )
+        return stats
@@ -0,0 +1,306 @@
+# The MIT License
+#
+# Copyright 2026 David Pursehouse. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Asynchronous interface to the Gerrit REST API."""
+
+import asyncio
+
+from requests.auth import HTTPBasicAuth, HTTPDigestAuth
+
+from . import (
+    DEFAULT_HEADERS,
+    STREAM_CHUNK_SIZE,
+    _GerritRestAPIBase,
+    _decode_response,
+    _review_kwargs,
+)
+from .jsonlib import JSONStream, get_json_backend
+from .singleflight import AsyncSingleFlight, request_key
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+def _encode_chunk(chunk):
+    return chunk.encode("utf-8") if isinstance(chunk, str) else bytes(chunk)
+
+
+async def _aiter(chunks):
+    for chunk in chunks:
+        yield _encode_chunk(chunk)
+
+
+async def _aread(f, chunk_size=STREAM_CHUNK_SIZE):
+    """Read a file in chunks without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    while True:
+        chunk = await loop.run_in_executor(None, f.read, chunk_size)
+        if not chunk:
+            return
+        yield _encode_chunk(chunk)
+
+
+def _async_content(data):
+    """Make a request body that can be streamed by the async client.
+
+    File objects are read in chunks and other iterables, such as generators,
+    are iterated over, as the body is sent.
+
+    """
+    if isinstance(data, (bytes, str)) or hasattr(data, "__aiter__"):
+        return data
+    if isinstance(data, (bytearray, memoryview)):
+        return bytes(data)
+    if hasattr(data, "read"):
+        return _aread(data)
+    if hasattr(data, "__iter__"):
+        return _aiter(data)
+    return data
+
+
+def _translate_auth(auth):
+    """Translate a `requests` authentication handler for use with httpx."""
+    if auth is None:
+        return None
+    if isinstance(auth, HTTPDigestAuth):
+        return httpx.DigestAuth(auth.username, auth.password)
+    if isinstance(auth, HTTPBasicAuth):
+        return httpx.BasicAuth(auth.username, auth.password)
+    # Any other handler is called with each request, which works as long
+    # as it only modifies the request headers.
+    return auth
+
+
+class AsyncGerritRestAPI(_GerritRestAPIBase):
+    """Asynchronous interface to the Gerrit REST API.
+
+    Requires the optional `httpx` dependency.  All requests are sent on a
+    single connection pool, so many requests can be in flight concurrently
+    from one event loop.
+
+    :arg str url: The full URL to the server, including the `http(s)://`
+        prefix. If `auth` is given, `url` will be automatically adjusted to
+        include Gerrit's authentication suffix.
+    :arg auth: (optional) Authentication handler.  Must be derived from
+        `requests.auth.AuthBase`.
+    :arg boolean verify: (optional) Set to False to disable verification of
+        SSL certificates.
+    :arg int timeout: (optional) Default timeout in seconds.
+    :arg int max_connections: (optional) Maximum number of concurrent
+        connections to the server.
+    :arg int max_keepalive_connections: (optional) Maximum number of idle
+        connections kept open for reuse.
+    :arg httpx.AsyncBaseTransport transport: (optional) Custom transport.
+    :arg json_backend: (optional) Name of the JSON implementation used to
+        decode responses and encode `json` request bodies, or a
+        :class:`JSONBackend`.  See :class:`GerritRestAPI`.
+    :arg DecodedContentCache decode_cache: (optional) Cache used to skip
+        decoding response content identical to content decoded before.
+    :arg bool coalesce: (optional) If true, concurrent GET requests for the
+        same endpoint and arguments share one request to the server and one
+        decoded result.  Callers must then not modify the results they get.
+
+    :raises: ImportError if `httpx` is not installed.
+
+    """
+
+    def __init__(
+        self,
+        url,
+        auth=None,
+        verify=True,
+        timeout=10,
+        max_connections=100,
+        max_keepalive_connections=20,
+        transport=None,
+        json_backend=None,
+        decode_cache=None,
+        coalesce=False,
+    ):
+        """See class docstring."""
+        if httpx is None:
+            raise ImportError(
+                "httpx is required for AsyncGerritRestAPI; "
+                "install it with `pip install pygerrit2[async]`"
+            )
+        super(AsyncGerritRestAPI, self).__init__(url, auth)
+        self.json_backend = get_json_backend(json_backend)
+        self.decode_cache = decode_cache
+        self._single_flight = AsyncSingleFlight() if coalesce else None
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        if not transport:
+            transport = httpx.AsyncHTTPTransport(
+                verify=verify, limits=limits, retries=5
+            )
+        self.client = httpx.AsyncClient(
+            auth=_translate_auth(self.auth),
+            verify=verify,
+            timeout=timeout,
+            limits=limits,
+            transport=transport,
+            follow_redirects=True,
+        )
+
+    async def __aenter__(self):
+        """Enter the async context manager."""
+        return self
+
+    async def __aexit__(self, *args):
+        """Exit the async context manager, closing the client."""
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the underlying connection pool."""
+        await self.client.aclose()
+
+    def translate_kwargs(self, **kwargs):
+        """Translate kwargs replacing `data` with `json` or `content`.
+
+        As with :class:`GerritRestAPI`, `data` may be a file object or an
+        iterable of `bytes`, such as a generator or a :class:`JSONStream`,
+        to stream the body.
+
+        """
+        local_kwargs = kwargs.copy()
+
+        if "data" in local_kwargs and "json" in local_kwargs:
+            raise ValueError("Cannot use data and json together")
+
+        json_stream = False
+        if "data" in local_kwargs:
+            data = local_kwargs.pop("data")
+            if isinstance(data, dict):
+                local_kwargs.update({"json": data})
+            elif data is not None:
+                json_stream = isinstance(data, JSONStream)
+                local_kwargs.update({"content": _async_content(data)})
+
+        headers = DEFAULT_HEADERS.copy()
+        if "headers" in kwargs:
+            headers.update(kwargs["headers"])
+        if "json" in local_kwargs or json_stream:
+            headers.update({"Content-Type": "application/json;charset=UTF-8"})
+        local_kwargs.update({"headers": headers})
+
+        return local_kwargs
+
+    async def _request(self, method, endpoint, return_response=False, **kwargs):
+        args = self.translate_kwargs(**kwargs)
+        if "json" in args:
+            args["content"] = self.json_backend.dumps(args.pop("json"))
+        response = await self.client.request(method, self.make_url(endpoint), **args)
+
+        decoded_response = _decode_response(
+            response, self.json_backend, self.decode_cache
+        )
+
+        if return_response:
+            return decoded_response, response
+        return decoded_response
+
+    async def get(self, endpoint, return_response=False, **kwargs):
+        """Send HTTP GET to the endpoint.
+
+        :arg str endpoint: The endpoint to send to.
+        :arg bool return_response: If true will also return the response
+
+        :returns:
+            JSON decoded result.
+
+        :raises:
+            httpx.HTTPError on timeout, connection error or HTTP error status.
+
+        """
+        if self._single_flight is None:
+            return await self._request("GET", endpoint, return_response, **kwargs)
+
+        key = request_key(self.make_url(endpoint), **kwargs)
+        decoded_response, response = await self._single_flight.do(
+            key, lambda: self._request("GET", endpoint, True, **kwargs)
+        )
+        if return_response:
+            return decoded_response, response
+        return decoded_response
+
+    async def put(self, endpoint, return_response=False, **kwargs):
+        """Send HTTP PUT to the endpoint.
+
+        :arg str endpoint: The endpoint to send to.
+
+        :returns:
+            JSON decoded result.
+
+        :raises:
+            httpx.HTTPError on timeout, connection error or HTTP error status.
+
+        """
+        return await self._request("PUT", endpoint, return_response, **kwargs)
+
+    async def post(self, endpoint, return_response=False, **kwargs):
+        """Send HTTP POST to the endpoint.
+
+        :arg str endpoint: The endpoint to send to.
+
+        :returns:
+            JSON decoded result.
+
+        :raises:
+            httpx.HTTPError on timeout, connection error or HTTP error status.
+
+        """
+        return await self._request("POST", endpoint, return_response, **kwargs)
+
+    async def delete(self, endpoint, return_response=False, **kwargs):
+        """Send HTTP DELETE to the endpoint.
+
+        :arg str endpoint: The endpoint to send to.
+
+        :returns:
+            JSON decoded result.
+
+        :raises:
+            httpx.HTTPError on timeout, connection error or HTTP error status.
+
+        """
+        return await self._request("DELETE", endpoint, return_response, **kwargs)
+
+    async def review(self, change_id, revision, review):
+        """Submit a review.
+
+        :arg str change_id: The change ID.
+        :arg str revision: The revision.
+        :arg str review: The review details as a :class:`GerritReview`.
+
+        :returns:
+            JSON decoded result.
+
+        :raises:
+            httpx.HTTPError on timeout, connection error or HTTP error status.
+
+        """
+        endpoint = "changes/%s/revisions/%s/review" % (change_id, revision)
+        return await self.post(endpoint, **_review_kwargs(review))
@@ -0,0 +1,233 @@
+# The MIT License
+#
+# Copyright 2026 David Pursehouse. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Batching of change lookups into queries."""
+
+import threading
+from concurrent.futures import Future
+from urllib.parse import unquote
+
+from .models import ChangeInfo
+from .query import ChangeQuery
+
+# Default maximum length of the URL of a batched query.  Servers and
+# proxies commonly reject request lines longer than 8 KiB.
+MAX_URL_LENGTH = 4096
+
+
+class ChangeBatcher(object):
+    """Look up changes in batches.
+
+    Changes requested within `window` seconds of each other are looked up
+    together, with one `change:A OR change:B ...` query per batch instead of
+    one request per change.  A change requested several times in the same
+    window is only looked up once, and all callers get the same
+    :class:`ChangeInfo`.
+
+    Changes are best identified by number or `project~number`.  A Change-Id
+    can match several changes, such as cherry-picks of a change to other
+    branches; as with Gerrit's `GET /changes/{change-id}`, its lookup only
+    succeeds if it matches exactly one change.
+
+    :arg GerritRestAPI rest: The REST API client to send the queries with.
+    :arg float window: (optional) Number of seconds to wait for more
+        lookups after the first one of a batch.
+    :arg str preset: (optional) Preset of options, see :class:`ChangeQuery`.
+    :arg list options: (optional) Additional options.
+    :arg int max_batch: (optional) Maximum number of changes per query.  A
+        batch is sent without waiting for the end of the window when it is
+        reached.  It should not exceed the query limit of the account.
+    :arg int max_url_length: (optional) Maximum length of the URL of a
+        query.  Longer batches are split into several queries, which are
+        sent concurrently.
+
+    """
+
+    def __init__(
+        self,
+        rest,
+        window=0.05,
+        preset="minimal",
+        options=None,
+        max_batch=100,
+        max_url_length=MAX_URL_LENGTH,
+    ):
+        """See class docstring."""
+        # Fail early on unknown presets and options.
+        ChangeQuery(preset=preset, options=options).validate()
+        self.rest = rest
+        self.window = window
+        self.preset = preset
+        self.options = options
+        self.max_batch = max_batch
+        self.max_url_length = max_url_length
+        self.queries = 0
+        self.lookups = 0
+        self._pending = {}
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def submit(self, change):
+        """Request the lookup of a change.
+
+        :arg change: The change number, Change-Id or `project~number`
+            identifier.
+
+        :returns:
+            A `concurrent.futures.Future` of the :class:`ChangeInfo`, which
+            is None if the change was not found.  If a Change-Id matches
+            several changes, the future raises ValueError.
+
+        """
+        key = str(change)
+        with self._lock:
+            self.lookups += 1
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+            future = self._pending[key] = Future()
+            if len(self._pending) >= self.max_batch:
+                batch = self._take()
+            else:
+                batch = None
+                if self._timer is None:
+                    self._timer = threading.Timer(self.window, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if batch:
+            thread = threading.Thread(target=self._fetch, args=(batch,))
+            thread.daemon = True
+            thread.start()
+        return future
+
+    def get(self, change, timeout=None):
+        """Look up a change, waiting for the batch it is part of.
+
+        :arg change: The change number, Change-Id or `project~number`
+            identifier.
+        :arg float timeout: (optional) Maximum time to wait, in seconds.
+
+        :returns:
+            The :class:`ChangeInfo`, or None if the change was not found.
+
+        :raises:
+            requests.RequestException if the query failed.
+            ValueError if a Change-Id matches several changes.
+
+        """
+        return self.submit(change).result(timeout)
+
+    def flush(self):
+        """Send the pending lookups now."""
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._fetch(batch)
+
+    def _take(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = self._pending
+        self._pending = {}
+        return batch
+
+    def _split(self, keys):
+        """Split keys into queries with URLs no longer than the maximum."""
+        chunk = []
+        for key in keys:
+            if chunk and len(self._url(chunk + [key])) > self.max_url_length:
+                yield chunk
+                chunk = []
+            chunk.append(key)
+        if chunk:
+            yield chunk
+
+    def _endpoint(self, keys):
+        query = " OR ".join("change:%s" % key for key in keys)
+        # No limit is set: a Change-Id may match more than one change, and
+        # the extra matches must not push requested changes out of a page.
+        return ChangeQuery(query, preset=self.preset, options=self.options).endpoint()
+
+    def _url(self, keys):
+        return self.rest.make_url(self._endpoint(keys))
+
+    def _fetch(self, batch):
+        chunks = {self._endpoint(keys): keys for keys in self._split(list(batch))}
+        with self._lock:
+            self.queries += len(chunks)
+        results = self.rest.get_many(list(chunks), ordered=False, model=ChangeInfo)
+        for endpoint, changes, error in results:
+            keys = chunks[endpoint]
+            if error is not None:
+                for key in keys:
+                    batch[key].set_exception(error)
+                continue
+            try:
+                changes = changes + self._remaining_pages(endpoint, changes)
+            except Exception as e:
+                for key in keys:
+                    batch[key].set_exception(e)
+                continue
+            _resolve(keys, changes, batch)
+
+    def _remaining_pages(self, endpoint, changes):
+        """Get the changes of the pages following a first page of results."""
+        found = []
+        page = changes
+        while page and page[-1]._more_changes:
+            with self._lock:
+                self.queries += 1
+            start = len(changes) + len(found)
+            page = self.rest.get("%s&S=%d" % (endpoint, start), model=ChangeInfo)
+            found.extend(page)
+        return found
+
+
+def _resolve(keys, changes, batch):
+    """Set the result of each key's future to the change it identifies.
+
+    The project names in the ids of the changes are URL-encoded, so ids are
+    compared decoded.
+
+    """
+    by_id = {}
+    by_change_id = {}
+    for change in changes:
+        for identifier in (str(change._number), change.id, change.triplet_id):
+            if identifier is not None:
+                by_id[unquote(identifier)] = change
+        by_change_id.setdefault(change.change_id, []).append(change)
+    for key in keys:
+        change = by_id.get(unquote(key))
+        if change is None:
+            matches = by_change_id.get(key, [])
+            if len(matches) > 1:
+                batch[key].set_exception(
+                    ValueError(
+                        "Multiple changes found for %s; identify the change "
+                        "by number or project~number" % key
+                    )
+                )
+                continue
+            change = matches[0] if matches else None
+        batch[key].set_result(change)
@@ -0,0 +1,419 @@
+# The MIT License
+#
+# Copyright 2026 David Pursehouse. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Caching of REST API responses."""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger("pygerrit2")
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError("%s is read-only" % type(self).__name__)
+
+
+class FrozenDict(dict):
+    """A dict that cannot be modified.
+
+    A deep copy is a regular, modifiable, dict.
+
+    """
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def copy(self):
+        """Return a shallow, modifiable, copy."""
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        """Return a deep, modifiable, copy."""
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+    def __reduce__(self):
+        """Support pickling."""
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+    """A list that cannot be modified.
+
+    A deep copy is a regular, modifiable, list.
+
+    """
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = clear = extend = insert = pop = remove = reverse = sort = _read_only
+
+    def copy(self):
+        """Return a shallow, modifiable, copy."""
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        """Return a deep, modifiable, copy."""
+        return [copy.deepcopy(value, memo) for value in self]
+
+    def __reduce__(self):
+        """Support pickling."""
+        return (FrozenList, (list(self),))
+
+
+def freeze(value):
+    """Make a read-only version of decoded JSON.
+
+    :arg value: The decoded JSON.
+
+    :returns:
+        The value with all dicts and lists replaced by :class:`FrozenDict`
+        and :class:`FrozenList`.
+
+    """
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+class CacheEntry(object):
+    """A cached, decoded response.
+
+    :arg value: The decoded response.
+    :arg str etag: (optional) The `ETag` header of the response.
+    :arg str last_modified: (optional) The `Last-Modified` header of the
+        response.
+    :arg float expires: (optional) Time, as returned by `time.time()`, after
+        which an entry without validators must be fetched again.
+
+    """
+
+    __slots__ = ("value", "etag", "last_modified", "expires")
+
+    def __init__(self, value, etag=None, last_modified=None, expires=None):
+        """See class docstring."""
+        self.value = value
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    def is_fresh(self):
+        """Check whether the entry can be used without asking the server."""
+        return self.expires is not None and time.time() < self.expires
+
+    def validators(self):
+        """Get the headers that make a request conditional on this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_dict(self):
+        """Get the entry as a JSON serializable dict."""
+        return {
+            "value": self.value,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "expires": self.expires,
+        }
+
+
+class ResponseCache(object):
+    """Cache of decoded GET responses.
+
+    Responses with an `ETag` or `Last-Modified` header are revalidated with
+    a conditional request, and the cached value is reused when the server
+    answers `304 Not Modified`.  Responses without either header are reused
+    without asking the server for `ttl` seconds.  The `Cache-Control` header
+    is not taken into account, since Gerrit marks most responses as not
+    cacheable.
+
+    Entries are kept in memory, evicting the least recently used ones, and
+    optionally also stored on disk so that they survive restarts.  A cache
+    directory must not be shared between clients using different
+    credentials.
+
+    :arg int maxsize: (optional) Maximum number of entries kept in memory.
+    :arg float ttl: (optional) Number of seconds a response without
+        validators is reused for.  If 0, such responses are not cached.
+    :arg str directory: (optional) Directory to store the entries in.
+    :arg list exclude: (optional) Regular expressions matching endpoints
+        that must not be cached.
+    :arg bool copy: (optional) If true, callers get a copy of the cached
+        value so that modifying it does not affect the cache.  If false,
+        callers must not modify the value.
+
+    """
+
+    def __init__(self, maxsize=1024, ttl=0, directory=None, exclude=None, copy=True):
+        """See class docstring."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.directory = directory
+        self.exclude = [re.compile(pattern) for pattern in exclude or []]
+        self.copy = copy
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def __len__(self):
+        """Return the number of entries in memory."""
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(url, params=None, headers=None):
+        """Make the key of the entry for a request.
+
+        :arg str url: The full URL.
+        :arg params: (optional) Query parameters given separately from the URL.
+        :arg dict headers: (optional) Request headers.  Only the `Accept`
+            header is taken into account.
+
+        :returns:
+            The key.
+
+        """
+        accept = (headers or {}).get("Accept", "")
+        if isinstance(params, dict):
+            params = sorted(params.items())
+        return "%s %s %s" % (url, params or "", accept)
+
+    def is_cacheable(self, endpoint):
+        """Check whether responses from the endpoint may be cached.
+
+        :arg str endpoint: The endpoint.
+
+        """
+        return not any(pattern.search(endpoint) for pattern in self.exclude)
+
+    def get_value(self, entry):
+        """Get the value of an entry, copied if necessary.
+
+        :arg CacheEntry entry: The entry.
+
+        """
+        return copy.deepcopy(entry.value) if self.copy else entry.value
+
+    def lookup(self, key):
+        """Look up an entry.
+
+        :arg str key: The key, as returned by :meth:`make_key`.
+
+        :returns:
+            The :class:`CacheEntry`, or None if there is none.
+
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = self._load(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def store(self, key, value, response):
+        """Store a decoded response.
+
+        Nothing is stored if the response has no validators and `ttl` is 0.
+
+        :arg str key: The key, as returned by :meth:`make_key`.
+        :arg value: The decoded response.
+        :arg response: The response.
+
+        :returns:
+            The stored :class:`CacheEntry`, or None.
+
+        """
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        expires = None
+        if not etag and not last_modified:
+            if not self.ttl:
+                return None
+            expires = time.time() + self.ttl
+        entry = CacheEntry(value, etag, last_modified, expires)
+        self._remember(key, entry)
+        self._save(key, entry)
+        return entry
+
+    def invalidate(self, key):
+        """Remove an entry.
+
+        :arg str key: The key, as returned by :meth:`make_key`.
+
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.directory:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        """Remove all entries from memory."""
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _path(self, key):
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name + ".json")
+
+    def _load(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("key") != key:
+            return None
+        entry = CacheEntry(
+            data["value"], data["etag"], data["last_modified"], data["expires"]
+        )
+        if entry.expires is not None and not entry.is_fresh():
+            self.invalidate(key)
+            return None
+        return entry
+
+    def _save(self, key, entry):
+        if not self.directory:
+            return
+        data = entry.to_dict()
+        data["key"] = key
+        fd, path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(path, self._path(key))
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Could not store cache entry: %s", str(e))
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class DecodedContentCache(object):
+    """Cache of decoded JSON keyed on a hash of the raw response content.
+
+    Responses whose content is byte for byte identical to one decoded
+    before, for example polled project lists or account details, are not
+    decoded again.  The same decoded value is shared by all callers, so it
+    is either made read-only or copied for each caller.
+
+    :arg int max_bytes: (optional) Maximum total size of the raw content of
+        the cached entries.  The least recently used entries are evicted when
+        it is exceeded.  The decoded values take more memory than the raw
+        content, typically a few times as much.
+    :arg str mode: (optional) `frozen` to return read-only values, in which
+        all dicts and lists are :class:`FrozenDict` and :class:`FrozenList`,
+        or `copy` to return a deep copy of the value to each caller.
+
+    """
+
+    MODES = ("frozen", "copy")
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, mode="frozen"):
+        """See class docstring."""
+        if mode not in self.MODES:
+            raise ValueError("mode must be one of %s" % ", ".join(self.MODES))
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Return the number of entries."""
+        return len(self._entries)
+
+    def _read(self, value):
+        return copy.deepcopy(value) if self.mode == "copy" else value
+
+    def get_or_decode(self, content, decode):
+        """Get the decoded value of content, decoding it if not cached.
+
+        :arg bytes content: The raw response content.
+        :arg decode: Function returning the decoded content.
+
+        :returns:
+            The decoded value.
+
+        """
+        key = hashlib.blake2b(content, digest_size=20).digest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if entry is not None:
+            return self._read(entry[0])
+
+        value = decode()
+        size = len(content)
+        if size > self.max_bytes:
+            with self._lock:
+                self.misses += 1
+            return value
+        if self.mode == "frozen":
+            value = stored = freeze(value)
+        else:
+            stored = copy.deepcopy(value)
+        with self._lock:
+            self.misses += 1
+            if key not in self._entries:
+                self._entries[key] = (stored, size)
+                self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+        return value
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
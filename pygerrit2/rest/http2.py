@@ -0,0 +1,265 @@
+# The MIT License
+#
+# Copyright 2026 David Pursehouse. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""HTTP/2 connection adapter."""
+
+import datetime
+import io
+import os
+import ssl
+import threading
+import time
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Connection-specific headers, which are not allowed in HTTP/2 requests.
+HOP_BY_HOP_HEADERS = frozenset(
+    ["connection", "keep-alive", "proxy-connection", "transfer-encoding", "upgrade"]
+)
+
+
+def _translate_timeout(timeout):
+    """Translate a `requests` timeout to an `httpx.Timeout`."""
+    if isinstance(timeout, httpx.Timeout):
+        return timeout
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+
+def _translate_verify(verify):
+    """Translate a `requests` CA bundle path to an SSL context."""
+    if not isinstance(verify, str):
+        return verify
+    if os.path.isdir(verify):
+        return ssl.create_default_context(capath=verify)
+    return ssl.create_default_context(cafile=verify)
+
+
+def _translate_error(error, request):
+    """Translate an httpx exception to the equivalent `requests` exception."""
+    if isinstance(error, (httpx.ConnectTimeout, httpx.PoolTimeout)):
+        cls = requests.ConnectTimeout
+    elif isinstance(error, httpx.TimeoutException):
+        cls = requests.ReadTimeout
+    elif isinstance(error, httpx.ProxyError):
+        cls = requests.exceptions.ProxyError
+    elif isinstance(error, httpx.TransportError):
+        cls = requests.ConnectionError
+    else:
+        cls = requests.RequestException
+    return cls(error, request=request)
+
+
+class _StreamReader(io.RawIOBase):
+    """File-like view of the (decoded) content of an httpx response."""
+
+    def __init__(self, response):
+        self._response = response
+        self._chunks = response.iter_bytes()
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def stream(self, chunk_size=None, decode_content=True):
+        """Generate the content in chunks, as `urllib3.HTTPResponse.stream`."""
+        if self._buffer:
+            yield self._buffer
+            self._buffer = b""
+        for chunk in self._chunks:
+            yield chunk
+
+    def release_conn(self):
+        self.close()
+
+    def close(self):
+        self._response.close()
+        super(_StreamReader, self).close()
+
+
+class HTTP2Adapter(BaseAdapter):
+    """Connection adapter sending requests with HTTP/2 through httpx.
+
+    Concurrent requests to the same server are multiplexed over a single
+    connection instead of each using a connection of their own, which
+    saves connections and TLS handshakes when many threads use the client.
+    HTTP/2 is negotiated during the TLS handshake, so plain `http://` URLs
+    use HTTP/1.1.  Use it by passing it as the `adapter` of a
+    :class:`GerritRestAPI`.
+
+    Requires the optional `httpx` dependency with HTTP/2 support, installed
+    with `pip install pygerrit2[http2]`.
+
+    :arg int max_connections: (optional) Maximum number of connections per
+        client.
+    :arg int max_keepalive_connections: (optional) Maximum number of idle
+        connections kept open.
+    :arg bool http2: (optional) Set to False to use HTTP/1.1 only, for
+        comparison.
+    :arg int retries: (optional) Number of times failed connection attempts
+        are retried.
+    :arg httpx.BaseTransport transport: (optional) Custom transport.
+
+    :raises: ImportError if `httpx` is not installed.
+
+    """
+
+    def __init__(
+        self,
+        max_connections=10,
+        max_keepalive_connections=10,
+        http2=True,
+        retries=0,
+        transport=None,
+    ):
+        """See class docstring."""
+        if httpx is None:
+            raise ImportError(
+                "httpx is required for HTTP2Adapter; "
+                "install it with `pip install pygerrit2[http2]`"
+            )
+        super(HTTP2Adapter, self).__init__()
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.http2 = http2
+        self.retries = retries
+        self.transport = transport
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _client(self, verify, cert):
+        """Get the client for the TLS settings, since httpx sets them per client."""
+        key = (verify, cert)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                transport = self.transport
+                if transport is None:
+                    transport = httpx.HTTPTransport(
+                        verify=_translate_verify(verify),
+                        cert=cert,
+                        http2=self.http2,
+                        limits=self.limits,
+                        retries=self.retries,
+                    )
+                client = httpx.Client(
+                    transport=transport, http2=self.http2, limits=self.limits
+                )
+                self._clients[key] = client
+            return client
+
+    def send(
+        self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None
+    ):
+        """Send a prepared request.
+
+        :arg requests.PreparedRequest request: The request.
+        :arg bool stream: (optional) If false, the content is read before
+            returning.
+        :arg timeout: (optional) Timeout in seconds, or a (connect, read)
+            tuple.
+        :arg verify: (optional) Whether to verify the server's certificate,
+            or the path of a CA bundle.
+        :arg cert: (optional) Client certificate.
+        :arg dict proxies: (optional) Not supported; use the environment.
+
+        :returns:
+            The `requests.Response`.
+
+        """
+        if isinstance(cert, list):
+            cert = tuple(cert)
+        client = self._client(verify, cert)
+        headers = [
+            (name, value)
+            for name, value in request.headers.items()
+            if name.lower() not in HOP_BY_HOP_HEADERS
+        ]
+        start = time.perf_counter()
+        try:
+            http_request = client.build_request(
+                request.method,
+                request.url,
+                headers=headers,
+                content=request.body,
+                timeout=_translate_timeout(timeout),
+            )
+            http_response = client.send(http_request, stream=True)
+            elapsed = time.perf_counter() - start
+            if not stream:
+                try:
+                    http_response.read()
+                finally:
+                    http_response.close()
+        except httpx.HTTPError as e:
+            raise _translate_error(e, request)
+        return self.build_response(request, http_response, elapsed, stream)
+
+    def build_response(self, request, http_response, elapsed, stream):
+        """Build a `requests.Response` from an httpx response."""
+        response = requests.Response()
+        response.status_code = http_response.status_code
+        response.headers = CaseInsensitiveDict(http_response.headers.items())
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.reason = http_response.reason_phrase
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.elapsed = datetime.timedelta(seconds=elapsed)
+        response.http_version = http_response.http_version
+        response.connection_timings = None
+        if stream:
+            response.raw = _StreamReader(http_response)
+        else:
+            response.raw = io.BytesIO(http_response.content)
+            response.raw.release_conn = lambda: None
+        return response
+
+    def close(self):
+        """Close the connections."""
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
@@ -0,0 +1,224 @@
+# The MIT License
+#
+# Copyright 2026 David Pursehouse. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Pluggable JSON implementations."""
+
+import json
+
+# Backends tried, in order, when none is explicitly requested.
+AUTO_DETECT_ORDER = ("orjson", "ujson", "simdjson", "json")
+
+
+def _stdlib_loads(content):
+    return json.loads(content)
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj).encode("utf-8")
+
+
+class JSONBackend(object):
+    """A JSON implementation used to decode and encode content.
+
+    Anything that the fast implementation rejects, for example integers
+    that do not fit in 64 bits when encoding, is retried with the standard
+    library so that the results are the same whichever backend is used.
+
+    :arg str name: Name of the backend.
+    :arg loads: Function decoding a `str` or `bytes` document.
+    :arg dumps: Function encoding an object to UTF-8 `bytes`.
+    :arg loads_buffer: (optional) Function decoding a UTF-8 encoded
+        document from a `memoryview`, for implementations that can parse
+        it without a copy.
+
+    """
+
+    def __init__(
+        self, name, loads=_stdlib_loads, dumps=_stdlib_dumps, loads_buffer=None
+    ):
+        """See class docstring."""
+        self.name = name
+        self._loads = loads
+        self._dumps = dumps
+        self._loads_buffer = loads_buffer
+
+    def loads(self, content):
+        """Decode a JSON document.
+
+        :arg content: The document as `str` or `bytes`.
+
+        :returns:
+            The decoded object.
+
+        :raises:
+            ValueError if the content is not valid JSON.
+
+        """
+        try:
+            return self._loads(content)
+        except ValueError:
+            if self._loads is _stdlib_loads:
+                raise
+            return json.loads(content)
+
+    def loads_utf8(self, buffer):
+        """Decode a UTF-8 encoded JSON document held in a buffer.
+
+        The buffer is parsed in place if the implementation supports it,
+        and otherwise decoded to `str` once, without an intermediate copy
+        of the bytes.
+
+        :arg memoryview buffer: The document.
+
+        :returns:
+            The decoded object.
+
+        :raises:
+            ValueError if the content is not valid UTF-8 or JSON.
+
+        """
+        if self._loads_buffer is not None:
+            try:
+                return self._loads_buffer(buffer)
+            except ValueError:
+                pass
+        return self.loads(str(buffer, "utf-8"))
+
+    def dumps(self, obj):
+        """Encode an object as a JSON document.
+
+        :arg obj: The object to encode.
+
+        :returns:
+            The document as UTF-8 encoded `bytes`.
+
+        """
+        try:
+            return self._dumps(obj)
+        except (TypeError, ValueError, OverflowError):
+            if self._dumps is _stdlib_dumps:
+                raise
+            return _stdlib_dumps(obj)
+
+    def __repr__(self):
+        """Return a string representation."""
+        return "<JSONBackend %s>" % self.name
+
+
+class JSONStream(object):
+    """A JSON document encoded incrementally while it is sent.
+
+    Pass it as the `data` of a request to send a large object, such as a
+    `ReviewInput` with many comments or a big batch input, without holding
+    the whole encoded document in memory.  The document is encoded again
+    each time the body is iterated over, so the request can be retried.
+
+    :arg obj: The object to encode.
+    :arg int chunk_size: (optional) Approximate number of bytes per chunk.
+
+    """
+
+    def __init__(self, obj, chunk_size=64 * 1024):
+        """See class docstring."""
+        self.obj = obj
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        """Generate the encoded document in chunks of ASCII `bytes`."""
+        pending = []
+        size = 0
+        for piece in json.JSONEncoder().iterencode(self.obj):
+            pending.append(piece)
+            size += len(piece)
+            if size >= self.chunk_size:
+                yield "".join(pending).encode("ascii")
+                pending = []
+                size = 0
+        if pending:
+            yield "".join(pending).encode("ascii")
+
+
+def _orjson():
+    import orjson
+
+    def dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    return JSONBackend("orjson", orjson.loads, dumps, loads_buffer=orjson.loads)
+
+
+def _ujson():
+    import ujson
+
+    def dumps(obj):
+        return ujson.dumps(
+            obj, ensure_ascii=False, escape_forward_slashes=False
+        ).encode("utf-8")
+
+    return JSONBackend("ujson", ujson.loads, dumps)
+
+
+def _simdjson():
+    import simdjson
+
+    return JSONBackend("simdjson", simdjson.loads, loads_buffer=simdjson.loads)
+
+
+def _stdlib():
+    return JSONBackend("json")
+
+
+_BACKENDS = {
+    "orjson": _orjson,
+    "ujson": _ujson,
+    "simdjson": _simdjson,
+    "json": _stdlib,
+}
+
+
+def get_json_backend(name=None):
+    """Get a JSON backend.
+
+    :arg name: (optional) Name of the backend; one of `orjson`, `ujson`,
+        `simdjson` or `json`.  A :class:`JSONBackend` instance is returned
+        as is.  If not given, the first installed backend in
+        `AUTO_DETECT_ORDER` is used.
+
+    :returns:
+        The :class:`JSONBackend`.
+
+    :raises:
+        ValueError if the name is unknown.
+        ImportError if the named backend is not installed.
+
+    """
+    if isinstance(name, JSONBackend):
+        return name
+    if name is None:
+        for candidate in AUTO_DETECT_ORDER:
+            try:
+                return _BACKENDS[candidate]()
+            except ImportError:
+                continue
+    if name not in _BACKENDS:
+        raise ValueError("Unknown JSON backend: %s" % name)
+    return _BACKENDS[name]()
@@ -0,0 +1,66 @@
+# The MIT License
+#
+# Copyright 2026 David Pursehouse. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Lazy decoding of JSON responses."""
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+
+def lazy_loads(content):
+    """Decode a JSON document lazily.
+
+    The document is validated and indexed in one pass, without creating
+    any Python objects.  Objects and arrays are returned as read-only
+    proxies over the document; a field or element is only converted to a
+    Python object when it is accessed.  This saves most of the time and
+    memory spent decoding wide documents of which only a few fields are
+    read, such as query results read for their `_number` and `status`.
+
+    Object proxies support `obj[key]`, `key in obj`, `len`, iteration over
+    the keys, `get`, `keys`, `values` and `items`; array proxies support
+    indexing, slicing, `len` and iteration.  Both support `at_pointer` to
+    get a nested value by JSON pointer, and `as_dict` or `as_list` to
+    decode them in full.
+
+    Requires the optional `pysimdjson` dependency.
+
+    :arg bytes content: The UTF-8 encoded document.
+
+    :returns:
+        A proxy, or the value if the document is a scalar.
+
+    :raises:
+        ValueError if the document is not valid JSON.
+        ImportError if `pysimdjson` is not installed.
+
+    """
+    if simdjson is None:
+        raise ImportError(
+            "pysimdjson is required for lazy decoding; "
+            "install it with `pip install pygerrit2[lazy]`"
+        )
+    # Parsing a document invalidates the proxies of the document parsed
+    # before with the same parser, so each document gets its own.
+    return simdjson.Parser().parse(content)
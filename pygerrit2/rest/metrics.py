@@ -0,0 +1,293 @@
+# The MIT License
+#
+# Copyright 2026 David Pursehouse. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Request timing and metrics instrumentation."""
+
+import time
+
+# Path segments that are followed by an identifier in Gerrit's REST API.
+COLLECTIONS = frozenset(
+    [
+        "access",
+        "accounts",
+        "branches",
+        "changes",
+        "children",
+        "comments",
+        "commits",
+        "dashboards",
+        "drafts",
+        "edit",
+        "emails",
+        "files",
+        "gpgkeys",
+        "groups",
+        "labels",
+        "members",
+        "messages",
+        "plugins",
+        "projects",
+        "reviewers",
+        "revisions",
+        "robotcomments",
+        "sshkeys",
+        "tags",
+        "votes",
+    ]
+)
+
+
+def endpoint_template(endpoint):
+    """Replace the identifiers in an endpoint with a placeholder.
+
+    For example `/changes/123/revisions/current/review?o=LABELS` becomes
+    `changes/{id}/revisions/{id}/review`.  Templates group the metrics of
+    requests to the same kind of endpoint.
+
+    :arg str endpoint: The endpoint.
+
+    :returns:
+        The endpoint template.
+
+    """
+    segments = endpoint.split("?", 1)[0].strip("/").split("/")
+    template = []
+    previous = None
+    for segment in segments:
+        if previous in COLLECTIONS and segment:
+            template.append("{id}")
+            previous = None
+        else:
+            template.append(segment)
+            previous = segment
+    return "/".join(template)
+
+
+class RequestMetrics(object):
+    """Metrics of a single request, passed to the client's request hooks.
+
+    All durations are in seconds, and are None when not known; `connect`
+    and `tls` are only known when a new connection was established by a
+    :class:`GerritHTTPAdapter`.
+
+    :ivar str method: The HTTP method.
+    :ivar str endpoint: The endpoint.
+    :ivar str endpoint_template: The endpoint with identifiers replaced, see
+        :func:`endpoint_template`.
+    :ivar float start_time: Time the request was started, as returned by
+        `time.time()`.
+    :ivar int status: The HTTP status code, or None if there was no response.
+    :ivar int bytes: Size of the (decompressed) response content.
+    :ivar float connect: Time to resolve the host name and open the TCP
+        connection.
+    :ivar float tls: Time of the TLS handshake.
+    :ivar float ttfb: Time from sending the request until the response
+        headers were received, including `connect` and `tls`.
+    :ivar float download: Time to receive the response content.
+    :ivar float total: Time to send the request and receive the response,
+        excluding `decode`.
+    :ivar float decode: Time to decode the response content.
+    :ivar int retries: Number of times the request was retried.
+    :ivar Exception error: The exception raised by the request, if any.
+
+    """
+
+    __slots__ = (
+        "method",
+        "endpoint",
+        "endpoint_template",
+        "start_time",
+        "status",
+        "bytes",
+        "connect",
+        "tls",
+        "ttfb",
+        "download",
+        "total",
+        "decode",
+        "retries",
+        "error",
+    )
+
+    def __init__(self, method, endpoint):
+        """See class docstring."""
+        self.method = method
+        self.endpoint = endpoint
+        self.endpoint_template = endpoint_template(endpoint)
+        self.start_time = time.time()
+        self.status = None
+        self.bytes = None
+        self.connect = None
+        self.tls = None
+        self.ttfb = None
+        self.download = None
+        self.total = None
+        self.decode = None
+        self.retries = 0
+        self.error = None
+
+    def record_response(self, response, total):
+        """Record the metrics of a response.
+
+        :arg requests.Response response: The response.
+        :arg float total: Time it took to get the response.
+
+        """
+        self.total = total
+        self.status = response.status_code
+        self.bytes = len(response.content)
+        if response.elapsed:
+            self.ttfb = response.elapsed.total_seconds()
+            self.download = max(total - self.ttfb, 0.0)
+        timings = getattr(response, "connection_timings", None)
+        if timings:
+            self.connect, self.tls = timings
+        retries = getattr(response.raw, "retries", None)
+        if retries is not None and retries.history:
+            self.retries = len(retries.history)
+        self.retries += getattr(response, "retry_count", 0)
+
+    def __repr__(self):
+        """Return a string representation."""
+        return "<RequestMetrics %s %s status=%s total=%s>" % (
+            self.method,
+            self.endpoint_template,
+            self.status,
+            self.total,
+        )
+
+
+class PrometheusHook(object):
+    """Request hook recording metrics with `prometheus_client`.
+
+    Records the counters `<namespace>_requests_total`,
+    `<namespace>_response_bytes_total` and `<namespace>_retries_total`, and
+    the histograms `<namespace>_request_duration_seconds` and
+    `<namespace>_decode_duration_seconds`, labelled by method and endpoint
+    template.
+
+    :arg registry: (optional) The `prometheus_client` registry to register
+        the metrics in.  Defaults to the global registry.
+    :arg str namespace: (optional) Prefix of the metric names.
+
+    :raises: ImportError if `prometheus_client` is not installed.
+
+    """
+
+    def __init__(self, registry=None, namespace="pygerrit2"):
+        """See class docstring."""
+        from prometheus_client import REGISTRY, Counter, Histogram
+
+        registry = registry if registry is not None else REGISTRY
+        labels = ["method", "endpoint"]
+        self.requests = Counter(
+            "requests_total",
+            "Gerrit REST API requests",
+            labels + ["status"],
+            namespace=namespace,
+            registry=registry,
+        )
+        self.response_bytes = Counter(
+            "response_bytes_total",
+            "Gerrit REST API response content bytes",
+            labels,
+            namespace=namespace,
+            registry=registry,
+        )
+        self.retries = Counter(
+            "retries_total",
+            "Gerrit REST API request retries",
+            labels,
+            namespace=namespace,
+            registry=registry,
+        )
+        self.duration = Histogram(
+            "request_duration_seconds",
+            "Gerrit REST API request duration",
+            labels,
+            namespace=namespace,
+            registry=registry,
+        )
+        self.decode_duration = Histogram(
+            "decode_duration_seconds",
+            "Gerrit REST API response decoding duration",
+            labels,
+            namespace=namespace,
+            registry=registry,
+        )
+
+    def __call__(self, metrics):
+        """Record the metrics of a request."""
+        labels = (metrics.method, metrics.endpoint_template)
+        status = str(metrics.status) if metrics.status else "error"
+        self.requests.labels(*(labels + (status,))).inc()
+        if metrics.bytes:
+            self.response_bytes.labels(*labels).inc(metrics.bytes)
+        if metrics.retries:
+            self.retries.labels(*labels).inc(metrics.retries)
+        if metrics.total is not None:
+            self.duration.labels(*labels).observe(metrics.total)
+        if metrics.decode is not None:
+            self.decode_duration.labels(*labels).observe(metrics.decode)
+
+
+class OpenTelemetryHook(object):
+    """Request hook recording each request as an OpenTelemetry span.
+
+    :arg tracer: (optional) The tracer to create spans with.  Defaults to a
+        tracer from the global tracer provider.
+
+    :raises: ImportError if `opentelemetry-api` is not installed.
+
+    """
+
+    def __init__(self, tracer=None):
+        """See class docstring."""
+        from opentelemetry import trace
+
+        self._trace = trace
+        self.tracer = tracer or trace.get_tracer("pygerrit2")
+
+    def __call__(self, metrics):
+        """Record the metrics of a request as a span."""
+        start = int(metrics.start_time * 1e9)
+        duration = (metrics.total or 0.0) + (metrics.decode or 0.0)
+        span = self.tracer.start_span(
+            "%s %s" % (metrics.method, metrics.endpoint_template),
+            kind=self._trace.SpanKind.CLIENT,
+            start_time=start,
+        )
+        span.set_attribute("http.request.method", metrics.method)
+        span.set_attribute("pygerrit2.endpoint", metrics.endpoint)
+        if metrics.status is not None:
+            span.set_attribute("http.response.status_code", metrics.status)
+        if metrics.retries:
+            span.set_attribute("http.request.resend_count", metrics.retries)
+        for name in ("bytes", "connect", "tls", "ttfb", "download", "decode"):
+            value = getattr(metrics, name)
+            if value is not None:
+                span.set_attribute("pygerrit2.%s" % name, value)
+        if metrics.error is not None:
+            span.record_exception(metrics.error)
+        if metrics.error is not None or (metrics.status or 0) >= 400:
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR))
+        span.end(end_time=start + int(duration * 1e9))
@@ -0,0 +1,547 @@
+# The MIT License
+#
+# Copyright 2026 David Pursehouse. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Typed, memory efficient result objects.
+
+The classes in this module hold the fields of Gerrit's JSON entities in
+slots instead of dicts, intern strings that are repeated across results,
+such as project and branch names, and decode nested entities only when
+they are first accessed.  Holding many results as objects takes several
+times less memory than holding the decoded JSON.  Nested entities that
+are decoded lazily take as much memory as the decoded JSON until they are
+accessed.
+
+"""
+
+import sys
+import weakref
+
+from .cache import FrozenDict, FrozenList, _read_only, freeze
+
+# Empty lists and dicts are replaced by these shared, read-only, instances.
+_EMPTY_LIST = FrozenList()
+_EMPTY_DICT = FrozenDict()
+
+# Values and accounts shared between results, by their contents.
+_shared = weakref.WeakValueDictionary()
+
+
+def _hashable(value):
+    """Get a hashable key equal for all equal JSON values."""
+    if isinstance(value, dict):
+        return (dict, tuple(sorted((k, _hashable(v)) for k, v in value.items())))
+    if isinstance(value, list):
+        return (list, tuple(_hashable(item) for item in value))
+    return value
+
+
+def _share(value):
+    """Get a shared, read-only, value equal to the decoded JSON value."""
+    key = _hashable(value)
+    shared = _shared.get(key)
+    if shared is None:
+        shared = _shared.setdefault(key, freeze(value))
+    return shared
+
+
+class _Lazy(object):
+    """Descriptor of a field decoded on first access.
+
+    The raw JSON value is kept in the `_raw_<name>` slot until the field is
+    accessed, and the decoded value in the `_lazy_<name>` slot afterwards.
+
+    """
+
+    __slots__ = ("decode", "raw", "decoded")
+
+    def __init__(self, decode):
+        self.decode = decode
+
+    def __set_name__(self, owner, name):
+        self.raw = "_raw_" + name
+        self.decoded = "_lazy_" + name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            return getattr(instance, self.decoded)
+        except AttributeError:
+            pass
+        try:
+            raw = getattr(instance, self.raw)
+        except AttributeError:
+            return None
+        value = self.decode(raw) if raw is not None else None
+        setattr(instance, self.decoded, value)
+        try:
+            delattr(instance, self.raw)
+        except AttributeError:
+            # Decoded concurrently by another thread.
+            pass
+        return value
+
+    def __set__(self, instance, value):
+        setattr(instance, self.raw, value)
+        try:
+            delattr(instance, self.decoded)
+        except AttributeError:
+            pass
+
+
+def _lazy_slots(*names):
+    """Get the slots needed by the lazy fields with the given names."""
+    return tuple(prefix + name for name in names for prefix in ("_raw_", "_lazy_"))
+
+
+def _intern_keys(mapping, decode):
+    """Decode the values of a mapping, interning its keys."""
+    return {sys.intern(key): decode(value) for key, value in mapping.items()}
+
+
+class _Model(object):
+    """Base class of the result objects.
+
+    Subclasses list the `FIELDS` that are usually set in `__slots__`, the
+    other known fields in `OTHER_FIELDS`, the string fields to intern in
+    `INTERNED`, the fields whose values are often repeated across results
+    in `SHARED`, and the `LAZY` fields, which have a :class:`_Lazy`
+    descriptor.  Known fields that are not set are None.  Other fields,
+    including those added by plugins, are kept in a dict and can be
+    accessed as attributes too.
+
+    Empty lists and dicts, and the values of `SHARED` fields, are replaced
+    by read-only :class:`FrozenList` and :class:`FrozenDict` instances
+    shared between results.
+
+    """
+
+    __slots__ = ("_extra",)
+
+    FIELDS = ()
+    OTHER_FIELDS = ()
+    INTERNED = frozenset()
+    SHARED = frozenset()
+    LAZY = ()
+
+    def __init__(self, data):
+        """See class docstring."""
+        set_field = object.__setattr__
+        extra = None
+        slotted = self._SLOTTED
+        interned = self.INTERNED
+        shared = self.SHARED
+        for key, value in data.items():
+            value_type = type(value)
+            if value_type is str:
+                if key in interned:
+                    value = sys.intern(value)
+            elif not value:
+                if value_type is list:
+                    value = _EMPTY_LIST
+                elif value_type is dict:
+                    value = _EMPTY_DICT
+            elif key in shared:
+                value = _share(value)
+            if key in slotted:
+                set_field(self, key, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        set_field(self, "_extra", extra)
+
+    def __init_subclass__(cls, **kwargs):
+        """Index the fields of the subclass."""
+        super(_Model, cls).__init_subclass__(**kwargs)
+        cls._SLOTTED = frozenset(cls.FIELDS + cls.LAZY)
+        cls._KNOWN = cls._SLOTTED | frozenset(cls.OTHER_FIELDS)
+
+    @classmethod
+    def decode(cls, value):
+        """Decode JSON into result objects.
+
+        :arg value: A decoded JSON object, or a list, possibly nested, of
+            objects.
+
+        :returns:
+            The result object, or a list of result objects.
+
+        """
+        if isinstance(value, list):
+            return [cls.decode(item) for item in value]
+        if value is None:
+            return None
+        return cls(value)
+
+    def __getattr__(self, name):
+        """Get a field that is not set, or that has no slot."""
+        if name != "_extra":
+            extra = self._extra
+            if extra and name in extra:
+                return extra[name]
+            if name in self._KNOWN:
+                return None
+        raise AttributeError(
+            "%r object has no attribute %r" % (type(self).__name__, name)
+        )
+
+    def get(self, name, default=None):
+        """Get a field, like `dict.get`.
+
+        :arg str name: The name of the field.
+        :arg default: (optional) Value returned if the field is not set.
+
+        """
+        value = getattr(self, name, None)
+        return default if value is None else value
+
+    def to_dict(self):
+        """Convert back to decoded JSON."""
+        data = {}
+        for name in self.FIELDS:
+            try:
+                data[name] = _to_json(object.__getattribute__(self, name))
+            except AttributeError:
+                pass
+        for name in self.LAZY:
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = _to_json(value)
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    def __repr__(self):
+        """Return a string representation."""
+        identity = self._identity()
+        if identity is None:
+            return "<%s>" % type(self).__name__
+        return "<%s %s>" % (type(self).__name__, identity)
+
+    def _identity(self):
+        return None
+
+
+def _to_json(value):
+    if isinstance(value, _Model):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {key: _to_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_to_json(item) for item in value]
+    return value
+
+
+class AccountInfo(_Model):
+    """An AccountInfo entity.
+
+    Accounts with the same fields are decoded to the same object, so that
+    the accounts repeated across many results take memory only once.  As
+    they are shared, accounts are read-only.
+
+    """
+
+    FIELDS = ("_account_id", "name", "display_name", "email", "username")
+    OTHER_FIELDS = (
+        "secondary_emails",
+        "avatars",
+        "status",
+        "inactive",
+        "tags",
+        "_more_accounts",
+    )
+    INTERNED = frozenset(["name", "display_name", "email", "username", "status"])
+    SHARED = frozenset(["avatars", "secondary_emails", "tags"])
+    __slots__ = FIELDS + ("__weakref__",)
+
+    @classmethod
+    def decode(cls, value):
+        """Decode JSON into accounts, reusing equal accounts decoded before.
+
+        :arg value: A decoded JSON object, or a list of objects.
+
+        :returns:
+            The account, or a list of accounts.
+
+        """
+        if isinstance(value, list):
+            return [cls.decode(item) for item in value]
+        if value is None:
+            return None
+        key = (cls, _hashable(value))
+        account = _shared.get(key)
+        if account is None:
+            account = _shared.setdefault(key, cls(value))
+        return account
+
+    __setattr__ = __delattr__ = _read_only
+
+    def __reduce__(self):
+        """Support copying and pickling."""
+        return (type(self), (self.to_dict(),))
+
+    def _identity(self):
+        return self._account_id
+
+
+class ApprovalInfo(AccountInfo):
+    """An ApprovalInfo entity: an AccountInfo with the vote on a label."""
+
+    __slots__ = ("value", "date")
+    FIELDS = AccountInfo.FIELDS + __slots__
+    OTHER_FIELDS = AccountInfo.OTHER_FIELDS + (
+        "permitted_voting_range",
+        "tag",
+        "post_submit",
+    )
+    INTERNED = AccountInfo.INTERNED | frozenset(["tag"])
+
+
+class LabelInfo(_Model):
+    """A LabelInfo entity.
+
+    The votes in `all` are decoded on first access.
+
+    """
+
+    FIELDS = ("approved", "rejected", "recommended", "disliked", "value")
+    OTHER_FIELDS = (
+        "optional",
+        "description",
+        "default_value",
+        "blocking",
+        "values",
+    )
+    SHARED = frozenset(["values"])
+    LAZY = ("all",)
+    __slots__ = FIELDS + _lazy_slots(*LAZY)
+
+    all = _Lazy(ApprovalInfo.decode)
+
+    def __init__(self, data):
+        """See class docstring."""
+        super(LabelInfo, self).__init__(data)
+        for name in ("approved", "rejected", "recommended", "disliked"):
+            account = data.get(name)
+            if account is not None:
+                setattr(self, name, AccountInfo.decode(account))
+
+
+class CommentInfo(_Model):
+    """A CommentInfo entity."""
+
+    FIELDS = (
+        "id",
+        "patch_set",
+        "path",
+        "side",
+        "line",
+        "range",
+        "in_reply_to",
+        "message",
+        "updated",
+        "author",
+        "unresolved",
+        "commit_id",
+    )
+    OTHER_FIELDS = (
+        "parent",
+        "tag",
+        "change_message_id",
+        "context_lines",
+        "source_content_type",
+        "fix_suggestions",
+    )
+    INTERNED = frozenset(["path", "side", "tag", "commit_id"])
+    __slots__ = FIELDS
+
+    def __init__(self, data):
+        """See class docstring."""
+        super(CommentInfo, self).__init__(data)
+        if data.get("author") is not None:
+            self.author = AccountInfo.decode(data["author"])
+
+    def _identity(self):
+        return self.id
+
+    @classmethod
+    def decode_map(cls, value):
+        """Decode a map of file paths to lists of comments.
+
+        :arg dict value: The decoded JSON, as returned by the comments
+            endpoints.
+
+        :returns:
+            A dict of interned file paths to lists of :class:`CommentInfo`.
+
+        """
+        return _intern_keys(value, cls.decode)
+
+
+class RevisionInfo(_Model):
+    """A RevisionInfo entity.
+
+    The `commit` and `files` are kept as decoded JSON.
+
+    """
+
+    FIELDS = (
+        "kind",
+        "_number",
+        "created",
+        "uploader",
+        "ref",
+        "fetch",
+        "commit",
+        "files",
+    )
+    OTHER_FIELDS = (
+        "real_uploader",
+        "actions",
+        "reviewed",
+        "commit_with_footers",
+        "push_certificate",
+        "description",
+        "branch",
+    )
+    INTERNED = frozenset(["kind", "branch"])
+    SHARED = frozenset(["actions"])
+    __slots__ = FIELDS
+
+    def __init__(self, data):
+        """See class docstring."""
+        super(RevisionInfo, self).__init__(data)
+        if data.get("uploader") is not None:
+            self.uploader = AccountInfo.decode(data["uploader"])
+
+    def _identity(self):
+        return self._number
+
+
+def _reviewers(value):
+    return _intern_keys(value, AccountInfo.decode)
+
+
+def _labels(value):
+    return _intern_keys(value, LabelInfo)
+
+
+def _revisions(value):
+    return {key: RevisionInfo(revision) for key, revision in value.items()}
+
+
+class ChangeInfo(_Model):
+    """A ChangeInfo entity.
+
+    The `reviewers`, `labels` and `revisions` are decoded on first access.
+    The `owner` and `submitter` are decoded right away, since accounts are
+    shared between results.  Other nested fields, such as `messages`, are
+    kept as decoded JSON.
+
+    """
+
+    FIELDS = (
+        "id",
+        "triplet_id",
+        "project",
+        "branch",
+        "topic",
+        "attention_set",
+        "removed_from_attention_set",
+        "hashtags",
+        "change_id",
+        "subject",
+        "status",
+        "created",
+        "updated",
+        "submitted",
+        "submit_type",
+        "mergeable",
+        "insertions",
+        "deletions",
+        "total_comment_count",
+        "unresolved_comment_count",
+        "has_review_started",
+        "meta_rev_id",
+        "_number",
+        "virtual_id_number",
+        "owner",
+        "submitter",
+        "requirements",
+        "submit_records",
+        "submit_requirements",
+        "messages",
+        "current_revision",
+        "current_revision_number",
+        "_more_changes",
+    )
+    OTHER_FIELDS = (
+        "starred",
+        "reviewed",
+        "submittable",
+        "actions",
+        "permitted_labels",
+        "removable_reviewers",
+        "removable_labels",
+        "pending_reviewers",
+        "reviewer_updates",
+        "tracking_ids",
+        "problems",
+        "is_private",
+        "work_in_progress",
+        "revert_of",
+        "submission_id",
+        "cherry_pick_of_change",
+        "cherry_pick_of_patch_set",
+        "contains_git_conflicts",
+        "custom_keyed_values",
+    )
+    INTERNED = frozenset(["project", "branch", "topic", "status", "submit_type"])
+    SHARED = frozenset(
+        [
+            "actions",
+            "hashtags",
+            "permitted_labels",
+            "removable_labels",
+            "requirements",
+            "submit_records",
+            "submit_requirements",
+        ]
+    )
+    LAZY = ("reviewers", "labels", "revisions")
+    __slots__ = FIELDS + _lazy_slots(*LAZY)
+
+    reviewers = _Lazy(_reviewers)
+    labels = _Lazy(_labels)
+    revisions = _Lazy(_revisions)
+
+    def __init__(self, data):
+        """See class docstring."""
+        super(ChangeInfo, self).__init__(data)
+        for name in ("owner", "submitter"):
+            account = data.get(name)
+            if account is not None:
+                setattr(self, name, AccountInfo.decode(account))
+
+    def _identity(self):
+        return self._number
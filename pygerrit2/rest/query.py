@@ -0,0 +1,398 @@
+# The MIT License
+#
+# Copyright 2026 David Pursehouse. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Builders of query endpoints."""
+
+from urllib.parse import quote
+
+
+class _QueryBuilder(object):
+    """Base class of the query builders.
+
+    Subclasses define the `PATH` of the endpoint, the `OPTIONS` that may be
+    requested, mapped to their query parameter, and the `PRESETS` of
+    options.
+
+    """
+
+    PATH = None
+    OPTIONS = {}
+    PRESETS = {}
+
+    def __init__(self, preset="minimal", options=None, limit=None, start=None):
+        """See class docstring."""
+        if preset not in self.PRESETS:
+            raise ValueError(
+                "Unknown preset %r; must be one of %s"
+                % (preset, ", ".join(sorted(self.PRESETS)))
+            )
+        self.preset = preset
+        self.options = list(self.PRESETS[preset])
+        self.limit = None
+        self.start = None
+        self.add_options(*(options or []))
+        self.set_limit(limit)
+        self.set_start(start)
+
+    def add_options(self, *options):
+        """Add options to request additional fields.
+
+        :arg str options: Names of the options, case insensitive.
+
+        :returns:
+            The builder.
+
+        :raises:
+            ValueError if an option is not known.
+
+        """
+        for option in options:
+            name = option.upper()
+            if name not in self.OPTIONS:
+                raise ValueError("Unknown option %r for %s" % (option, self.PATH))
+            if name not in self.options:
+                self.options.append(name)
+        return self
+
+    def set_limit(self, limit):
+        """Set the maximum number of results.
+
+        :arg int limit: The limit, or None for the server's default.
+
+        :returns:
+            The builder.
+
+        """
+        if limit is not None and (not isinstance(limit, int) or limit < 1):
+            raise ValueError("limit must be a positive integer")
+        self.limit = limit
+        return self
+
+    def set_start(self, start):
+        """Set the number of results to skip.
+
+        :arg int start: The number of results to skip, or None.
+
+        :returns:
+            The builder.
+
+        """
+        if start is not None and (not isinstance(start, int) or start < 0):
+            raise ValueError("start must be a non-negative integer")
+        self.start = start
+        return self
+
+    def validate(self):
+        """Check that the options can be used together.
+
+        :raises:
+            ValueError if they cannot.
+
+        """
+
+    def params(self):
+        """Get the query parameters, as a list of (name, value) tuples.
+
+        A value of None means a parameter without value.
+
+        """
+        params = []
+        for option in self.options:
+            name, value = self.OPTIONS[option]
+            params.append((name, value))
+        if self.limit is not None:
+            params.append(("n", str(self.limit)))
+        if self.start:
+            params.append(("S", str(self.start)))
+        return params
+
+    def endpoint(self):
+        """Build the endpoint.
+
+        :returns:
+            The endpoint, to pass to :meth:`GerritRestAPI.get`.
+
+        :raises:
+            ValueError if the options cannot be used together.
+
+        """
+        self.validate()
+        params = []
+        for name, value in self.params():
+            if value is None:
+                params.append(name)
+            else:
+                params.append("%s=%s" % (name, quote(value, safe=":/")))
+        if not params:
+            return self.PATH
+        return self.PATH + "?" + "&".join(params)
+
+    def __str__(self):
+        """Return the endpoint."""
+        return self.endpoint()
+
+
+def _o_options(*names):
+    return {name: ("o", name) for name in names}
+
+
+# Options that only have an effect together with CURRENT_REVISION or
+# ALL_REVISIONS.
+REVISION_OPTIONS = frozenset(
+    [
+        "ALL_COMMITS",
+        "ALL_FILES",
+        "COMMIT_FOOTERS",
+        "CURRENT_COMMIT",
+        "CURRENT_FILES",
+        "DOWNLOAD_COMMANDS",
+        "PUSH_CERTIFICATES",
+    ]
+)
+
+
+class ChangeQuery(_QueryBuilder):
+    """Builder of `/changes/` query endpoints.
+
+    Each option makes the server compute and send more data, so the
+    `minimal` preset, which requests no options, is the default.  The
+    presets are:
+
+    - `minimal`: the basic ChangeInfo fields only.
+    - `review`: labels with the votes of each reviewer, account details,
+      the current revision and whether the change is submittable.
+    - `ci`: the current revision and commit, labels and submit
+      requirements.
+    - `audit`: all revisions and commits, labels with votes, account
+      details, messages and reviewer updates.
+
+    :arg str query: (optional) The query, for example `status:open`.
+    :arg str preset: (optional) Name of the preset of options.
+    :arg list options: (optional) Additional options, for example
+        `MESSAGES`.  See the `o` parameter in Gerrit's documentation.
+    :arg int limit: (optional) Maximum number of results.
+    :arg int start: (optional) Number of results to skip.
+    :arg bool skip_visibility: (optional) If true, changes not visible to the
+        caller are included.  Requires the Administrate Server capability.
+
+    :raises:
+        ValueError if the preset or an option is not known.
+
+    """
+
+    PATH = "/changes/"
+    OPTIONS = _o_options(
+        "ALL_COMMITS",
+        "ALL_FILES",
+        "ALL_REVISIONS",
+        "CHANGE_ACTIONS",
+        "CHECK",
+        "COMMIT_FOOTERS",
+        "CURRENT_ACTIONS",
+        "CURRENT_COMMIT",
+        "CURRENT_FILES",
+        "CURRENT_REVISION",
+        "CUSTOM_KEYED_VALUES",
+        "DETAILED_ACCOUNTS",
+        "DETAILED_LABELS",
+        "DOWNLOAD_COMMANDS",
+        "LABELS",
+        "MESSAGES",
+        "PARENTS",
+        "PUSH_CERTIFICATES",
+        "REVIEWED",
+        "REVIEWER_UPDATES",
+        "SKIP_DIFFSTAT",
+        "SKIP_MERGEABLE",
+        "SUBMITTABLE",
+        "SUBMIT_REQUIREMENTS",
+        "TRACKING_IDS",
+        "WEB_LINKS",
+    )
+    PRESETS = {
+        "minimal": (),
+        "review": (
+            "DETAILED_LABELS",
+            "DETAILED_ACCOUNTS",
+            "CURRENT_REVISION",
+            "SUBMITTABLE",
+        ),
+        "ci": ("CURRENT_REVISION", "CURRENT_COMMIT", "LABELS", "SUBMIT_REQUIREMENTS"),
+        "audit": (
+            "ALL_REVISIONS",
+            "ALL_COMMITS",
+            "DETAILED_LABELS",
+            "DETAILED_ACCOUNTS",
+            "MESSAGES",
+            "REVIEWER_UPDATES",
+        ),
+    }
+
+    def __init__(
+        self,
+        query=None,
+        preset="minimal",
+        options=None,
+        limit=None,
+        start=None,
+        skip_visibility=False,
+    ):
+        """See class docstring."""
+        super(ChangeQuery, self).__init__(preset, options, limit, start)
+        self.query = query
+        self.skip_visibility = skip_visibility
+
+    def validate(self):
+        """Check that the options can be used together.
+
+        :raises:
+            ValueError if an option that needs the revisions is requested
+            without `CURRENT_REVISION` or `ALL_REVISIONS`.
+
+        """
+        if "CURRENT_REVISION" in self.options or "ALL_REVISIONS" in self.options:
+            return
+        needing = sorted(REVISION_OPTIONS.intersection(self.options))
+        if needing:
+            raise ValueError(
+                "%s require CURRENT_REVISION or ALL_REVISIONS" % ", ".join(needing)
+            )
+
+    def params(self):
+        """Get the query parameters, as a list of (name, value) tuples."""
+        params = super(ChangeQuery, self).params()
+        if self.query:
+            params.insert(0, ("q", self.query))
+        if self.skip_visibility:
+            params.append(("skip-visibility", None))
+        return params
+
+
+class AccountQuery(_QueryBuilder):
+    """Builder of `/accounts/` query endpoints.
+
+    The presets are `minimal`, with the account ID only, `review` and `ci`,
+    with the name, email address and username, and `audit`, which adds all
+    email addresses and requires the Modify Account capability.
+
+    :arg str query: The query, for example `name:john`.
+    :arg str preset: (optional) Name of the preset of options.
+    :arg list options: (optional) Additional options: `DETAILS` or
+        `ALL_EMAILS`.
+    :arg int limit: (optional) Maximum number of results.
+    :arg int start: (optional) Number of results to skip.
+
+    :raises:
+        ValueError if the query is empty, or the preset or an option is not
+        known.
+
+    """
+
+    PATH = "/accounts/"
+    OPTIONS = _o_options("ALL_EMAILS", "DETAILS")
+    PRESETS = {
+        "minimal": (),
+        "review": ("DETAILS",),
+        "ci": ("DETAILS",),
+        "audit": ("DETAILS", "ALL_EMAILS"),
+    }
+
+    def __init__(self, query, preset="minimal", options=None, limit=None, start=None):
+        """See class docstring."""
+        if not query:
+            raise ValueError("query is required")
+        super(AccountQuery, self).__init__(preset, options, limit, start)
+        self.query = query
+
+    def params(self):
+        """Get the query parameters, as a list of (name, value) tuples."""
+        return [("q", self.query)] + super(AccountQuery, self).params()
+
+
+class ProjectQuery(_QueryBuilder):
+    """Builder of `/projects/` list endpoints.
+
+    The presets are `minimal` and `ci`, with the project names and IDs only,
+    `review`, which adds the descriptions, and `audit`, which also lists
+    hidden projects and requires the Administrate Server capability.
+
+    :arg str prefix: (optional) Only list projects whose name starts with
+        this prefix.
+    :arg str regex: (optional) Only list projects whose name matches this
+        regular expression.
+    :arg str match: (optional) Only list projects whose name contains this
+        substring.
+    :arg str state: (optional) Only list projects in this state: `ACTIVE`,
+        `READ_ONLY` or `HIDDEN`.
+    :arg str preset: (optional) Name of the preset of options.
+    :arg list options: (optional) Additional options: `DESCRIPTION` or
+        `ALL`.
+    :arg int limit: (optional) Maximum number of results.
+    :arg int start: (optional) Number of results to skip.
+
+    :raises:
+        ValueError if more than one of `prefix`, `regex` and `match` is
+        given, or the state, the preset or an option is not known.
+
+    """
+
+    PATH = "/projects/"
+    OPTIONS = {"ALL": ("all", None), "DESCRIPTION": ("d", None)}
+    PRESETS = {
+        "minimal": (),
+        "review": ("DESCRIPTION",),
+        "ci": (),
+        "audit": ("DESCRIPTION", "ALL"),
+    }
+    STATES = ("ACTIVE", "READ_ONLY", "HIDDEN")
+
+    def __init__(
+        self,
+        prefix=None,
+        regex=None,
+        match=None,
+        state=None,
+        preset="minimal",
+        options=None,
+        limit=None,
+        start=None,
+    ):
+        """See class docstring."""
+        filters = [
+            (name, value)
+            for name, value in (("p", prefix), ("r", regex), ("m", match))
+            if value
+        ]
+        if len(filters) > 1:
+            raise ValueError("Only one of prefix, regex and match may be given")
+        if state is not None and state.upper() not in self.STATES:
+            raise ValueError("state must be one of %s" % ", ".join(self.STATES))
+        super(ProjectQuery, self).__init__(preset, options, limit, start)
+        self.filters = filters
+        self.state = state.upper() if state else None
+
+    def params(self):
+        """Get the query parameters, as a list of (name, value) tuples."""
+        params = list(self.filters)
+        if self.state:
+            params.append(("state", self.state))
+        return params + super(ProjectQuery, self).params()
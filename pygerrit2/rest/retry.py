@@ -0,0 +1,382 @@
+# The MIT License
+#
+# Copyright 2026 David Pursehouse. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Retry policy and circuit breaker."""
+
+import collections.abc
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.packages.urllib3.exceptions import ConnectTimeoutError
+
+from .throttle import parse_retry_after
+
+logger = logging.getLogger("pygerrit2")
+
+# Methods that can safely be sent again, since sending them several times
+# has the same effect as sending them once.
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+# Response statuses of requests that may succeed when sent again.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Response statuses with which the server rejects a request without
+# processing it, so that it is safe to send again whatever the method.
+REJECTED_STATUSES = (429, 503)
+
+# Response statuses counted as failures by the circuit breaker.
+FAILURE_STATUSES = (500, 502, 503, 504)
+
+
+def _not_sent(error):
+    """Check whether a request failed before it was sent to the server."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, ConnectTimeoutError)
+
+
+def _nothing_to_rewind():
+    pass
+
+
+def _body_rewinder(body):
+    """Get a function rewinding a request body so that it can be sent again.
+
+    :arg body: The body, as given to `requests`.
+
+    :returns:
+        The function, or None if the body cannot be sent again, such as a
+        generator or a file that cannot seek.
+
+    """
+    if hasattr(body, "read"):
+        try:
+            position = body.tell()
+        except (AttributeError, OSError, ValueError):
+            return None
+        return lambda: body.seek(position)
+    if isinstance(body, collections.abc.Iterator):
+        return None
+    return _nothing_to_rewind
+
+
+def _limit_timeout(timeout, remaining):
+    """Limit a `requests` timeout to the remaining time."""
+    if isinstance(timeout, tuple):
+        return tuple(_limit_timeout(value, remaining) for value in timeout)
+    if timeout is None:
+        return remaining
+    return min(timeout, remaining)
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of sending a request while the server is down."""
+
+
+class RetryRule(object):
+    """When requests with a given method are retried.
+
+    :arg int retries: (optional) Maximum number of times a request is sent
+        again.
+    :arg tuple statuses: (optional) Response statuses that are retried.
+    :arg bool retry_errors: (optional) If true, requests that fail with a
+        connection error or a timeout are retried.  If false, they are only
+        retried if the connection to the server could not be established,
+        so that the request was surely not processed.
+
+    """
+
+    __slots__ = ("retries", "statuses", "retry_errors")
+
+    def __init__(self, retries=5, statuses=RETRY_STATUSES, retry_errors=True):
+        """See class docstring."""
+        self.retries = retries
+        self.statuses = frozenset(statuses)
+        self.retry_errors = retry_errors
+
+    def should_retry(self, response=None, error=None):
+        """Check whether a request should be sent again.
+
+        :arg requests.Response response: (optional) The response.
+        :arg requests.RequestException error: (optional) The exception the
+            request failed with.
+
+        """
+        if error is not None:
+            if not isinstance(error, (requests.ConnectionError, requests.Timeout)):
+                return False
+            return self.retry_errors or _not_sent(error)
+        return response.status_code in self.statuses
+
+
+# Requests that are not idempotent, such as posting a review, are only
+# retried when the server did not process them.
+NON_IDEMPOTENT_RULE = RetryRule(statuses=REJECTED_STATUSES, retry_errors=False)
+
+
+class CircuitBreaker(object):
+    """Fail fast while the server is down.
+
+    After `failure_threshold` consecutive requests failed with a connection
+    error, a timeout or a status in `statuses`, the circuit opens and
+    requests raise :class:`CircuitOpenError` without being sent.  After
+    `recovery_timeout` seconds a single trial request is let through; the
+    circuit closes again if it succeeds.  A circuit breaker may be shared
+    by several clients of the same server.
+
+    :arg int failure_threshold: (optional) Number of consecutive failures
+        that open the circuit.
+    :arg float recovery_timeout: (optional) Number of seconds the circuit
+        stays open before a trial request is sent.
+    :arg tuple statuses: (optional) Response statuses counted as failures.
+
+    """
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30, statuses=None):
+        """See class docstring."""
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.statuses = frozenset(statuses or FAILURE_STATUSES)
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """The state of the circuit: `closed`, `open` or `half-open`."""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.recovery_timeout:
+                return "open"
+            return "half-open"
+
+    def before_request(self):
+        """Check whether a request may be sent.
+
+        :raises:
+            CircuitOpenError if the circuit is open.
+
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.recovery_timeout:
+                raise CircuitOpenError("Circuit open, not sending request")
+            if self._trial:
+                raise CircuitOpenError("Circuit half-open, trial request pending")
+            self._trial = True
+
+    def cancel(self):
+        """Record that a request allowed to be sent did not complete.
+
+        The request counts neither as a success nor as a failure, but a
+        trial request may be sent again.
+
+        """
+        with self._lock:
+            self._trial = False
+
+    def record(self, response=None, error=None):
+        """Record the outcome of a request.
+
+        :arg requests.Response response: (optional) The response.
+        :arg Exception error: (optional) The exception the request failed
+            with.
+
+        """
+        if error is not None:
+            failed = isinstance(error, (requests.ConnectionError, requests.Timeout))
+        else:
+            failed = response.status_code in self.statuses
+        with self._lock:
+            self._trial = False
+            if not failed:
+                self._failures = 0
+                self._opened_at = None
+                return
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(
+                        "%d consecutive failures, opening circuit", self._failures
+                    )
+                self._opened_at = time.monotonic()
+
+
+class RetryPolicy(object):
+    """Policy deciding whether and when failed requests are sent again.
+
+    The delay between attempts grows with decorrelated jitter: each delay
+    is chosen at random between `backoff` and three times the previous
+    delay, up to `max_backoff`, so that clients do not retry in lockstep.
+    A `Retry-After` header in the response takes precedence when it asks
+    for a longer delay.
+
+    :arg dict rules: (optional) :class:`RetryRule` by HTTP method, which
+        override the default rules.  By default idempotent methods are
+        retried on connection errors, timeouts and statuses 429, 500, 502,
+        503 and 504, and other methods only when the server did not process
+        the request.
+    :arg float backoff: (optional) Minimum delay in seconds.
+    :arg float max_backoff: (optional) Maximum delay in seconds, unless the
+        server asks for more with `Retry-After`.
+    :arg float deadline: (optional) Maximum number of seconds spent on one
+        call, including all attempts and delays.  The timeout of each attempt
+        is limited to the time left.
+    :arg bool respect_retry_after: (optional) If true, the `Retry-After`
+        header is honoured.
+    :arg float max_retry_after: (optional) If the server asks to wait longer
+        than this, the request is not retried.
+    :arg CircuitBreaker circuit_breaker: (optional) Circuit breaker that
+        makes calls fail fast while the server is down.
+
+    """
+
+    def __init__(
+        self,
+        rules=None,
+        backoff=0.3,
+        max_backoff=30,
+        deadline=None,
+        respect_retry_after=True,
+        max_retry_after=120,
+        circuit_breaker=None,
+    ):
+        """See class docstring."""
+        self.rules = {method: RetryRule() for method in IDEMPOTENT_METHODS}
+        for method, rule in (rules or {}).items():
+            self.rules[method.upper()] = rule
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+        self.circuit_breaker = circuit_breaker
+
+    def rule(self, method):
+        """Get the rule for a method.
+
+        :arg str method: The HTTP method.
+
+        :returns:
+            The :class:`RetryRule`.
+
+        """
+        return self.rules.get(method.upper(), NON_IDEMPOTENT_RULE)
+
+    def next_backoff(self, previous):
+        """Get the delay before the next attempt.
+
+        :arg float previous: The previous delay, or `backoff` before the
+            first retry.
+
+        """
+        return min(self.max_backoff, random.uniform(self.backoff, previous * 3))
+
+    def _delay(self, previous, response, elapsed):
+        """Get the delay before the next attempt, or None to give up."""
+        delay = self.next_backoff(previous)
+        if response is not None and self.respect_retry_after:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                if retry_after > self.max_retry_after:
+                    return None
+                delay = max(delay, retry_after)
+        if self.deadline is not None and elapsed + delay >= self.deadline:
+            return None
+        return delay
+
+    def call(self, method, send, rewindable=True):
+        """Send a request, retrying it according to the policy.
+
+        :arg str method: The HTTP method.
+        :arg send: Function sending the request once, called with the number
+            of seconds left until the deadline, or None if there is none.
+        :arg bool rewindable: (optional) Set to False if the request body
+            cannot be sent again, so that the request is not retried.
+
+        :returns:
+            The last response.  Its `retry_count` attribute is the number of
+            times the request was sent again.
+
+        :raises:
+            The exception of the last attempt, :class:`CircuitOpenError`, or
+            `requests.Timeout` if the deadline passed before an attempt.
+
+        """
+        rule = self.rule(method)
+        start = time.monotonic()
+        delay = self.backoff
+        attempt = 0
+        while True:
+            remaining = None
+            if self.deadline is not None:
+                remaining = self.deadline - (time.monotonic() - start)
+                if remaining <= 0:
+                    raise requests.Timeout(
+                        "Deadline of %s seconds exceeded" % self.deadline
+                    )
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.before_request()
+
+            response = error = None
+            completed = False
+            try:
+                response = send(remaining)
+                completed = True
+            except requests.RequestException as e:
+                error = e
+                completed = True
+            finally:
+                if not completed and self.circuit_breaker is not None:
+                    self.circuit_breaker.cancel()
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record(response, error)
+
+            retry = (
+                rewindable
+                and attempt < rule.retries
+                and rule.should_retry(response, error)
+            )
+            if retry:
+                delay = self._delay(delay, response, time.monotonic() - start)
+                retry = delay is not None
+            if not retry:
+                if error is not None:
+                    raise error
+                response.retry_count = attempt
+                return response
+
+            if response is not None:
+                logger.debug("%s returned %d", response.url, response.status_code)
+                response.close()
+            else:
+                logger.debug("request failed: %s", error)
+            attempt += 1
+            logger.debug("retry %d in %.2f seconds", attempt, delay)
+            time.sleep(delay)
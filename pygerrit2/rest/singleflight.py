@@ -0,0 +1,131 @@
+# The MIT License
+#
+# Copyright 2026 David Pursehouse. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Coalescing of concurrent identical requests."""
+
+import asyncio
+import threading
+
+
+def request_key(url, **kwargs):
+    """Make the key identifying a request for coalescing.
+
+    :arg str url: The full URL.
+    :arg kwargs: The other arguments of the request.
+
+    :returns:
+        A hashable key.
+
+    """
+    return (url, repr(sorted(kwargs.items())))
+
+
+class _Call(object):
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Coalesce concurrent calls with the same key across threads.
+
+    While a call for a key is in progress, other threads calling with the
+    same key wait for it and receive the same result, or the same exception,
+    instead of making the call themselves.
+
+    """
+
+    def __init__(self):
+        """See class docstring."""
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function):
+        """Call the function, unless a call for the same key is in progress.
+
+        :arg key: Hashable key identifying the call.
+        :arg function: Function to call.
+
+        :returns:
+            The result of the function.
+
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+
+class AsyncSingleFlight(object):
+    """Coalesce concurrent calls with the same key in an event loop.
+
+    The asynchronous counterpart of :class:`SingleFlight`.  Cancelling one
+    of the waiting callers does not cancel the shared call.
+
+    """
+
+    def __init__(self):
+        """See class docstring."""
+        self._calls = {}
+
+    async def do(self, key, function):
+        """Await the function, unless a call for the same key is in progress.
+
+        :arg key: Hashable key identifying the call.
+        :arg function: Function returning an awaitable.
+
+        :returns:
+            The result of the awaitable.
+
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(function())
+            self._calls[key] = task
+
+            def forget(done):
+                if self._calls.get(key) is done:
+                    del self._calls[key]
+
+            task.add_done_callback(forget)
+        return await asyncio.shield(task)
@@ -0,0 +1,295 @@
+# The MIT License
+#
+# Copyright 2026 David Pursehouse. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Client-side rate limiting and adaptive concurrency control."""
+
+import email.utils
+import logging
+import math
+import threading
+import time
+
+logger = logging.getLogger("pygerrit2")
+
+# Response statuses with which the server signals that it is overloaded or
+# that a quota has been exceeded.
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value):
+    """Parse the value of a `Retry-After` header.
+
+    :arg str value: Number of seconds, or an HTTP date.
+
+    :returns:
+        The number of seconds to wait, or None if the value is invalid.
+
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(date.timestamp() - time.time(), 0.0)
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket limiting the rate of requests.
+
+    Tokens are added at `rate` per second, up to `burst`.  Each request
+    takes a token, waiting for one to become available if necessary.
+    Waiting requests reserve their token in turn, so they are served in
+    the order they arrived.
+
+    :arg float rate: Number of requests allowed per second.
+    :arg int burst: (optional) Number of requests that may be sent at once
+        after a period of inactivity.  Defaults to `rate`, rounded up.
+
+    """
+
+    def __init__(self, rate, burst=None):
+        """See class docstring."""
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else math.ceil(rate))
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """Take tokens without waiting for them.
+
+        :arg int tokens: (optional) Number of tokens to take.
+
+        :returns:
+            The number of seconds to wait before the tokens may be used.
+
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now > self._last:
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._last) * self.rate
+                )
+                self._last = now
+            self._tokens -= tokens
+            deficit = max(-self._tokens, 0.0)
+            return (self._last - now) + deficit / self.rate
+
+    def acquire(self, tokens=1):
+        """Take tokens, waiting until they are available.
+
+        :arg int tokens: (optional) Number of tokens to take.
+
+        :returns:
+            The number of seconds waited.
+
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class AdaptiveConcurrencyLimiter(object):
+    """Limit the number of concurrent requests, adapting to the server.
+
+    The limit is adapted with additive increase, multiplicative decrease
+    (AIMD): it grows by about one for each round of requests that are not
+    throttled, and is multiplied by `backoff` when a request is throttled.
+    Requests that were started before the last decrease do not decrease it
+    again, so that a burst of throttled responses to requests sent at the
+    same time only counts once.
+
+    :arg int maximum: Maximum number of concurrent requests.
+    :arg int minimum: (optional) Minimum number of concurrent requests.
+    :arg int initial: (optional) Initial limit.  Defaults to `maximum`.
+    :arg float backoff: (optional) Factor the limit is multiplied by when a
+        request is throttled.
+
+    """
+
+    def __init__(self, maximum, minimum=1, initial=None, backoff=0.5):
+        """See class docstring."""
+        if not 1 <= minimum <= maximum:
+            raise ValueError("minimum must be between 1 and maximum")
+        if not 0 < backoff < 1:
+            raise ValueError("backoff must be between 0 and 1")
+        self.maximum = maximum
+        self.minimum = minimum
+        self.backoff = backoff
+        self._limit = float(initial if initial is not None else maximum)
+        self._in_flight = 0
+        self._last_decrease = 0
+        self._sequence = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self):
+        """The current limit on the number of concurrent requests."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        """The number of requests currently in flight."""
+        return self._in_flight
+
+    def acquire(self):
+        """Wait until a request may be sent.
+
+        :returns:
+            A ticket that must be passed to :meth:`release`.
+
+        """
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+            self._sequence += 1
+            return self._sequence
+
+    def release(self, ticket, throttled=None):
+        """Signal that a request is done.
+
+        :arg ticket: The ticket returned by :meth:`acquire`.
+        :arg bool throttled: (optional) True if the server throttled the
+            request, False if it did not, and None if it is not known, for
+            example because the request failed, in which case the limit is
+            not changed.
+
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if throttled:
+                if ticket > self._last_decrease:
+                    self._limit = max(self._limit * self.backoff, self.minimum)
+                    self._last_decrease = self._sequence
+                    logger.debug("request throttled, concurrency limit %d", self.limit)
+            elif throttled is not None:
+                self._limit = min(self._limit + 1.0 / self._limit, self.maximum)
+            self._condition.notify_all()
+
+
+class Throttle(object):
+    """Control the throughput of requests to stay within the server's quotas.
+
+    Combines an optional :class:`TokenBucket` rate limit with an optional
+    :class:`AdaptiveConcurrencyLimiter`.  Responses with a status in
+    `statuses` reduce the concurrency limit, and their `Retry-After` header
+    holds back all requests for the given time.  One throttle may be
+    shared by all threads using a client, and by several clients sending
+    requests to the same server with the same credentials.
+
+    Throttled requests are not sent again; their responses are returned
+    to the caller as usual.
+
+    :arg float rate: (optional) Maximum number of requests per second.
+    :arg int burst: (optional) See :class:`TokenBucket`.
+    :arg int max_concurrency: (optional) Maximum number of concurrent
+        requests.  If not given, the concurrency is not limited.
+    :arg int min_concurrency: (optional) Minimum to which the concurrency
+        limit is lowered when requests are throttled.
+    :arg tuple statuses: (optional) Response statuses that mean a request
+        was throttled.
+    :arg float max_retry_after: (optional) Maximum number of seconds a
+        `Retry-After` header may hold back requests for.
+
+    """
+
+    def __init__(
+        self,
+        rate=None,
+        burst=None,
+        max_concurrency=None,
+        min_concurrency=1,
+        statuses=THROTTLE_STATUSES,
+        max_retry_after=300,
+    ):
+        """See class docstring."""
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.limiter = (
+            AdaptiveConcurrencyLimiter(max_concurrency, min_concurrency)
+            if max_concurrency
+            else None
+        )
+        self.statuses = frozenset(statuses)
+        self.max_retry_after = max_retry_after
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds):
+        """Hold back all requests for a number of seconds.
+
+        :arg float seconds: The duration of the pause.
+
+        """
+        seconds = min(seconds, self.max_retry_after)
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def acquire(self):
+        """Wait until a request may be sent.
+
+        :returns:
+            A ticket that must be passed to :meth:`release`.
+
+        """
+        ticket = self.limiter.acquire() if self.limiter is not None else None
+        try:
+            while True:
+                with self._lock:
+                    delay = self._paused_until - time.monotonic()
+                if delay <= 0:
+                    break
+                time.sleep(delay)
+            if self.bucket is not None:
+                self.bucket.acquire()
+        except BaseException:
+            if self.limiter is not None:
+                self.limiter.release(ticket)
+            raise
+        return ticket
+
+    def release(self, ticket, response=None):
+        """Signal that a request is done, adapting to its response.
+
+        :arg ticket: The ticket returned by :meth:`acquire`.
+        :arg requests.Response response: (optional) The response, or None if
+            the request failed.
+
+        """
+        throttled = None
+        if response is not None:
+            throttled = response.status_code in self.statuses
+            if throttled:
+                delay = parse_retry_after(response.headers.get("Retry-After"))
+                if delay:
+                    delay = min(delay, self.max_retry_after)
+                    logger.warning("request throttled, waiting %.1f seconds", delay)
+                    self.pause(delay)
+        if self.limiter is not None:
+            self.limiter.release(ticket, throttled)
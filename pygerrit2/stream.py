@@ -0,0 +1,345 @@
+# The MIT License
+#
+# Copyright 2026 David Pursehouse. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Consumer of Gerrit's event stream."""
+
+import logging
+import queue
+import threading
+
+from .events import decode_event
+from .rest.batcher import ChangeBatcher
+from .rest.jsonlib import get_json_backend
+from .rest.models import ChangeInfo
+from .rest.query import ChangeQuery
+
+logger = logging.getLogger("pygerrit2")
+
+# Default number of bytes read from the source at a time.
+READ_SIZE = 64 * 1024
+
+# Sentinel telling a worker to stop.
+_STOP = object()
+
+
+def _read_chunks(source, read_size):
+    """Read chunks of bytes from a socket, file-like object or iterable.
+
+    Sockets and buffered binary files return the data that is available
+    instead of waiting for `read_size` bytes, so that events are delivered
+    as soon as they arrive.  Other file-like objects are read line by line.
+
+    """
+    if hasattr(source, "recv"):
+
+        def read():
+            return source.recv(read_size)
+
+    elif hasattr(source, "read1"):
+
+        def read():
+            return source.read1(read_size)
+
+    elif hasattr(source, "readline"):
+        read = source.readline
+    else:
+        for chunk in source:
+            yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+        return
+
+    while True:
+        chunk = read()
+        if not chunk:
+            return
+        yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
+
+def iter_events(source, json_backend=None, read_size=READ_SIZE):
+    """Parse events from a stream of newline delimited JSON.
+
+    Lines that are not valid JSON objects are logged and skipped.
+
+    :arg source: The output of Gerrit's `stream-events` command, as a
+        socket, a binary or text file-like object, such as the stdout of an
+        `ssh` subprocess or a paramiko channel file, or an iterable of
+        lines or chunks.
+    :arg json_backend: (optional) Name of the JSON implementation used to
+        decode the events, or a :class:`JSONBackend`.
+    :arg int read_size: (optional) Maximum number of bytes read at a time
+        from sockets and binary files.
+
+    :returns:
+        A generator of :class:`GerritEvent`.
+
+    """
+    loads = get_json_backend(json_backend).loads
+    pending = []
+    for chunk in _read_chunks(source, read_size):
+        if b"\n" not in chunk:
+            pending.append(chunk)
+            continue
+        lines = chunk.split(b"\n")
+        if pending:
+            pending.append(lines[0])
+            lines[0] = b"".join(pending)
+        pending = [lines.pop()]
+        for line in lines:
+            event = _parse_line(line, loads)
+            if event is not None:
+                yield event
+    event = _parse_line(b"".join(pending), loads)
+    if event is not None:
+        yield event
+
+
+def _parse_line(line, loads):
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        data = loads(line)
+    except ValueError:
+        logger.warning("Skipping invalid event: %r", line[:200])
+        return None
+    if not isinstance(data, dict):
+        logger.warning("Skipping invalid event: %r", line[:200])
+        return None
+    return decode_event(data)
+
+
+class GerritEventStream(object):
+    """Dispatch the events from Gerrit's event stream to handlers.
+
+    Events are read from the source and parsed in one thread, and handled
+    by a pool of worker threads.  Each worker has a bounded queue; events
+    about the same change, or the same ref, always go to the same worker,
+    so they are handled in the order they were emitted while events about
+    different changes are handled concurrently.  When a worker's queue is
+    full, reading from the source waits, which in turn makes Gerrit stop
+    sending instead of events being buffered without limit.
+
+    Handlers are called with each event.  Exceptions raised by handlers
+    are logged and counted in `errors`, and do not stop the stream.
+
+    :arg source: The event stream, see :func:`iter_events`.
+    :arg GerritRestAPI rest: (optional) REST API client used by
+        :meth:`get_change` to look up more details of changes.
+    :arg int workers: (optional) Number of worker threads.
+    :arg int queue_size: (optional) Maximum number of events queued for
+        each worker.
+    :arg json_backend: (optional) Name of the JSON implementation used to
+        decode the events, or a :class:`JSONBackend`.
+    :arg float batch_window: (optional) If set, the changes looked up by
+        :meth:`get_change` within this many seconds of each other are
+        fetched together, with a :class:`ChangeBatcher`.
+
+    """
+
+    def __init__(
+        self,
+        source,
+        rest=None,
+        workers=4,
+        queue_size=1000,
+        json_backend=None,
+        batch_window=None,
+    ):
+        """See class docstring."""
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.source = source
+        self.rest = rest
+        self.json_backend = get_json_backend(json_backend)
+        self.received = 0
+        self.handled = 0
+        self.errors = 0
+        self._handlers = {}
+        self._all_handlers = []
+        self._queues = [queue.Queue(queue_size) for _ in range(workers)]
+        self._workers = []
+        self._reader = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self.batch_window = batch_window
+        self._batchers = {}
+
+    def add_handler(self, handler, *event_types):
+        """Add a handler.
+
+        :arg handler: Function called with each event.
+        :arg str event_types: (optional) Types of the events to call the
+            handler with, for example `comment-added`.  By default the
+            handler is called with all events.
+
+        """
+        if not event_types:
+            self._all_handlers.append(handler)
+        for event_type in event_types:
+            self._handlers.setdefault(event_type, []).append(handler)
+
+    def handler(self, *event_types):
+        """Decorate a function to add it as a handler.
+
+        Usage::
+
+            @stream.handler("patchset-created")
+            def on_upload(event):
+                ...
+
+        """
+
+        def decorator(function):
+            self.add_handler(function, *event_types)
+            return function
+
+        return decorator
+
+    def get_change(self, event, preset="minimal", options=None):
+        """Get the details of the change that an event is about.
+
+        :arg GerritEvent event: The event.
+        :arg str preset: (optional) Preset of options, see
+            :class:`ChangeQuery`.
+        :arg list options: (optional) Additional options.
+
+        :returns:
+            A :class:`ChangeInfo`, or None if the event is not about a
+            change or the change was not found.
+
+        :raises:
+            ValueError if the stream has no REST API client.
+
+        """
+        if self.rest is None:
+            raise ValueError("No REST API client to look up changes with")
+        change = event.get("change")
+        if change is None:
+            return None
+        if self.batch_window is not None:
+            return self._batcher(preset, options).get(change.get("number"))
+        query = ChangeQuery(
+            "change:%s" % change.get("number"), preset=preset, options=options, limit=1
+        )
+        changes = self.rest.get(query.endpoint(), model=ChangeInfo)
+        return changes[0] if changes else None
+
+    def _batcher(self, preset, options):
+        key = (preset, tuple(options or ()))
+        with self._lock:
+            batcher = self._batchers.get(key)
+            if batcher is None:
+                batcher = self._batchers[key] = ChangeBatcher(
+                    self.rest, self.batch_window, preset, options
+                )
+        return batcher
+
+    def run(self):
+        """Read and dispatch events until the end of the stream.
+
+        Returns when the source is exhausted, or :meth:`stop` was called,
+        and all events read have been handled.
+
+        """
+        self._start_workers()
+        try:
+            for event in iter_events(self.source, self.json_backend):
+                if self._stopping.is_set():
+                    break
+                self._dispatch(event)
+        finally:
+            self._stop_workers()
+
+    def start(self):
+        """Start reading and dispatching events in a background thread."""
+        self._reader = threading.Thread(target=self.run, name="gerrit-events")
+        self._reader.daemon = True
+        self._reader.start()
+
+    def stop(self, timeout=None):
+        """Stop reading events and wait for those read to be handled.
+
+        A read that is blocked waiting for data from the source is not
+        interrupted; close the source to stop it.
+
+        :arg float timeout: (optional) Maximum time to wait, in seconds.
+
+        """
+        self._stopping.set()
+        self.join(timeout)
+
+    def join(self, timeout=None):
+        """Wait until the end of the stream, and all events are handled.
+
+        :arg float timeout: (optional) Maximum time to wait, in seconds.
+
+        """
+        if self._reader is not None:
+            self._reader.join(timeout)
+
+    def __enter__(self):
+        """Start dispatching events in a background thread."""
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        """Stop dispatching events."""
+        self.stop()
+
+    def _dispatch(self, event):
+        self.received += 1
+        key = event.change_key
+        index = hash(key) % len(self._queues) if key is not None else 0
+        self._queues[index].put(event)
+
+    def _start_workers(self):
+        self._workers = []
+        for index, events in enumerate(self._queues):
+            worker = threading.Thread(
+                target=self._work, args=(events,), name="gerrit-events-%d" % index
+            )
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def _stop_workers(self):
+        for events in self._queues:
+            events.put(_STOP)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def _work(self, events):
+        while True:
+            event = events.get()
+            if event is _STOP:
+                return
+            handlers = self._all_handlers + self._handlers.get(event.type, [])
+            errors = 0
+            for handler in handlers:
+                try:
+                    handler(event)
+                except Exception:
+                    errors += 1
+                    logger.exception("Error in event handler %r", handler)
+            with self._lock:
+                self.handled += 1
+                self.errors += errors
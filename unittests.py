@@ -25,13 +25,163 @@
 
 """Unit tests for the Pygerrit2 helper methods."""
 
+import asyncio
+import base64
+import copy
+import gzip
+import io
+import json
+import os
+import pickle
 import re
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import tracemalloc
 import unittest
 
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
 from mock import patch
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
 from pygerrit2 import GerritReviewMessageFormatter, GerritReview
 from pygerrit2 import HTTPBasicAuthFromNetrc, HTTPDigestAuthFromNetrc, Anonymous
-from pygerrit2 import GerritRestAPI
+from pygerrit2 import HTTPBasicAuth, HTTPDigestAuth
+from pygerrit2 import GerritRestAPI, AsyncGerritRestAPI
+from pygerrit2 import JSONBackend, JSONStream, get_json_backend
+from pygerrit2 import GerritHTTPAdapter, HTTP2Adapter, ResponseCache
+from pygerrit2 import DecodedContentCache, FrozenDict, FrozenList
+from pygerrit2 import SingleFlight
+from pygerrit2 import AdaptiveConcurrencyLimiter, Throttle, TokenBucket
+from pygerrit2 import AccountQuery, ChangeBatcher, ChangeQuery, ProjectQuery
+from pygerrit2 import AccountInfo, ApprovalInfo, ChangeInfo, CommentInfo
+from pygerrit2 import LabelInfo, RevisionInfo
+from pygerrit2 import CircuitBreaker, CircuitOpenError, RetryPolicy, RetryRule
+from pygerrit2 import OpenTelemetryHook, PrometheusHook
+from pygerrit2 import lazy_loads
+from pygerrit2 import GerritEvent, GerritEventStream, decode_event, iter_events
+from pygerrit2.events import CommentAddedEvent, RefUpdatedEvent
+from pygerrit2.rest.metrics import endpoint_template
+from pygerrit2.rest.throttle import parse_retry_after
+from pygerrit2.rest import GERRIT_MAGIC_JSON_PREFIX
+from pygerrit2.rest.session import GerritSession
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+try:
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+except ImportError:
+    TracerProvider = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+JSON_HEADERS = {"Content-Type": "application/json; charset=UTF-8"}
+
+
+def _gerrit_json(data):
+    return (GERRIT_MAGIC_JSON_PREFIX + json.dumps(data)).encode("utf-8")
+
+
+class FakeAdapter(BaseAdapter):
+    """Connection adapter returning responses from a handler function.
+
+    The handler is called with each prepared request and must return a
+    tuple of (status code, headers, body bytes).
+    """
+
+    def __init__(self, handler):
+        """See class docstring."""
+        super(FakeAdapter, self).__init__()
+        self.handler = handler
+        self.requests = []
+        self.timeouts = []
+
+    def send(self, request, **kwargs):
+        """Return the handler's response for the request."""
+        self.requests.append(request)
+        self.timeouts.append(kwargs.get("timeout"))
+        status, headers, body = self.handler(request)
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(body)
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        """Nothing to close."""
+        pass
+
+
+class LocalServer(object):
+    """HTTP/1.1 server on localhost, run in a thread, for connection tests.
+
+    Every request is answered with an empty JSON list.
+    """
+
+    def __init__(self):
+        """See class docstring."""
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                body = _gerrit_json([])
+                self.send_response(200)
+                self.send_header("Content-Type", JSON_HEADERS["Content-Type"])
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = "http://127.0.0.1:%d" % self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    def __enter__(self):
+        """Start serving."""
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        """Stop serving."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _fake_api(handler, **kwargs):
+    adapter = FakeAdapter(handler)
+    api = GerritRestAPI(
+        url="http://review.example.com", auth=Anonymous(), adapter=adapter, **kwargs
+    )
+    return api, adapter
+
 
 EXPECTED_TEST_CASE_FIELDS = ["header", "footer", "paragraphs", "result"]
 
@@ -197,6 +347,44 @@ class TestGerritReview(unittest.TestCase):
             ' "Makefile": [{"line": 15, "message": "test"}]}}',
         )
 
+    def test_add_comments(self):
+        """Test that comments are grouped by file, and invalid ones skipped."""
+        obj = GerritReview()
+        obj.add_comments(
+            [{"filename": "f%d" % (n % 3), "line": n, "message": "m"} for n in range(9)]
+        )
+        obj.add_comments(
+            [
+                {"line": 1, "message": "no filename"},
+                {"filename": "f0", "line": 1},
+                {"filename": "f0", "message": "no line or range"},
+            ]
+        )
+        self.assertEqual(sorted(obj.comments), ["f0", "f1", "f2"])
+        self.assertEqual([c["line"] for c in obj.comments["f0"]], [0, 3, 6])
+
+    def test_to_json_shows_current_state(self):
+        """Test that changes made through held references are serialized."""
+        labels = {"Verified": 1}
+        obj = GerritReview(message="msg", labels=labels)
+        self.assertEqual(obj.to_json(), str(obj).encode("utf-8"))
+        labels["Code-Review"] = 2
+        self.assertEqual(
+            json.loads(obj.to_json())["labels"], {"Verified": 1, "Code-Review": 2}
+        )
+        held = obj.labels
+        str(obj)
+        held["Verified"] = -1
+        self.assertEqual(json.loads(str(obj))["labels"]["Verified"], -1)
+        obj.add_comments([{"filename": "a", "line": 1, "message": "m"}])
+        str(obj)
+        obj.comments["a"].append({"line": 2, "message": "n"})
+        self.assertEqual(len(json.loads(obj.to_json())["comments"]["a"]), 2)
+        obj.set_message("other")
+        obj.tag = "ci"
+        self.assertEqual(json.loads(obj.to_json())["message"], "other")
+        self.assertEqual(json.loads(obj.to_json())["tag"], "ci")
+
 
 class TestNetrcAuth(unittest.TestCase):
     """Test that netrc authentication works."""
@@ -362,5 +550,2059 @@ class TestKwargsTranslation(unittest.TestCase):
         assert "Content-Type" not in headers
 
 
+class TestGerritSession(unittest.TestCase):
+    """Test that the session prepares requests like `requests` does."""
+
+    def _sessions(self):
+        sessions = []
+        for session in (requests.Session(), GerritSession()):
+            session.headers.update({"Accept": "application/json"})
+            session.auth = HTTPBasicAuth("user", "secret")
+            sessions.append(session)
+        return sessions
+
+    def test_prepared_requests_are_equal(self):
+        """Test that requests are prepared the same as by `requests`."""
+        expected, session = self._sessions()
+        for _ in range(2):
+            request = requests.Request(
+                "post",
+                "http://review.example.com/a/changes/?q=status:open",
+                headers={"X-Test": "1", "Accept-Encoding": None},
+                params={"n": 5},
+                json={"message": "åäö"},
+            )
+            prepared = session.prepare_request(request)
+            reference = expected.prepare_request(request)
+            self.assertEqual(prepared.method, reference.method)
+            self.assertEqual(prepared.url, reference.url)
+            self.assertEqual(prepared.headers, reference.headers)
+            self.assertEqual(prepared.body, reference.body)
+        self.assertNotIn(
+            "X-Test",
+            session.prepare_request(
+                requests.Request("GET", "http://review.example.com/a/accounts/self")
+            ).headers,
+        )
+
+    def test_session_cookies_are_sent(self):
+        """Test that requests sent while the session has cookies include them."""
+        _, session = self._sessions()
+        session.cookies.set("GerritAccount", "abc")
+        prepared = session.prepare_request(
+            requests.Request("GET", "http://review.example.com/a/accounts/self")
+        )
+        self.assertEqual(prepared.headers["Cookie"], "GerritAccount=abc")
+
+    def test_environment_is_read_once_per_host(self):
+        """Test that the proxies are looked up once for each host."""
+        session = GerritSession()
+        proxies = {"http": "http://proxy.example.com:3128"}
+        with patch("pygerrit2.rest.session.get_environ_proxies") as mock_proxies:
+            mock_proxies.return_value = proxies
+            for path in ("changes/", "accounts/self"):
+                settings = session.merge_environment_settings(
+                    "http://review.example.com/" + path, {}, None, None, None
+                )
+                self.assertEqual(settings["proxies"], proxies)
+            self.assertEqual(mock_proxies.call_count, 1)
+            session.merge_environment_settings(
+                "http://other.example.com/", {}, None, None, None
+            )
+            self.assertEqual(mock_proxies.call_count, 2)
+
+    def test_netrc_is_read_once_per_host(self):
+        """Test that `.netrc` credentials are looked up once for each host."""
+        session = GerritSession()
+        with patch("pygerrit2.rest.session.get_netrc_auth") as mock_netrc:
+            mock_netrc.return_value = ("user", "secret")
+            for _ in range(2):
+                prepared = session.prepare_request(
+                    requests.Request("GET", "http://review.example.com/a/changes/")
+                )
+                self.assertTrue(prepared.headers["Authorization"].startswith("Basic "))
+            self.assertEqual(mock_netrc.call_count, 1)
+
+    def test_ca_bundle_does_not_enable_verification(self):
+        """Test that a CA bundle in the environment does not override verify."""
+        with patch.dict("os.environ", {"REQUESTS_CA_BUNDLE": "/tmp/ca.pem"}):
+            api = GerritRestAPI(url="http://review.example.com", verify=False)
+            settings = api.session.merge_environment_settings(
+                api.url, {}, None, None, None
+            )
+            self.assertFalse(settings["verify"])
+            api = GerritRestAPI(url="http://review.example.com")
+            settings = api.session.merge_environment_settings(
+                api.url, {}, None, None, None
+            )
+            self.assertEqual(settings["verify"], "/tmp/ca.pem")
+
+    def test_request_settings(self):
+        """Test that the authentication and default headers are sent."""
+        api, adapter = _fake_api(lambda request: (200, JSON_HEADERS, b"{}"))
+        api.auth = api.session.auth = HTTPBasicAuth("user", "secret")
+        api.get("/accounts/self", headers={"X-Test": "1"})
+        api.get("/accounts/self")
+        first, second = adapter.requests
+        self.assertEqual(first.headers["Accept"], "application/json")
+        self.assertEqual(first.headers["X-Test"], "1")
+        self.assertNotIn("X-Test", second.headers)
+        self.assertTrue(second.headers["Authorization"].startswith("Basic "))
+
+
+class TestIterQuery(unittest.TestCase):
+    """Test that query results are paginated."""
+
+    def test_changes_are_paginated(self):
+        """Test that pages are fetched until `_more_changes` is not set."""
+
+        def handler(request):
+            start = int(re.search(r"S=(\d+)", request.url).group(1))
+            changes = [{"_number": n} for n in range(start, min(start + 2, 5))]
+            if start + 2 < 5:
+                changes[-1]["_more_changes"] = True
+            return 200, JSON_HEADERS, _gerrit_json(changes)
+
+        api, adapter = _fake_api(handler)
+        results = list(api.iter_query("/changes/?q=status:open&n=1000", page_size=2))
+        self.assertEqual([c["_number"] for c in results], [0, 1, 2, 3, 4])
+        self.assertEqual(len(adapter.requests), 3)
+        self.assertEqual(
+            adapter.requests[1].url,
+            "http://review.example.com/changes/?q=status:open&n=2&S=2",
+        )
+
+    def test_map_results_are_paginated(self):
+        """Test that project listings are paginated until a page is not full."""
+        pages = [{"a": {}, "b": {}}, {"c": {}}]
+
+        def handler(request):
+            return 200, JSON_HEADERS, _gerrit_json(pages.pop(0))
+
+        api, adapter = _fake_api(handler)
+        results = list(api.iter_query("/projects/", page_size=2, prefetch=False))
+        self.assertEqual([name for name, _ in results], ["a", "b", "c"])
+        self.assertEqual(
+            adapter.requests[0].url, "http://review.example.com/projects/?n=2&S=0"
+        )
+
+    def test_invalid_page_size(self):
+        """Test that an exception is raised for an invalid page size."""
+        api, _ = _fake_api(lambda request: (200, JSON_HEADERS, b"[]"))
+        with self.assertRaises(ValueError):
+            next(api.iter_query("/changes/", page_size=0))
+
+
+class TestGetMany(unittest.TestCase):
+    """Test that requests are sent concurrently in a batch."""
+
+    def test_results_in_order_with_errors(self):
+        """Test that results are ordered and errors do not stop the batch."""
+
+        def handler(request):
+            number = int(request.url.rsplit("/", 1)[1])
+            if number == 3:
+                return 404, JSON_HEADERS, b"Not found"
+            return 200, JSON_HEADERS, _gerrit_json({"_number": number})
+
+        api, _ = _fake_api(handler)
+        endpoints = ["/changes/%d" % n for n in range(6)]
+        results = list(api.get_many(endpoints, max_workers=3))
+        self.assertEqual([r.endpoint for r in results], endpoints)
+        self.assertEqual(results[0].result, {"_number": 0})
+        self.assertIsNone(results[3].result)
+        self.assertIsInstance(results[3].error, requests.HTTPError)
+        self.assertTrue(all(r.error is None for r in results if r is not results[3]))
+
+    def test_concurrency_is_limited(self):
+        """Test that no more than `max_workers` requests are in flight."""
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def handler(request):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.01)
+            with lock:
+                state["active"] -= 1
+            return 200, JSON_HEADERS, _gerrit_json({})
+
+        api, _ = _fake_api(handler)
+        endpoints = ["/changes/%d" % n for n in range(20)]
+        results = list(api.get_many(endpoints, max_workers=4, ordered=False))
+        self.assertEqual(sorted(r.endpoint for r in results), sorted(endpoints))
+        self.assertLessEqual(state["peak"], 4)
+        self.assertGreater(state["peak"], 1)
+
+
+class TestReviewMany(unittest.TestCase):
+    """Test that reviews are submitted concurrently in a batch."""
+
+    def test_results_in_order_with_errors(self):
+        """Test that results are ordered and only transient errors retried."""
+        attempts = {}
+        lock = threading.Lock()
+
+        def handler(request):
+            change = request.url.split("/changes/")[1].split("/")[0]
+            with lock:
+                attempts[change] = attempts.get(change, 0) + 1
+            if change == "2":
+                return 500, JSON_HEADERS, b"Internal error"
+            if change == "3" and attempts[change] < 3:
+                return 503, JSON_HEADERS, b"Unavailable"
+            return 200, JSON_HEADERS, _gerrit_json({"labels": {"Verified": 1}})
+
+        api, _ = _fake_api(handler)
+        reviews = [
+            (str(n), "current", GerritReview(labels={"Verified": 1})) for n in range(5)
+        ]
+        results = list(
+            api.review_many(reviews, max_workers=3, retry_policy=RetryPolicy(backoff=0))
+        )
+        self.assertEqual([r.change_id for r in results], ["0", "1", "2", "3", "4"])
+        self.assertIs(results[0].review, reviews[0][2])
+        self.assertEqual(results[0].result, {"labels": {"Verified": 1}})
+        self.assertIsInstance(results[2].error, requests.HTTPError)
+        self.assertEqual(attempts["2"], 1)
+        self.assertIsNone(results[3].error)
+        self.assertEqual(attempts["3"], 3)
+
+    def test_coalesce(self):
+        """Test that reviews of the same revision are posted as one."""
+        api, adapter = _fake_api(lambda request: (200, JSON_HEADERS, _gerrit_json({})))
+        comment = {"filename": "Makefile", "line": 1, "message": "tabs"}
+        reviews = [
+            ("1", "abc", GerritReview("Build passed", {"Verified": 1}, tag="ci")),
+            ("2", "def", GerritReview("Build passed", {"Verified": 1})),
+            ("1", "abc", GerritReview("Lint failed", {"Verified": -1}, [comment])),
+            ("1", "abc", '{"message": "raw"}'),
+        ]
+        results = list(api.review_many(reviews, coalesce=True))
+        self.assertEqual([r.change_id for r in results], ["1", "2", "1", "1"])
+        self.assertIs(results[0].result, results[2].result)
+        self.assertEqual(len(adapter.requests), 3)
+        bodies = [json.loads(request.body) for request in adapter.requests]
+        self.assertIn(
+            {
+                "message": "Build passed\n\nLint failed",
+                "tag": "ci",
+                "labels": {"Verified": -1},
+                "comments": {"Makefile": [{"line": 1, "message": "tabs"}]},
+            },
+            bodies,
+        )
+        self.assertIn({"message": "raw"}, bodies)
+        self.assertEqual(reviews[0][2].message, "Build passed")
+
+    def test_client_retry_policy(self):
+        """Test that the client's retry policy is used when it has one."""
+        statuses = [429, 200]
+        api, adapter = _fake_api(
+            lambda request: (statuses.pop(0), JSON_HEADERS, _gerrit_json({})),
+            retry_policy=RetryPolicy(backoff=0),
+        )
+        results = list(api.review_many([("1", "current", GerritReview("Done"))]))
+        self.assertEqual(results[0].result, {})
+        self.assertEqual(len(adapter.requests), 2)
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Test that the connection pool is configurable."""
+
+    def test_pool_settings(self):
+        """Test that the pool settings are passed to the adapter."""
+        api = GerritRestAPI(
+            url="http://review.example.com",
+            auth=Anonymous(),
+            pool_connections=2,
+            pool_maxsize=32,
+            pool_block=True,
+            tcp_keepalive=60,
+        )
+        adapter = api.session.get_adapter(api.url)
+        self.assertIsInstance(adapter, GerritHTTPAdapter)
+        pool_kw = adapter.poolmanager.connection_pool_kw
+        self.assertEqual(pool_kw["maxsize"], 32)
+        self.assertTrue(pool_kw["block"])
+        self.assertIn(
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1), pool_kw["socket_options"]
+        )
+
+    def test_pool_stats_count_reused_connections(self):
+        """Test that connections are reused and counted in the statistics."""
+        with LocalServer() as server:
+            api = GerritRestAPI(url=server.url, auth=Anonymous())
+            for _ in range(3):
+                api.get("/changes/")
+            stats = api.pool_stats()
+            api.session.close()
+        self.assertEqual(stats["connections_created"], 1)
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["connections_reused"], 2)
+
+    def test_no_pool_stats_for_custom_adapter(self):
+        """Test that there are no statistics for a custom adapter."""
+        api, _ = _fake_api(lambda request: (200, JSON_HEADERS, b"[]"))
+        self.assertIsNone(api.pool_stats())
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test that responses are cached."""
+
+    def _etag_handler(self, data):
+        def handler(request):
+            if request.headers.get("If-None-Match") == '"v1"':
+                return 304, {"ETag": '"v1"'}, b""
+            headers = dict(JSON_HEADERS, ETag='"v1"')
+            return 200, headers, _gerrit_json(data)
+
+        return handler
+
+    def test_revalidated_with_etag(self):
+        """Test that a 304 response reuses the cached value."""
+        api, adapter = _fake_api(
+            self._etag_handler({"_number": 1}), cache=ResponseCache()
+        )
+        self.assertEqual(api.get("/changes/1"), {"_number": 1})
+        result, response = api.get("/changes/1", return_response=True)
+        self.assertEqual(result, {"_number": 1})
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn("If-None-Match", adapter.requests[0].headers)
+        self.assertEqual(adapter.requests[1].headers["If-None-Match"], '"v1"')
+
+    def test_cached_value_is_copied(self):
+        """Test that modifying a result does not modify the cache."""
+        api, _ = _fake_api(self._etag_handler({"_number": 1}), cache=ResponseCache())
+        api.get("/changes/1")["_number"] = 2
+        self.assertEqual(api.get("/changes/1"), {"_number": 1})
+
+    def test_ttl_without_validators(self):
+        """Test that responses without validators are reused within the TTL."""
+        api, adapter = _fake_api(
+            lambda request: (200, JSON_HEADERS, _gerrit_json({"a": 1})),
+            cache=ResponseCache(ttl=60),
+        )
+        self.assertEqual(api.get("/config/server/version"), {"a": 1})
+        result, response = api.get("/config/server/version", return_response=True)
+        self.assertEqual(result, {"a": 1})
+        self.assertIsNone(response)
+        self.assertEqual(len(adapter.requests), 1)
+
+    def test_not_cached_without_validators_or_ttl(self):
+        """Test that responses without validators are not cached by default."""
+        cache = ResponseCache()
+        api, adapter = _fake_api(
+            lambda request: (200, JSON_HEADERS, _gerrit_json({})), cache=cache
+        )
+        api.get("/accounts/self")
+        api.get("/accounts/self")
+        self.assertEqual(len(adapter.requests), 2)
+        self.assertEqual(len(cache), 0)
+
+    def test_opt_out(self):
+        """Test that excluded endpoints and `use_cache=False` bypass the cache."""
+        api, adapter = _fake_api(
+            lambda request: (200, JSON_HEADERS, _gerrit_json({})),
+            cache=ResponseCache(ttl=60, exclude=[r"^/?accounts/"]),
+        )
+        api.get("/accounts/self")
+        api.get("/accounts/self")
+        api.get("/projects/")
+        api.get("/projects/", use_cache=False)
+        self.assertEqual(len(adapter.requests), 4)
+
+    def test_disk_store(self):
+        """Test that entries stored on disk are used by a new cache."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        handler = self._etag_handler({"_number": 1})
+        api, _ = _fake_api(handler, cache=ResponseCache(directory=directory))
+        api.get("/changes/1")
+        api, adapter = _fake_api(handler, cache=ResponseCache(directory=directory))
+        self.assertEqual(api.get("/changes/1"), {"_number": 1})
+        self.assertEqual(adapter.requests[0].headers["If-None-Match"], '"v1"')
+
+
+class TestDecodedContentCache(unittest.TestCase):
+    """Test that identical content is decoded only once."""
+
+    def _api(self, decode_cache, bodies):
+        calls = []
+
+        def loads(content):
+            calls.append(content)
+            return json.loads(content)
+
+        api, _ = _fake_api(
+            lambda request: (200, JSON_HEADERS, bodies.pop(0)),
+            json_backend=JSONBackend("test", loads),
+            decode_cache=decode_cache,
+        )
+        return api, calls
+
+    def test_frozen_values_are_shared(self):
+        """Test that identical content returns the same read-only value."""
+        cache = DecodedContentCache()
+        body = _gerrit_json([{"name": "p", "branches": ["master"]}])
+        api, calls = self._api(cache, [body, body, _gerrit_json([])])
+        first = api.get("/projects/")
+        second = api.get("/projects/")
+        self.assertIs(first, second)
+        self.assertEqual(api.get("/projects/"), [])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertIsInstance(first, FrozenList)
+        self.assertIsInstance(first[0], FrozenDict)
+        with self.assertRaises(TypeError):
+            first[0]["name"] = "other"
+        with self.assertRaises(TypeError):
+            first[0]["branches"].append("stable")
+        thawed = copy.deepcopy(first)
+        thawed[0]["branches"].append("stable")
+        self.assertEqual(thawed[0]["branches"], ["master", "stable"])
+        self.assertEqual(
+            json.loads(json.dumps(first)), [{"name": "p", "branches": ["master"]}]
+        )
+
+    def test_copy_mode(self):
+        """Test that copy mode returns independent, modifiable, values."""
+        body = _gerrit_json({"a": [1]})
+        api, calls = self._api(DecodedContentCache(mode="copy"), [body, body])
+        api.get("/accounts/self")["a"].append(2)
+        self.assertEqual(api.get("/accounts/self"), {"a": [1]})
+        self.assertEqual(len(calls), 1)
+
+    def test_eviction(self):
+        """Test that the least recently used entries are evicted."""
+        cache = DecodedContentCache(max_bytes=30)
+        for number in range(5):
+            cache.get_or_decode(b"%10d" % number, lambda: number)
+        self.assertEqual(len(cache), 3)
+        self.assertLessEqual(cache.size, 30)
+        self.assertEqual(cache.get_or_decode(b"%10d" % 4, lambda: None), 4)
+        self.assertIsNone(cache.get_or_decode(b"%10d" % 0, lambda: None))
+
+    def test_invalid_mode(self):
+        """Test that an exception is raised for an invalid mode."""
+        with self.assertRaises(ValueError):
+            DecodedContentCache(mode="shared")
+
+
+class TestCoalescing(unittest.TestCase):
+    """Test that concurrent identical requests are coalesced."""
+
+    def test_threads_share_one_request(self):
+        """Test that concurrent GETs for the same endpoint send one request."""
+        entered = threading.Event()
+        release = threading.Event()
+
+        def handler(request):
+            entered.set()
+            release.wait(5)
+            return 200, JSON_HEADERS, _gerrit_json({"url": request.url})
+
+        api, adapter = _fake_api(handler, coalesce=True)
+        results = []
+
+        def get():
+            results.append(api.get("/changes/1"))
+
+        threads = [threading.Thread(target=get) for _ in range(5)]
+        threads[0].start()
+        entered.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(adapter.requests), 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_different_arguments_are_not_coalesced(self):
+        """Test that requests with different arguments are sent separately."""
+        api, adapter = _fake_api(
+            lambda request: (200, JSON_HEADERS, _gerrit_json({})), coalesce=True
+        )
+        api.get("/changes/1")
+        api.get("/changes/1", params={"o": "LABELS"})
+        api.get("/changes/1")
+        self.assertEqual(len(adapter.requests), 3)
+
+    def test_errors_are_shared(self):
+        """Test that waiting callers get the exception of the shared call."""
+        flight = SingleFlight()
+        with self.assertRaises(KeyError):
+            flight.do("key", lambda: {}["missing"])
+        self.assertEqual(flight.do("key", lambda: 1), 1)
+
+
+class TestRequestMetrics(unittest.TestCase):
+    """Test that requests are instrumented."""
+
+    def test_endpoint_template(self):
+        """Test that identifiers are replaced in endpoint templates."""
+        self.assertEqual(
+            endpoint_template("/changes/123/revisions/current/review?o=LABELS"),
+            "changes/{id}/revisions/{id}/review",
+        )
+        self.assertEqual(endpoint_template("/changes/?q=is:open"), "changes")
+        self.assertEqual(
+            endpoint_template("config/server/version"), "config/server/version"
+        )
+
+    def test_hooks_get_metrics(self):
+        """Test that hooks are called with the metrics of each request."""
+        recorded = []
+
+        def handler(request):
+            if request.url.endswith("/missing"):
+                return 404, JSON_HEADERS, b"Not found"
+            return 200, JSON_HEADERS, _gerrit_json({"_number": 1})
+
+        api, _ = _fake_api(handler, request_hooks=[recorded.append])
+        api.get("/changes/1/detail")
+        with self.assertRaises(requests.HTTPError):
+            api.get("/changes/missing")
+        self.assertEqual(len(recorded), 2)
+        metrics = recorded[0]
+        self.assertEqual(metrics.method, "GET")
+        self.assertEqual(metrics.endpoint_template, "changes/{id}/detail")
+        self.assertEqual(metrics.status, 200)
+        self.assertEqual(metrics.bytes, len(_gerrit_json({"_number": 1})))
+        self.assertIsNotNone(metrics.total)
+        self.assertIsNotNone(metrics.decode)
+        self.assertIsNone(metrics.error)
+        self.assertEqual(recorded[1].status, 404)
+        self.assertIsInstance(recorded[1].error, requests.HTTPError)
+
+    def test_failing_hook_is_ignored(self):
+        """Test that an exception raised by a hook does not fail the request."""
+
+        def hook(metrics):
+            raise RuntimeError("broken hook")
+
+        api, _ = _fake_api(
+            lambda request: (200, JSON_HEADERS, _gerrit_json([])),
+            request_hooks=[hook],
+        )
+        with patch("pygerrit2.rest.logger.exception"):
+            self.assertEqual(api.get("/changes/"), [])
+
+    def test_connection_timings(self):
+        """Test that connect time is recorded only for new connections."""
+        recorded = []
+        with LocalServer() as server:
+            api = GerritRestAPI(
+                url=server.url, auth=Anonymous(), request_hooks=[recorded.append]
+            )
+            api.get("/changes/")
+            api.get("/changes/")
+            api.session.close()
+        self.assertIsNotNone(recorded[0].connect)
+        self.assertIsNone(recorded[0].tls)
+        self.assertIsNotNone(recorded[0].ttfb)
+        self.assertIsNone(recorded[1].connect)
+
+    @unittest.skipIf(prometheus_client is None, "prometheus_client is not installed")
+    def test_prometheus_hook(self):
+        """Test that the Prometheus hook records counters and histograms."""
+        registry = prometheus_client.CollectorRegistry()
+        api, _ = _fake_api(
+            lambda request: (200, JSON_HEADERS, _gerrit_json([])),
+            request_hooks=[PrometheusHook(registry=registry)],
+        )
+        api.get("/changes/1")
+        api.get("/changes/2")
+        labels = {"method": "GET", "endpoint": "changes/{id}"}
+        self.assertEqual(
+            registry.get_sample_value(
+                "pygerrit2_requests_total", dict(labels, status="200")
+            ),
+            2,
+        )
+        self.assertEqual(
+            registry.get_sample_value(
+                "pygerrit2_request_duration_seconds_count", labels
+            ),
+            2,
+        )
+
+    @unittest.skipIf(TracerProvider is None, "opentelemetry-sdk is not installed")
+    def test_opentelemetry_hook(self):
+        """Test that the OpenTelemetry hook records a span per request."""
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        api, _ = _fake_api(
+            lambda request: (200, JSON_HEADERS, _gerrit_json([])),
+            request_hooks=[OpenTelemetryHook(provider.get_tracer("test"))],
+        )
+        api.get("/accounts/self")
+        spans = exporter.get_finished_spans()
+        self.assertEqual(len(spans), 1)
+        self.assertEqual(spans[0].name, "GET accounts/{id}")
+        self.assertEqual(spans[0].attributes["http.response.status_code"], 200)
+
+
+class FakeClock(object):
+    """Replacement for the `time` module in which sleeping is instant."""
+
+    def __init__(self):
+        """See class docstring."""
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        """Get the current time."""
+        return self.now
+
+    def time(self):
+        """Get the current time."""
+        return self.now
+
+    def sleep(self, seconds):
+        """Advance the current time."""
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestThrottle(unittest.TestCase):
+    """Test rate limiting and adaptive concurrency."""
+
+    def setUp(self):
+        """Replace the clock."""
+        self.clock = FakeClock()
+        patcher = patch("pygerrit2.rest.throttle.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_token_bucket(self):
+        """Test that the bucket allows a burst and then limits the rate."""
+        bucket = TokenBucket(rate=2, burst=2)
+        self.assertEqual([bucket.acquire() for _ in range(4)], [0, 0, 0.5, 0.5])
+        self.clock.now += 10
+        self.assertEqual([bucket.acquire() for _ in range(3)], [0, 0, 0.5])
+
+    def test_token_bucket_reserve_in_order(self):
+        """Test that concurrent waiters reserve successive tokens."""
+        bucket = TokenBucket(rate=4, burst=1)
+        self.assertEqual([bucket.reserve() for _ in range(4)], [0, 0.25, 0.5, 0.75])
+
+    def test_aimd(self):
+        """Test that the limit is decreased once per round and then grows."""
+        limiter = AdaptiveConcurrencyLimiter(maximum=8, minimum=2)
+        tickets = [limiter.acquire() for _ in range(4)]
+        self.assertEqual(limiter.in_flight, 4)
+        limiter.release(tickets[0], throttled=True)
+        self.assertEqual(limiter.limit, 4)
+        limiter.release(tickets[1], throttled=True)
+        self.assertEqual(limiter.limit, 4)
+        limiter.release(tickets[2], throttled=None)
+        limiter.release(tickets[3], throttled=None)
+        limiter.release(limiter.acquire(), throttled=True)
+        self.assertEqual(limiter.limit, 2)
+        limiter.release(limiter.acquire(), throttled=True)
+        self.assertEqual(limiter.limit, 2)
+        for _ in range(4):
+            limiter.release(limiter.acquire(), throttled=False)
+        self.assertEqual(limiter.limit, 3)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_limiter_blocks(self):
+        """Test that requests over the limit wait for a request to finish."""
+        limiter = AdaptiveConcurrencyLimiter(maximum=1)
+        ticket = limiter.acquire()
+        acquired = threading.Event()
+
+        def wait():
+            limiter.release(limiter.acquire())
+            acquired.set()
+
+        thread = threading.Thread(target=wait)
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        limiter.release(ticket)
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+
+    def test_parse_retry_after(self):
+        """Test that both forms of the Retry-After header are parsed."""
+        self.assertEqual(parse_retry_after("120"), 120)
+        self.assertEqual(parse_retry_after(" 3 "), 3)
+        self.assertEqual(
+            parse_retry_after("Thu, 01 Jan 1970 00:17:00 GMT"), 1020 - self.clock.now
+        )
+        self.assertEqual(parse_retry_after("Thu, 01 Jan 1970 00:00:00 GMT"), 0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+    def test_throttled_response(self):
+        """Test that a throttled response holds back the next requests."""
+        statuses = [429, 200, 200]
+
+        def handler(request):
+            status = statuses.pop(0)
+            headers = dict(JSON_HEADERS, **{"Retry-After": "7"})
+            return status, headers, _gerrit_json([])
+
+        throttle = Throttle(rate=10, max_concurrency=8, max_retry_after=5)
+        api, _ = _fake_api(handler, throttle=throttle)
+        with patch("pygerrit2.rest.throttle.logger"):
+            with self.assertRaises(requests.HTTPError):
+                api.get("/changes/")
+        self.assertEqual(throttle.limiter.limit, 4)
+        self.assertEqual(api.get("/changes/"), [])
+        self.assertEqual(self.clock.sleeps, [5])
+        self.assertEqual(api.get("/changes/"), [])
+        self.assertEqual(self.clock.sleeps, [5])
+        self.assertEqual(throttle.limiter.in_flight, 0)
+
+    def test_failed_request_releases(self):
+        """Test that a request failing without response is released."""
+
+        def handler(request):
+            raise requests.ConnectionError("refused")
+
+        throttle = Throttle(max_concurrency=2)
+        api, _ = _fake_api(handler, throttle=throttle)
+        with self.assertRaises(requests.ConnectionError):
+            api.get("/changes/")
+        self.assertEqual(throttle.limiter.in_flight, 0)
+        self.assertEqual(throttle.limiter.limit, 2)
+
+
+def _replay(*outcomes):
+    """Make a handler answering each request with the next outcome.
+
+    An outcome is a status code, a (status code, headers) tuple, or an
+    exception to raise.
+    """
+    outcomes = list(outcomes)
+
+    def handler(request):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        status, headers = outcome if isinstance(outcome, tuple) else (outcome, {})
+        return status, dict(JSON_HEADERS, **headers), _gerrit_json({})
+
+    return handler
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Test the retry policy and circuit breaker."""
+
+    def setUp(self):
+        """Replace the clock, and make the jitter use the longest delay."""
+        self.clock = FakeClock()
+        for target in ("pygerrit2.rest.retry.time", "pygerrit2.rest.throttle.time"):
+            patcher = patch(target, self.clock)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch("pygerrit2.rest.retry.random.uniform", lambda a, b: b)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_adapter_does_not_retry(self):
+        """Test that the default adapter leaves retries to the policy."""
+        api = GerritRestAPI(url="http://review.example.net", retry_policy=RetryPolicy())
+        adapter = api.session.get_adapter(api.url)
+        self.assertEqual(adapter.max_retries.total, 0)
+
+    def test_get_retried_with_jitter(self):
+        """Test that GET is retried with growing, capped delays."""
+        api, adapter = _fake_api(
+            _replay(503, 500, 502, 504, 200),
+            retry_policy=RetryPolicy(backoff=1, max_backoff=10),
+        )
+        result, response = api.get("/changes/1", return_response=True)
+        self.assertEqual(result, {})
+        self.assertEqual(len(adapter.requests), 5)
+        self.assertEqual(self.clock.sleeps, [3, 9, 10, 10])
+        self.assertEqual(response.retry_count, 4)
+
+    def test_retries_exhausted(self):
+        """Test that the last response is returned when retries run out."""
+        api, adapter = _fake_api(
+            _replay(500, 500, 500),
+            retry_policy=RetryPolicy(rules={"get": RetryRule(retries=2)}),
+        )
+        with self.assertRaises(requests.HTTPError):
+            api.get("/changes/1")
+        self.assertEqual(len(adapter.requests), 3)
+
+    def test_post_not_retried_when_processed(self):
+        """Test that POST is not retried if the server may have processed it."""
+        for outcome in (500, requests.ConnectionError("reset"), requests.ReadTimeout()):
+            api, adapter = _fake_api(_replay(outcome, 200), retry_policy=RetryPolicy())
+            with self.assertRaises(requests.RequestException):
+                api.post("/changes/1/revisions/1/review", json={})
+            self.assertEqual(len(adapter.requests), 1)
+
+    def test_post_retried_when_rejected(self):
+        """Test that POST is retried if the server did not process it."""
+        api, adapter = _fake_api(
+            _replay(requests.ConnectTimeout(), (429, {"Retry-After": "4"}), 200),
+            retry_policy=RetryPolicy(),
+        )
+        self.assertEqual(api.post("/changes/1/revisions/1/review", json={}), {})
+        self.assertEqual(len(adapter.requests), 3)
+        self.assertAlmostEqual(self.clock.sleeps[0], 0.9)
+        self.assertEqual(self.clock.sleeps[1], 4)
+
+    def test_retry_after_too_long(self):
+        """Test that a request is not retried if the server asks to wait long."""
+        api, adapter = _fake_api(
+            _replay((503, {"Retry-After": "600"}), 200),
+            retry_policy=RetryPolicy(max_retry_after=60),
+        )
+        with self.assertRaises(requests.HTTPError):
+            api.get("/changes/1")
+        self.assertEqual(len(adapter.requests), 1)
+
+    def test_deadline(self):
+        """Test that retries stop at the deadline and timeouts are limited."""
+        api, adapter = _fake_api(
+            _replay(500, 500, 500, 200),
+            retry_policy=RetryPolicy(backoff=2, deadline=15),
+        )
+        with self.assertRaises(requests.HTTPError):
+            api.get("/changes/1", timeout=(5, 20))
+        self.assertEqual(self.clock.sleeps, [6])
+        self.assertEqual(adapter.timeouts, [(5, 15), (5, 9)])
+
+    def test_circuit_breaker(self):
+        """Test that the circuit opens after failures and recovers."""
+        breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=30)
+        api, adapter = _fake_api(
+            _replay(500, requests.ConnectionError("refused"), 500, 200),
+            retry_policy=RetryPolicy(
+                rules={"GET": RetryRule(retries=0)}, circuit_breaker=breaker
+            ),
+        )
+        with patch("pygerrit2.rest.retry.logger"):
+            with self.assertRaises(requests.HTTPError):
+                api.get("/changes/1")
+            self.assertEqual(breaker.state, "closed")
+            with self.assertRaises(requests.ConnectionError):
+                api.get("/changes/1")
+            self.assertEqual(breaker.state, "open")
+            with self.assertRaises(CircuitOpenError):
+                api.get("/changes/1")
+            self.assertEqual(len(adapter.requests), 2)
+
+            self.clock.now += 30
+            self.assertEqual(breaker.state, "half-open")
+            with self.assertRaises(requests.HTTPError):
+                api.get("/changes/1")
+            self.assertEqual(breaker.state, "open")
+
+            self.clock.now += 30
+            self.assertEqual(api.get("/changes/1"), {})
+            self.assertEqual(breaker.state, "closed")
+        self.assertEqual(len(adapter.requests), 4)
+
+    def test_half_open_allows_one_trial(self):
+        """Test that only one trial request is sent while half-open."""
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=5)
+        with patch("pygerrit2.rest.retry.logger"):
+            breaker.record(error=requests.ConnectionError())
+        self.clock.now += 5
+        breaker.before_request()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_request()
+
+    def test_failed_trial_is_released(self):
+        """Test that a trial request failing unexpectedly can be sent again."""
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=5)
+        policy = RetryPolicy(circuit_breaker=breaker)
+        with patch("pygerrit2.rest.retry.logger"):
+            breaker.record(error=requests.ConnectionError())
+        self.clock.now += 5
+
+        def fail(remaining):
+            raise ValueError("unexpected")
+
+        with self.assertRaises(ValueError):
+            policy.call("GET", fail)
+        self.assertEqual(breaker.state, "half-open")
+        response = requests.Response()
+        response.status_code = 200
+        self.assertIs(policy.call("GET", lambda remaining: response), response)
+        self.assertEqual(breaker.state, "closed")
+
+    def test_deadline_passed_while_sleeping(self):
+        """Test that no request is sent once the deadline has passed."""
+        api, adapter = _fake_api(
+            _replay(500, 200), retry_policy=RetryPolicy(backoff=2, deadline=15)
+        )
+        sleep = self.clock.sleep
+        self.clock.sleep = lambda seconds: sleep(seconds + 20)
+        with self.assertRaises(requests.Timeout):
+            api.get("/changes/1")
+        self.assertEqual(len(adapter.requests), 1)
+
+
+class TestQueryBuilders(unittest.TestCase):
+    """Test the query endpoint builders."""
+
+    def test_change_query_minimal(self):
+        """Test that no options are requested by default."""
+        self.assertEqual(
+            ChangeQuery("status:open owner:self").endpoint(),
+            "/changes/?q=status:open%20owner:self",
+        )
+        self.assertEqual(ChangeQuery().endpoint(), "/changes/")
+
+    def test_change_query_preset(self):
+        """Test that presets, options and settings are added."""
+        query = ChangeQuery(
+            "project:foo/bar",
+            preset="ci",
+            options=["messages", "LABELS"],
+            limit=25,
+            start=50,
+            skip_visibility=True,
+        )
+        self.assertEqual(
+            str(query),
+            "/changes/?q=project:foo/bar&o=CURRENT_REVISION&o=CURRENT_COMMIT"
+            "&o=LABELS&o=SUBMIT_REQUIREMENTS&o=MESSAGES&n=25&S=50&skip-visibility",
+        )
+
+    def test_change_query_validation(self):
+        """Test that invalid options and settings are rejected."""
+        with self.assertRaises(ValueError):
+            ChangeQuery(preset="everything")
+        with self.assertRaises(ValueError):
+            ChangeQuery(options=["ALL_THE_THINGS"])
+        with self.assertRaises(ValueError):
+            ChangeQuery(limit=0)
+        with self.assertRaises(ValueError):
+            ChangeQuery(start=-1)
+        with self.assertRaisesRegex(ValueError, "CURRENT_FILES require"):
+            ChangeQuery(options=["CURRENT_FILES"]).endpoint()
+        ChangeQuery(preset="audit", options=["ALL_FILES"]).endpoint()
+
+    def test_account_query(self):
+        """Test building account queries."""
+        self.assertEqual(
+            AccountQuery("name:john", preset="audit", limit=5).endpoint(),
+            "/accounts/?q=name:john&o=DETAILS&o=ALL_EMAILS&n=5",
+        )
+        with self.assertRaises(ValueError):
+            AccountQuery("")
+        with self.assertRaises(ValueError):
+            AccountQuery("name:john", options=["MESSAGES"])
+
+    def test_project_query(self):
+        """Test building project listings."""
+        self.assertEqual(ProjectQuery().endpoint(), "/projects/")
+        self.assertEqual(
+            ProjectQuery(prefix="tools/", state="active", preset="audit").endpoint(),
+            "/projects/?p=tools/&state=ACTIVE&d&all",
+        )
+        self.assertEqual(
+            ProjectQuery(regex="^a.*", limit=10).endpoint(),
+            "/projects/?r=%5Ea.%2A&n=10",
+        )
+        with self.assertRaises(ValueError):
+            ProjectQuery(prefix="a", match="b")
+        with self.assertRaises(ValueError):
+            ProjectQuery(state="DELETED")
+
+    def test_get_with_query(self):
+        """Test that built endpoints can be sent."""
+        api, adapter = _fake_api(lambda request: (200, JSON_HEADERS, _gerrit_json([])))
+        api.get(ChangeQuery("is:open", preset="review", limit=10).endpoint())
+        self.assertEqual(
+            adapter.requests[0].url,
+            "http://review.example.com/changes/?q=is:open&o=DETAILED_LABELS"
+            "&o=DETAILED_ACCOUNTS&o=CURRENT_REVISION&o=SUBMITTABLE&n=10",
+        )
+
+
+def _change_info(number, detailed=True):
+    """Make the JSON of a change as returned by a query."""
+    owner = {"_account_id": 1000 + number % 10, "name": "Owner %d" % (number % 10)}
+    change = {
+        "id": "project~%d" % number,
+        "project": "tools/project",
+        "branch": "master",
+        "hashtags": [],
+        "change_id": "I%040x" % number,
+        "subject": "Change %d" % number,
+        "status": "NEW",
+        "created": "2026-01-01 00:00:00.000000000",
+        "updated": "2026-01-02 00:00:00.000000000",
+        "insertions": 300,
+        "deletions": 400,
+        "_number": number,
+        "owner": owner,
+        "submit_records": [
+            {
+                "rule_name": "gerrit~DefaultSubmitRule",
+                "status": "NOT_READY",
+                "labels": [{"label": "Code-Review", "status": "NEED"}],
+            }
+        ],
+    }
+    if not detailed:
+        return change
+    change.update(
+        {
+            "labels": {
+                "Code-Review": {
+                    "approved": owner,
+                    "all": [dict(owner, value=2, date="2026-01-02 00:00:00.000000000")],
+                    "values": {"-1": "No", " 0": "No score", "+1": "Yes"},
+                }
+            },
+            "current_revision": "%040x" % number,
+            "revisions": {
+                "%040x" % number: {"kind": "REWORK", "_number": 1, "uploader": owner}
+            },
+            "plugin_field": {"value": number},
+        }
+    )
+    return change
+
+
+class TestResultModels(unittest.TestCase):
+    """Test the typed result objects."""
+
+    def test_fields(self):
+        """Test that fields are accessible as attributes."""
+        change = ChangeInfo(json.loads(json.dumps(_change_info(1))))
+        self.assertEqual(change._number, 1)
+        self.assertEqual(change.subject, "Change 1")
+        self.assertEqual(change.get("topic", "none"), "none")
+        self.assertIsNone(change.topic)
+        self.assertIsNone(change.work_in_progress)
+        self.assertEqual(change.plugin_field, {"value": 1})
+        self.assertIsInstance(change.owner, AccountInfo)
+        self.assertEqual(change.owner.name, "Owner 1")
+        self.assertEqual(repr(change), "<ChangeInfo 1>")
+        with self.assertRaises(AttributeError):
+            change.no_such_field
+        with self.assertRaises(AttributeError):
+            change.no_such_field = 1
+
+    def test_sharing(self):
+        """Test that repeated values are interned and shared."""
+        first, second = ChangeInfo.decode(
+            json.loads(json.dumps([_change_info(1), _change_info(11)]))
+        )
+        self.assertIs(first.project, second.project)
+        self.assertIs(first.owner, second.owner)
+        self.assertIs(first.hashtags, second.hashtags)
+        self.assertIs(first.submit_records, second.submit_records)
+        self.assertIsInstance(first.submit_records, FrozenList)
+        with self.assertRaises(TypeError):
+            first.submit_records.append({})
+        self.assertIsNot(first.owner, ChangeInfo(_change_info(2)).owner)
+
+    def test_accounts_with_extra_fields(self):
+        """Test decoding accounts and votes with fields that have no slot."""
+        account = AccountInfo.decode(
+            {"_account_id": 2, "avatars": [{"url": "x"}], "inactive": True}
+        )
+        self.assertEqual(account.avatars, [{"url": "x"}])
+        self.assertTrue(account.inactive)
+        with self.assertRaises(TypeError):
+            account.status = "away"
+        change = ChangeInfo.decode(
+            {
+                "labels": {
+                    "CR": {
+                        "all": [
+                            {
+                                "_account_id": 6,
+                                "value": 1,
+                                "permitted_voting_range": {"min": -2, "max": 2},
+                            }
+                        ]
+                    }
+                }
+            }
+        )
+        approval = change.labels["CR"].all[0]
+        self.assertEqual(approval.permitted_voting_range, {"min": -2, "max": 2})
+        self.assertEqual(
+            pickle.loads(pickle.dumps(approval)).to_dict(), approval.to_dict()
+        )
+        self.assertEqual(copy.deepcopy(account).avatars, [{"url": "x"}])
+
+    def test_shared_accounts_are_read_only(self):
+        """Test that accounts shared between results cannot be modified."""
+        first, second = ChangeInfo.decode([_change_info(1), _change_info(11)])
+        with self.assertRaises(TypeError):
+            first.owner.name = "Someone else"
+        with self.assertRaises(TypeError):
+            del first.owner.email
+        approval = first.labels["Code-Review"].all[0]
+        with self.assertRaises(TypeError):
+            approval.value = -2
+        self.assertEqual(second.owner.name, "Owner 1")
+        self.assertEqual(approval.value, 2)
+        owner = copy.deepcopy(first.owner)
+        self.assertEqual(owner.to_dict(), first.owner.to_dict())
+        self.assertEqual(pickle.loads(pickle.dumps(approval)).value, 2)
+
+    def test_lazy_fields(self):
+        """Test that nested entities are decoded on first access."""
+        change = ChangeInfo(_change_info(1))
+        self.assertIsInstance(change._raw_labels, dict)
+        label = change.labels["Code-Review"]
+        self.assertIsInstance(label, LabelInfo)
+        self.assertFalse(hasattr(change, "_raw_labels"))
+        self.assertIs(change.labels, change.labels)
+        self.assertIs(label.approved, change.owner)
+        self.assertIsInstance(label.all[0], ApprovalInfo)
+        self.assertEqual(label.all[0].value, 2)
+        revision = change.revisions[change.current_revision]
+        self.assertIsInstance(revision, RevisionInfo)
+        self.assertEqual(revision.kind, "REWORK")
+        self.assertIs(revision.uploader, change.owner)
+        self.assertIsNone(change.reviewers)
+
+    def test_to_dict(self):
+        """Test that the objects can be converted back to JSON."""
+        data = _change_info(1)
+        self.assertEqual(ChangeInfo(data).to_dict(), data)
+        change = ChangeInfo(data)
+        change.labels
+        self.assertEqual(change.to_dict(), data)
+
+    def test_comments(self):
+        """Test decoding a map of comments."""
+        comments = CommentInfo.decode_map(
+            {
+                "a.py": [{"id": "c1", "line": 3, "author": {"_account_id": 1}}],
+                "b.py": [],
+            }
+        )
+        self.assertEqual(comments["a.py"][0].line, 3)
+        self.assertEqual(comments["a.py"][0].author._account_id, 1)
+        self.assertEqual(comments["b.py"], [])
+
+    def test_get_with_model(self):
+        """Test that results of requests can be decoded into objects."""
+        api, _ = _fake_api(
+            lambda request: (200, JSON_HEADERS, _gerrit_json([_change_info(1)]))
+        )
+        changes = api.get("/changes/", model=ChangeInfo)
+        self.assertEqual(changes[0]._number, 1)
+        changes = list(api.iter_query("/changes/", model=ChangeInfo))
+        self.assertEqual(changes[0]._number, 1)
+        changes = list(api.iter_get("/changes/", model=ChangeInfo))
+        self.assertEqual(changes[0]._number, 1)
+
+    def test_memory(self):
+        """Test that objects take much less memory than the decoded JSON."""
+        content = json.dumps(
+            [_change_info(number, detailed=False) for number in range(2000)]
+        )
+
+        def measure(decode):
+            tracemalloc.start()
+            try:
+                value = decode()
+                return tracemalloc.get_traced_memory()[0], value
+            finally:
+                tracemalloc.stop()
+
+        raw_size, _ = measure(lambda: json.loads(content))
+        typed_size, _ = measure(lambda: ChangeInfo.decode(json.loads(content)))
+        self.assertLess(typed_size * 2, raw_size)
+
+
+@unittest.skipIf(simdjson is None, "pysimdjson is not installed")
+class TestLazyDecode(unittest.TestCase):
+    """Test that responses can be decoded lazily."""
+
+    def test_lazy_get(self):
+        """Test that nested fields are decoded on access."""
+        changes = [_change_info(1), _change_info(2)]
+        api, _ = _fake_api(
+            lambda request: (200, JSON_HEADERS, b"\n" + _gerrit_json(changes))
+        )
+        result = api.get("/changes/", lazy=True)
+        self.assertNotIsInstance(result, list)
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result[1]["_number"], 2)
+        self.assertEqual(result[0]["owner"]["name"], "Owner 1")
+        self.assertIn("labels", result[0])
+        self.assertIsNone(result[0].get("topic"))
+        self.assertEqual(result[0].at_pointer("/labels/Code-Review/all/0/value"), 2)
+        self.assertEqual([change["_number"] for change in result], [1, 2])
+        self.assertEqual(result.as_list(), changes)
+
+    def test_non_utf8_encoding(self):
+        """Test that content in other encodings is decoded."""
+        body = (
+            GERRIT_MAGIC_JSON_PREFIX
+            + json.dumps({"name": "caf\u00e9"}, ensure_ascii=False)
+        ).encode("latin-1")
+        headers = {"Content-Type": "application/json; charset=ISO-8859-1"}
+        api, _ = _fake_api(lambda request: (200, headers, body))
+        self.assertEqual(api.get("/accounts/self", lazy=True)["name"], "caf\u00e9")
+
+    def test_non_json_response(self):
+        """Test that responses which are not JSON are returned as text."""
+        api, _ = _fake_api(
+            lambda request: (200, {"Content-Type": "text/plain"}, b"3.9.1")
+        )
+        self.assertEqual(api.get("/config/server/version", lazy=True), "3.9.1")
+
+    def test_invalid_json_raises(self):
+        """Test that invalid content raises ValueError."""
+        with self.assertRaises(ValueError):
+            lazy_loads(b'{"a": ')
+
+    def test_not_combined_with_model(self):
+        """Test that lazy decoding cannot be combined with a model."""
+        api, adapter = _fake_api(lambda request: (200, JSON_HEADERS, _gerrit_json([])))
+        with self.assertRaises(ValueError):
+            api.get("/changes/", lazy=True, model=ChangeInfo)
+        self.assertEqual(adapter.requests, [])
+
+    def test_cache_bypassed(self):
+        """Test that lazy results are not cached."""
+        api, adapter = _fake_api(
+            lambda request: (200, JSON_HEADERS, _gerrit_json({"a": 1})),
+            cache=ResponseCache(ttl=60),
+        )
+        api.get("/config/server/info", lazy=True)
+        api.get("/config/server/info", lazy=True)
+        self.assertEqual(len(adapter.requests), 2)
+        self.assertEqual(api.get("/config/server/info"), {"a": 1})
+
+
+def _event(type_, number, **fields):
+    event = {
+        "type": type_,
+        "eventCreatedOn": 1700000000 + number,
+        "change": {
+            "project": "project",
+            "branch": "master",
+            "number": number,
+            "owner": {"name": "Owner", "email": "owner@example.com"},
+        },
+        "patchSet": {"number": 1, "revision": "%040d" % number},
+    }
+    event.update(fields)
+    return event
+
+
+def _event_lines(events):
+    return b"".join(json.dumps(event).encode("utf-8") + b"\n" for event in events)
+
+
+class TestEventStream(unittest.TestCase):
+    """Test consuming Gerrit's event stream."""
+
+    def test_typed_events(self):
+        """Test that events are decoded into typed objects."""
+        event = decode_event(
+            _event(
+                "comment-added",
+                1,
+                author={"name": "Owner", "email": "owner@example.com"},
+                approvals=[{"type": "Code-Review", "value": "2"}],
+                comment="Patch Set 1: Code-Review+2",
+            )
+        )
+        self.assertIsInstance(event, CommentAddedEvent)
+        self.assertEqual(event.change.number, 1)
+        self.assertEqual(event.patchSet.revision, "%040d" % 1)
+        self.assertIs(event.author, event.change.owner)
+        self.assertEqual(event.approvals[0].type, "Code-Review")
+        self.assertEqual(event.change_key, ("project", 1))
+        ref_updated = decode_event(
+            {
+                "type": "ref-updated",
+                "refUpdate": {"project": "project", "refName": "refs/heads/main"},
+            }
+        )
+        self.assertIsInstance(ref_updated, RefUpdatedEvent)
+        self.assertEqual(ref_updated.change_key, ("project", "refs/heads/main"))
+        unknown = decode_event({"type": "plugin-event", "data": 1})
+        self.assertIs(type(unknown), GerritEvent)
+        self.assertEqual(unknown.data, 1)
+        self.assertIsNone(unknown.change_key)
+
+    def test_parse_across_chunks(self):
+        """Test that events split across reads are parsed."""
+        events = [_event("patchset-created", number) for number in range(20)]
+        content = _event_lines(events[:10]) + b"not json\n\n[1]\n"
+        content += _event_lines(events[10:]).rstrip(b"\n")
+        for read_size in (1, 7, 100, len(content)):
+            source = io.BufferedReader(io.BytesIO(content))
+            parsed = list(iter_events(source, read_size=read_size))
+            self.assertEqual([event.to_dict() for event in parsed], events)
+        parsed = list(iter_events(io.StringIO(content.decode("utf-8"))))
+        self.assertEqual(len(parsed), 20)
+
+    def test_socket_source(self):
+        """Test that events are read from a socket."""
+        events = [_event("patchset-created", number) for number in range(100)]
+        reader, writer = socket.socketpair()
+        stream = GerritEventStream(reader, workers=3)
+        received = []
+        stream.add_handler(received.append)
+        stream.start()
+        writer.sendall(_event_lines(events))
+        writer.close()
+        stream.join(timeout=10)
+        reader.close()
+        self.assertEqual(stream.received, 100)
+        self.assertEqual(stream.handled, 100)
+        self.assertEqual(len(received), 100)
+
+    def test_dispatch_keeps_order_per_change(self):
+        """Test that events about a change are handled in order."""
+        events = [
+            _event("comment-added", number % 7, comment=str(number))
+            for number in range(500)
+        ]
+        lock = threading.Lock()
+        handled = {}
+
+        def record(event):
+            with lock:
+                handled.setdefault(event.change.number, []).append(event.comment)
+
+        stream = GerritEventStream(io.BytesIO(_event_lines(events)), workers=4)
+        stream.add_handler(record, "comment-added")
+        stream.run()
+        for number, comments in handled.items():
+            expected = [str(n) for n in range(500) if n % 7 == number]
+            self.assertEqual(comments, expected)
+        self.assertEqual(stream.handled, 500)
+        self.assertEqual(stream.errors, 0)
+
+    def test_handler_errors_are_counted(self):
+        """Test that a failing handler does not stop the stream."""
+        events = [_event("patchset-created", number) for number in range(5)]
+        stream = GerritEventStream(io.BytesIO(_event_lines(events)))
+        received = []
+
+        @stream.handler("patchset-created")
+        def fail(event):
+            raise RuntimeError("handler failed")
+
+        stream.add_handler(received.append)
+        with patch("pygerrit2.stream.logger"):
+            stream.run()
+        self.assertEqual(len(received), 5)
+        self.assertEqual(stream.errors, 5)
+
+    def test_backpressure(self):
+        """Test that reading waits while the queues are full."""
+        events = [_event("patchset-created", 1) for _ in range(10)]
+        lines = _event_lines(events).splitlines(keepends=True)
+        read = []
+
+        def source():
+            for line in lines:
+                read.append(line)
+                yield line
+
+        release = threading.Event()
+        stream = GerritEventStream(source(), workers=1, queue_size=1)
+        stream.add_handler(lambda event: release.wait(10))
+        stream.start()
+        time.sleep(0.2)
+        # One event being handled, one queued, one waiting to be queued.
+        self.assertLessEqual(len(read), 4)
+        release.set()
+        stream.join(timeout=10)
+        self.assertEqual(stream.handled, 10)
+
+    def test_get_change(self):
+        """Test looking up the change of an event with the REST API."""
+        api, adapter = _fake_api(
+            lambda request: (200, JSON_HEADERS, _gerrit_json([_change_info(3)]))
+        )
+        stream = GerritEventStream(io.BytesIO(b""), rest=api)
+        change = stream.get_change(decode_event(_event("patchset-created", 3)))
+        self.assertIsInstance(change, ChangeInfo)
+        self.assertEqual(change._number, 3)
+        self.assertIn("q=change:3", adapter.requests[0].url)
+        self.assertIsNone(stream.get_change(decode_event({"type": "ref-updated"})))
+
+
+def _query_changes(request, missing=()):
+    """Answer a `change:A OR change:B` query with the changes found."""
+    query = parse_qs(urlsplit(request.url).query)["q"][0]
+    numbers = [int(term.split(":")[1]) for term in query.split(" OR ")]
+    changes = [_change_info(number) for number in numbers if number not in missing]
+    return 200, JSON_HEADERS, _gerrit_json(changes)
+
+
+class TestChangeBatcher(unittest.TestCase):
+    """Test looking up changes in batches."""
+
+    def test_lookups_are_batched_and_deduplicated(self):
+        """Test that concurrent lookups are sent as one query."""
+        api, adapter = _fake_api(lambda request: _query_changes(request, [4]))
+        batcher = ChangeBatcher(api, window=10)
+        futures = [batcher.submit(number) for number in (1, 2, 2, "3", 4)]
+        self.assertIs(futures[1], futures[2])
+        batcher.flush()
+        results = [future.result(10) for future in futures]
+        self.assertEqual(len(adapter.requests), 1)
+        self.assertNotIn("n=", adapter.requests[0].url)
+        self.assertEqual([change._number for change in results[:4]], [1, 2, 2, 3])
+        self.assertIsInstance(results[0], ChangeInfo)
+        self.assertIsNone(results[4])
+        self.assertEqual((batcher.lookups, batcher.queries), (5, 1))
+
+    def test_window(self):
+        """Test that lookups are sent at the end of the window."""
+        api, adapter = _fake_api(_query_changes)
+        batcher = ChangeBatcher(api, window=0.05)
+        results = []
+        threads = [
+            threading.Thread(target=lambda n=n: results.append(batcher.get(n, 10)))
+            for n in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(change._number for change in results), list(range(20)))
+        self.assertLessEqual(len(adapter.requests), 2)
+
+    def test_split_by_url_length(self):
+        """Test that large batches are split into several queries."""
+        api, adapter = _fake_api(_query_changes)
+        batcher = ChangeBatcher(api, window=10, max_url_length=150)
+        futures = [batcher.submit(number) for number in range(1000, 1030)]
+        batcher.flush()
+        results = [future.result(10) for future in futures]
+        self.assertEqual(
+            [change._number for change in results], list(range(1000, 1030))
+        )
+        self.assertGreater(len(adapter.requests), 1)
+        for request in adapter.requests:
+            self.assertLessEqual(len(request.url), 150)
+
+    def test_max_batch(self):
+        """Test that a full batch is sent without waiting for the window."""
+        api, adapter = _fake_api(_query_changes)
+        batcher = ChangeBatcher(api, window=60, max_batch=3)
+        futures = [batcher.submit(number) for number in range(3)]
+        self.assertEqual(futures[2].result(10)._number, 2)
+        self.assertEqual(len(adapter.requests), 1)
+
+    def test_errors_are_raised(self):
+        """Test that a failed query raises for all of its lookups."""
+        api, _ = _fake_api(lambda request: (500, {}, b"Internal error"))
+        batcher = ChangeBatcher(api, window=10)
+        futures = [batcher.submit(number) for number in range(2)]
+        batcher.flush()
+        for future in futures:
+            with self.assertRaises(requests.HTTPError):
+                future.result(10)
+
+    def test_change_ids_and_more_changes(self):
+        """Test lookups by Change-Id matching several changes, over pages."""
+        picked = dict(_change_info(1), _number=7, id="project~7", branch="stable")
+        pages = {
+            "0": [_change_info(1), picked, dict(_change_info(2), _more_changes=True)],
+            "3": [_change_info(3)],
+        }
+
+        def handler(request):
+            start = parse_qs(urlsplit(request.url).query).get("S", ["0"])[0]
+            return 200, JSON_HEADERS, _gerrit_json(pages[start])
+
+        api, adapter = _fake_api(handler)
+        batcher = ChangeBatcher(api, window=10)
+        keys = ["I%040x" % number for number in (1, 2, 3, 4)] + ["project~7"]
+        futures = [batcher.submit(key) for key in keys]
+        batcher.flush()
+        with self.assertRaises(ValueError):
+            futures[0].result(10)
+        self.assertEqual(futures[1].result(10)._number, 2)
+        self.assertEqual(futures[2].result(10)._number, 3)
+        self.assertIsNone(futures[3].result(10))
+        self.assertEqual(futures[4].result(10).branch, "stable")
+        self.assertEqual(len(adapter.requests), 2)
+        self.assertEqual(batcher.queries, 2)
+
+    def test_project_with_slash(self):
+        """Test lookups by project~number when the project has a slash."""
+        change = dict(
+            _change_info(8),
+            project="platform/build",
+            id="platform%2Fbuild~8",
+            triplet_id="platform%2Fbuild~master~I" + "0" * 40,
+        )
+        api, _ = _fake_api(lambda request: (200, JSON_HEADERS, _gerrit_json([change])))
+        batcher = ChangeBatcher(api, window=10)
+        keys = ["platform/build~8", "platform%2Fbuild~8"]
+        futures = [batcher.submit(key) for key in keys]
+        batcher.flush()
+        self.assertEqual(futures[0].result(10)._number, 8)
+        self.assertEqual(futures[1].result(10)._number, 8)
+
+    def test_event_stream_lookups(self):
+        """Test that the event stream batches the lookups of its handlers."""
+        api, adapter = _fake_api(_query_changes)
+        events = [_event("patchset-created", number) for number in range(64)]
+        stream = GerritEventStream(
+            io.BytesIO(_event_lines(events)), rest=api, workers=16, batch_window=0.05
+        )
+        found = []
+        stream.add_handler(lambda event: found.append(stream.get_change(event)))
+        stream.run()
+        self.assertEqual(sorted(change._number for change in found), list(range(64)))
+        self.assertLessEqual(len(adapter.requests), 8)
+
+
+class TestIterGet(unittest.TestCase):
+    """Test that responses are decoded as a stream."""
+
+    def test_elements_are_decoded_across_chunks(self):
+        """Test that elements split across chunk boundaries are decoded."""
+        changes = [
+            {"_number": 1, "subject": "brackets ]}[{ in a string"},
+            {"_number": 22, "labels": {"Verified": {"values": [1, -1]}}},
+            12345,
+            1.5e10,
+        ]
+        body = _gerrit_json(changes)
+        api, _ = _fake_api(lambda request: (200, JSON_HEADERS, body))
+        for chunk_size in (1, 3, 7, len(body)):
+            results = list(api.iter_get("/changes/", chunk_size=chunk_size))
+            self.assertEqual(results, changes)
+
+    def test_non_array_is_single_element(self):
+        """Test that a response which is not an array is a single element."""
+        body = _gerrit_json({"name": "project"})
+        api, _ = _fake_api(lambda request: (200, JSON_HEADERS, body))
+        results = list(api.iter_get("/projects/project", chunk_size=4))
+        self.assertEqual(results, [{"name": "project"}])
+
+    def test_empty_array(self):
+        """Test that an empty array generates no elements."""
+        body = _gerrit_json([])
+        api, _ = _fake_api(lambda request: (200, JSON_HEADERS, body))
+        self.assertEqual(list(api.iter_get("/changes/")), [])
+
+    def test_truncated_response_raises(self):
+        """Test that a truncated response raises an exception."""
+        body = _gerrit_json([{"a": 1}, {"b": 2}])[:-3]
+        api, _ = _fake_api(lambda request: (200, JSON_HEADERS, body))
+        results = api.iter_get("/changes/", chunk_size=5)
+        self.assertEqual(next(results), {"a": 1})
+        with self.assertRaises(ValueError):
+            next(results)
+
+    def test_http_error_raises(self):
+        """Test that an HTTP error status raises an exception."""
+        api, _ = _fake_api(lambda request: (404, JSON_HEADERS, b"Not found"))
+        with self.assertRaises(requests.HTTPError):
+            list(api.iter_get("/changes/missing"))
+
+
+class TestDownload(unittest.TestCase):
+    """Test that response bodies are downloaded to files."""
+
+    def setUp(self):
+        """Create a directory to download to."""
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "download")
+
+    def tearDown(self):
+        """Remove the directory."""
+        shutil.rmtree(self.directory)
+
+    def test_base64_is_decoded_across_chunks(self):
+        """Test that base64 content is decoded whatever the chunk size."""
+        content = bytes(range(256)) * 3 + b"end"
+        headers = {"Content-Type": "text/plain", "X-FYI-Content-Encoding": "base64"}
+        api, adapter = _fake_api(
+            lambda request: (200, headers, base64.b64encode(content))
+        )
+        for chunk_size in (1, 5, 7, 4096):
+            f = io.BytesIO()
+            written = api.download(
+                "/changes/1/revisions/1/files/a.bin/content", f, chunk_size=chunk_size
+            )
+            self.assertEqual(f.getvalue(), content)
+            self.assertEqual(written, len(content))
+        self.assertEqual(adapter.requests[0].headers["Accept"], "*/*")
+
+    def test_binary_download_to_path(self):
+        """Test that binary content is written to a path as is."""
+        content = os.urandom(5000)
+        headers = {"Content-Type": "application/x-gzip"}
+        headers["Content-Length"] = str(len(content))
+        api, _ = _fake_api(lambda request: (200, headers, content))
+        progress = []
+        api.download(
+            "/changes/1/revisions/1/archive?format=tgz",
+            self.path,
+            chunk_size=1000,
+            progress=lambda received, total: progress.append((received, total)),
+        )
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), content)
+        self.assertEqual(os.listdir(self.directory), ["download"])
+        self.assertEqual(progress[0], (1000, len(content)))
+        self.assertEqual(progress[-1], (len(content), len(content)))
+
+    def test_failed_download_keeps_file(self):
+        """Test that a file is not replaced by a failed download."""
+        with open(self.path, "wb") as f:
+            f.write(b"previous")
+        headers = {"Content-Type": "text/plain", "X-FYI-Content-Encoding": "base64"}
+        api, _ = _fake_api(lambda request: (200, headers, b"YWJjZA"))
+        with self.assertRaises(ValueError):
+            api.download("/changes/1/revisions/1/patch", self.path)
+        api, _ = _fake_api(lambda request: (404, {}, b"Not found"))
+        with self.assertRaises(requests.HTTPError):
+            api.download("/changes/1/revisions/1/patch", self.path)
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), b"previous")
+        self.assertEqual(os.listdir(self.directory), ["download"])
+
+
+class TestStreamingUpload(unittest.TestCase):
+    """Test that request bodies can be streamed."""
+
+    def test_json_stream(self):
+        """Test that a JSON stream is sent in chunks as a JSON body."""
+        review = {
+            "message": "\u00e5",
+            "comments": {
+                "a.txt": [{"line": n, "message": "x" * 50} for n in range(500)]
+            },
+        }
+        stream = JSONStream(review, chunk_size=1000)
+        chunks = list(stream)
+        self.assertGreater(len(chunks), 10)
+        self.assertTrue(all(len(chunk) < 1100 for chunk in chunks))
+        self.assertEqual(list(stream), chunks)
+
+        bodies = []
+
+        def handler(request):
+            bodies.append(b"".join(request.body))
+            return 200, JSON_HEADERS, _gerrit_json({})
+
+        api, adapter = _fake_api(handler)
+        api.post("/changes/1/revisions/1/review", data=stream)
+        headers = adapter.requests[0].headers
+        self.assertEqual(headers["Content-Type"], "application/json;charset=UTF-8")
+        self.assertEqual(headers["Transfer-Encoding"], "chunked")
+        self.assertEqual(json.loads(bodies[0]), review)
+
+    def test_file_is_rewound_for_retries(self):
+        """Test that a file body is sent again in full when retried."""
+        bodies = []
+
+        def handler(request):
+            bodies.append(request.body.read())
+            status = 503 if len(bodies) == 1 else 204
+            return status, {}, b""
+
+        api, _ = _fake_api(handler, retry_policy=RetryPolicy(backoff=0))
+        api.put("/changes/1/edit/a.bin", data=io.BytesIO(b"content"))
+        self.assertEqual(bodies, [b"content", b"content"])
+
+    def test_generator_is_not_retried(self):
+        """Test that a body which cannot be sent again is not retried."""
+        bodies = []
+
+        def handler(request):
+            bodies.append(b"".join(request.body))
+            return 503, {}, b""
+
+        api, _ = _fake_api(handler, retry_policy=RetryPolicy(backoff=0))
+        with self.assertRaises(requests.HTTPError):
+            api.put("/changes/1/edit/a.bin", data=iter([b"con", b"tent"]))
+        self.assertEqual(bodies, [b"content"])
+
+    def test_adapter_does_not_retry_generator(self):
+        """Test that the default adapter does not retry generator bodies."""
+        adapter = GerritHTTPAdapter(max_retries=5)
+        retries = []
+
+        def send(self, request, **kwargs):
+            retries.append(self.max_retries.total)
+            return requests.Response()
+
+        with patch.object(HTTPAdapter, "send", send):
+            for data in (b"content", iter([b"content"])):
+                request = requests.Request(
+                    "PUT", "http://review.example.com", data=data
+                )
+                adapter.send(request.prepare())
+        self.assertEqual(retries, [5, 0])
+        self.assertEqual(adapter.max_retries.total, 5)
+
+
+class TestJSONBackend(unittest.TestCase):
+    """Test that the JSON backend is pluggable."""
+
+    def test_named_backend(self):
+        """Test that the standard library backend can be selected by name."""
+        backend = get_json_backend("json")
+        self.assertEqual(backend.name, "json")
+        self.assertEqual(backend.loads(b'{"a": [1]}'), {"a": [1]})
+        self.assertEqual(json.loads(backend.dumps({"a": "\u00e5"})), {"a": "\u00e5"})
+
+    def test_unknown_backend(self):
+        """Test that an exception is raised for an unknown backend."""
+        with self.assertRaises(ValueError):
+            get_json_backend("nosuchjson")
+
+    def test_auto_detected_backend_matches_stdlib(self):
+        """Test that the auto-detected backend gives the same results."""
+        backend = get_json_backend()
+        document = '{"n": 1, "f": 0.1, "s": "\u00e5", "l": [true, null]}'
+        self.assertEqual(backend.loads(document), json.loads(document))
+        data = {1: "int key", "big": 2**70, "f": 0.1}
+        self.assertEqual(json.loads(backend.dumps(data)), json.loads(json.dumps(data)))
+
+    def test_client_uses_backend(self):
+        """Test that the client decodes and encodes with its backend."""
+        calls = []
+
+        def loads(content):
+            calls.append("loads")
+            return json.loads(content)
+
+        def dumps(obj):
+            calls.append("dumps")
+            return json.dumps(obj).encode("utf-8")
+
+        backend = JSONBackend("test", loads, dumps)
+        api, adapter = _fake_api(
+            lambda request: (200, JSON_HEADERS, _gerrit_json({"ok": True})),
+            json_backend=backend,
+        )
+        self.assertEqual(api.post("/changes/", json={"a": "b"}), {"ok": True})
+        self.assertEqual(calls, ["dumps", "loads"])
+        request = adapter.requests[0]
+        self.assertEqual(json.loads(request.body), {"a": "b"})
+        self.assertEqual(
+            request.headers["Content-Type"], "application/json;charset=UTF-8"
+        )
+
+    def test_buffer_is_decoded_without_copy(self):
+        """Test that the content after the prefix is passed as a view."""
+        buffers = []
+
+        def loads_buffer(buffer):
+            buffers.append(buffer)
+            return json.loads(bytes(buffer))
+
+        backend = JSONBackend("test", loads_buffer=loads_buffer)
+        content = b"\n " + _gerrit_json({"a": "\u00e5"}) + b"\n"
+        api, _ = _fake_api(
+            lambda request: (200, JSON_HEADERS, content), json_backend=backend
+        )
+        self.assertEqual(api.get("/accounts/self"), {"a": "\u00e5"})
+        self.assertIsInstance(buffers[0], memoryview)
+        self.assertTrue(bytes(buffers[0]).startswith(b"{"))
+
+    def test_decode_content(self):
+        """Test that content is decoded the same without buffer support."""
+        for backend in (get_json_backend("json"), get_json_backend()):
+            api, _ = _fake_api(
+                lambda request: (200, JSON_HEADERS, request.body),
+                json_backend=backend,
+            )
+            self.assertEqual(
+                api.put("/x", data=_gerrit_json([1, "\u00e5"])), [1, "\u00e5"]
+            )
+            self.assertEqual(api.put("/x", data=b'  {"a": 1} '), {"a": 1})
+            self.assertEqual(api.put("/x", data=b" \n"), "")
+            with self.assertRaises(ValueError):
+                api.put("/x", data=GERRIT_MAGIC_JSON_PREFIX.encode() + b"{")
+        latin1 = {"Content-Type": "application/json; charset=ISO-8859-1"}
+        api, _ = _fake_api(lambda request: (200, latin1, b'["\xe5"]'))
+        self.assertEqual(api.get("/x"), ["\u00e5"])
+
+    def test_review_is_encoded_as_json(self):
+        """Test that a review is sent as a JSON encoded ReviewInput."""
+        api, adapter = _fake_api(
+            lambda request: (200, JSON_HEADERS, _gerrit_json({"labels": {}}))
+        )
+        review = GerritReview(message="msg", labels={"Verified": 1})
+        api.review("1", "current", review)
+        request = adapter.requests[0]
+        self.assertEqual(
+            request.url, "http://review.example.com/changes/1/revisions/current/review"
+        )
+        self.assertEqual(json.loads(request.body), review.review_input())
+
+
+@unittest.skipIf(httpx is None, "httpx is not installed")
+class TestHTTP2Adapter(unittest.TestCase):
+    """Test that the HTTP2Adapter class behaves properly."""
+
+    def _api(self, handler, **kwargs):
+        adapter = HTTP2Adapter(transport=httpx.MockTransport(handler))
+        return GerritRestAPI(
+            url="http://review.example.com",
+            auth=HTTPBasicAuth("user", "pass"),
+            adapter=adapter,
+            **kwargs
+        )
+
+    def test_get(self):
+        """Test that requests are translated to and from httpx."""
+        sent = []
+
+        def handler(request):
+            sent.append(request)
+            return httpx.Response(
+                200,
+                headers={"Content-Type": "application/json; charset=UTF-8"},
+                content=_gerrit_json({"_number": 1}),
+            )
+
+        api = self._api(handler)
+        result, response = api.get("/changes/1", return_response=True, timeout=(2, 5))
+        self.assertEqual(result, {"_number": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.encoding, "UTF-8")
+        request = sent[0]
+        self.assertEqual(str(request.url), "http://review.example.com/a/changes/1")
+        self.assertTrue(request.headers["Authorization"].startswith("Basic "))
+        self.assertEqual(request.headers["Accept"], "application/json")
+        self.assertTrue(request.headers["User-Agent"].startswith("python-requests"))
+        self.assertEqual(
+            request.extensions["timeout"],
+            {"connect": 2, "read": 5, "write": 5, "pool": 5},
+        )
+
+    def test_post_and_gzip(self):
+        """Test that request bodies are sent and gzip content is decoded."""
+        sent = []
+
+        def handler(request):
+            sent.append(json.loads(request.content))
+            body = gzip.compress(_gerrit_json({"ok": True}))
+            return httpx.Response(
+                200,
+                headers={
+                    "Content-Type": "application/json",
+                    "Content-Encoding": "gzip",
+                },
+                content=body,
+            )
+
+        api = self._api(handler)
+        self.assertEqual(api.post("/changes/1/review", json={"a": 1}), {"ok": True})
+        self.assertEqual(sent, [{"a": 1}])
+
+    def test_stream(self):
+        """Test that streamed responses are decoded incrementally."""
+        data = [{"_number": number} for number in range(100)]
+
+        def handler(request):
+            return httpx.Response(
+                200,
+                headers={"Content-Type": "application/json"},
+                content=iter([_gerrit_json(data)[:50], _gerrit_json(data)[50:]]),
+            )
+
+        api = self._api(handler)
+        self.assertEqual(list(api.iter_get("/changes/", chunk_size=64)), data)
+
+    def test_errors(self):
+        """Test that httpx exceptions are raised as requests exceptions."""
+        for error, expected in (
+            (httpx.ConnectTimeout, requests.ConnectTimeout),
+            (httpx.ReadTimeout, requests.ReadTimeout),
+            (httpx.ConnectError, requests.ConnectionError),
+        ):
+
+            def handler(request):
+                raise error("failed", request=request)
+
+            with self.assertRaises(expected):
+                self._api(handler).get("/changes/")
+
+    def test_real_connection(self):
+        """Test that the adapter works with a real server."""
+        with LocalServer() as server:
+            api = GerritRestAPI(url=server.url, adapter=HTTP2Adapter())
+            self.assertEqual(api.get("/changes/"), [])
+            self.assertEqual(api.get("/changes/", return_response=True)[0], [])
+            api.session.close()
+
+
+@unittest.skipIf(httpx is None, "httpx is not installed")
+class TestAsyncGerritRestAPI(unittest.TestCase):
+    """Test that the AsyncGerritRestAPI class behaves properly."""
+
+    def _api(self, handler, auth=None):
+        return AsyncGerritRestAPI(
+            url="http://review.example.com",
+            auth=auth or Anonymous(),
+            transport=httpx.MockTransport(handler),
+        )
+
+    def _json_response(self, data):
+        return httpx.Response(
+            200,
+            headers={"Content-Type": "application/json; charset=UTF-8"},
+            content=GERRIT_MAGIC_JSON_PREFIX + json.dumps(data),
+        )
+
+    def test_get_decodes_json(self):
+        """Test that the magic prefix is stripped and the content decoded."""
+        sent = []
+
+        def handler(request):
+            sent.append(request)
+            return self._json_response([{"_number": 1}])
+
+        async def run():
+            async with self._api(handler) as api:
+                return await api.get("/changes/")
+
+        self.assertEqual(asyncio.run(run()), [{"_number": 1}])
+        assert str(sent[0].url) == "http://review.example.com/changes/"
+        assert sent[0].headers["Accept"] == "application/json"
+
+    def test_json_stream_body(self):
+        """Test that a JSON stream is sent as a JSON body."""
+        sent = []
+
+        def handler(request):
+            sent.append(request)
+            return self._json_response({})
+
+        async def run():
+            async with self._api(handler) as api:
+                await api.post("/changes/", data=JSONStream({"a": [1, 2]}, 4))
+
+        asyncio.run(run())
+        self.assertEqual(json.loads(sent[0].content), {"a": [1, 2]})
+        self.assertEqual(
+            sent[0].headers["Content-Type"], "application/json;charset=UTF-8"
+        )
+
+    def test_streamed_bodies(self):
+        """Test that generators and file objects are streamed."""
+        sent = []
+
+        def handler(request):
+            sent.append(request)
+            return self._json_response({})
+
+        async def run():
+            async with self._api(handler) as api:
+                await api.put("/changes/1/edit/a", data=(c for c in [b"ab", b"cd"]))
+                await api.put("/changes/1/edit/b", data=io.BytesIO(b"x" * 100000))
+                await api.put("/changes/1/edit/c", data=b"bytes")
+
+        asyncio.run(run())
+        self.assertEqual(sent[0].content, b"abcd")
+        self.assertEqual(sent[0].headers["Transfer-Encoding"], "chunked")
+        self.assertEqual(sent[1].content, b"x" * 100000)
+        self.assertEqual(sent[2].content, b"bytes")
+
+    def test_auth_suffix_and_basic_auth(self):
+        """Test that the auth suffix is added and credentials are sent."""
+        sent = []
+
+        def handler(request):
+            sent.append(request)
+            return self._json_response({})
+
+        async def run():
+            auth = HTTPBasicAuth("user", "pass")
+            async with self._api(handler, auth=auth) as api:
+                await api.get("/accounts/self")
+
+        asyncio.run(run())
+        assert str(sent[0].url) == "http://review.example.com/a/accounts/self"
+        assert sent[0].headers["Authorization"].startswith("Basic ")
+
+    def test_digest_auth_is_translated(self):
+        """Test that digest auth is translated to the httpx equivalent."""
+        api = self._api(lambda request: None, auth=HTTPDigestAuth("u", "p"))
+        assert isinstance(api.client.auth, httpx.DigestAuth)
+
+    def test_post_data_dict_sent_as_json(self):
+        """Test that a `data` dict is sent as JSON with a Content-Type header."""
+        sent = []
+
+        def handler(request):
+            sent.append(request)
+            return self._json_response({"id": "x"})
+
+        async def run():
+            async with self._api(handler) as api:
+                return await api.post("/changes/", data={"subject": "s"})
+
+        self.assertEqual(asyncio.run(run()), {"id": "x"})
+        assert json.loads(sent[0].content) == {"subject": "s"}
+        assert sent[0].headers["Content-Type"].startswith("application/json")
+
+    def test_concurrent_requests(self):
+        """Test that many requests can be in flight from one event loop."""
+
+        def handler(request):
+            return self._json_response({"path": request.url.path})
+
+        async def run():
+            async with self._api(handler) as api:
+                return await asyncio.gather(
+                    *[api.get("/changes/%d" % i) for i in range(50)]
+                )
+
+        results = asyncio.run(run())
+        self.assertEqual(results[49], {"path": "/changes/49"})
+
+    def test_coalesced_requests(self):
+        """Test that concurrent identical GETs share one request."""
+        sent = []
+
+        async def handler(request):
+            sent.append(request)
+            await asyncio.sleep(0.05)
+            return self._json_response({"n": 1})
+
+        async def run():
+            api = AsyncGerritRestAPI(
+                url="http://review.example.com",
+                auth=Anonymous(),
+                transport=httpx.MockTransport(handler),
+                coalesce=True,
+            )
+            async with api:
+                return await asyncio.gather(*[api.get("/changes/1") for _ in range(10)])
+
+        results = asyncio.run(run())
+        self.assertEqual(len(sent), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_http_error_raises(self):
+        """Test that an HTTP error status raises an exception."""
+
+        async def run():
+            async with self._api(lambda request: httpx.Response(404)) as api:
+                await api.get("/changes/missing")
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            asyncio.run(run())
+
+
 if __name__ == "__main__":
     unittest.main()